@@ -0,0 +1,173 @@
+# bench_api.py
+# ░ Throughput y latencia del servicio de clientes (índice caliente) vs lectura por petición ░
+#
+# Uso:
+#   python benchmarks/bench_api.py --filas 200000 --peticiones 20000 --hilos 8
+#
+# El servidor corre en un proceso aparte (python modulo_api.py) sobre una base
+# escalada en una carpeta temporal; el cliente de prueba usa conexiones
+# keep-alive, una por hilo.
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+
+def escalar_base(filas, destino):
+    """Base escalada con IDs distintos por réplica, para que el índice crezca con las filas."""
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(RUTA_REPO, "madoli_base.csv"), encoding="utf-8-sig")
+    repeticiones = max(1, -(-filas // len(df)))
+    replica = np.repeat(np.arange(repeticiones), len(df))[:filas]
+    df = pd.concat([df] * repeticiones, ignore_index=True).iloc[:filas]
+    df["id_cliente"] = df["id_cliente"].astype(str) + "-" + replica.astype(str)
+    ruta = os.path.join(destino, "madoli_base.csv")
+    df.to_csv(ruta, index=False, encoding="utf-8-sig")
+    return ruta, df["id_cliente"].unique().tolist(), len(df.columns)
+
+
+def esperar_servidor(puerto, proceso, limite=120):
+    inicio = time.time()
+    while time.time() - inicio < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor terminó antes de aceptar conexiones")
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+            conexion.request("GET", "/salud")
+            return json.loads(conexion.getresponse().read())
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError("El servidor no respondió a tiempo")
+
+
+def cliente(puerto, rutas, latencias, errores):
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+    for ruta in rutas:
+        inicio = time.perf_counter()
+        conexion.request("GET", ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        latencias.append(time.perf_counter() - inicio)
+        if respuesta.status not in (200, 404):
+            errores.append(respuesta.status)
+    conexion.close()
+
+
+def medir_servicio(puerto, endpoint, ids, peticiones, hilos):
+    # 90 % IDs existentes, 10 % inexistentes (rechazos de validación)
+    rutas = [f"/{endpoint}?id_cliente={quote(random.choice(ids) if random.random() < 0.9 else 'NO-EXISTE')}"
+             for _ in range(peticiones)]
+    por_hilo = [rutas[i::hilos] for i in range(hilos)]
+    latencias, errores = [], []
+    trabajadores = [threading.Thread(target=cliente, args=(puerto, r, latencias, errores)) for r in por_hilo]
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    total = time.perf_counter() - inicio
+    ms = np.array(latencias) * 1000
+    return len(latencias) / total, np.percentile(ms, 50), np.percentile(ms, 99), len(errores)
+
+
+def medir_lectura_por_peticion(ruta_csv, ids, repeticiones):
+    """Ruta anterior: read_csv + astype(str).values en cada petición."""
+    import pandas as pd
+
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df = pd.read_csv(ruta_csv)
+        _ = random.choice(ids) in df["id_cliente"].astype(str).values
+        latencias.append(time.perf_counter() - inicio)
+    ms = np.array(latencias) * 1000
+    return 1000 / ms.mean(), np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def medir_lookup_en_proceso(ids, repeticiones=200_000):
+    """Costo del lookup sin HTTP: lo que agrega el índice caliente a cada petición."""
+    from modulo_api import ServicioClientes
+
+    servicio = ServicioClientes(intervalo=3600)
+    servicio.disponible()
+    muestra = [random.choice(ids) for _ in range(repeticiones)]
+    resultados = {}
+    for nombre, funcion in (("existe", servicio.existe), ("perfil", servicio.perfil)):
+        inicio = time.perf_counter()
+        for id_cliente in muestra:
+            funcion(id_cliente)
+        resultados[nombre] = (time.perf_counter() - inicio) / repeticiones * 1e6
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--peticiones", type=int, default=20_000)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--puerto", type=int, default=8361)
+    parser.add_argument("--repeticiones-csv", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv, ids, total_columnas = escalar_base(args.filas, carpeta)
+        entorno = dict(os.environ, MADOLI_RUTA_DATOS=carpeta,
+                       MADOLI_RUTA_SNAPSHOTS=os.path.join(carpeta, "snapshots"),
+                       MADOLI_INTERVALO_RECARGA="1")
+        proceso = subprocess.Popen([sys.executable, os.path.join(RUTA_REPO, "modulo_api.py"),
+                                    "--puerto", str(args.puerto)],
+                                   env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            inicio = time.perf_counter()
+            salud = esperar_servidor(args.puerto, proceso)
+            print(f"Arranque en caliente: {time.perf_counter() - inicio:.1f} s · "
+                  f"{salud['registros']:,} registros · {salud['clientes']:,} clientes")
+
+            print(f"{'modo':<30}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errores':>10}")
+            for endpoint in ("validar", "perfil"):
+                rps, p50, p99, errores = medir_servicio(args.puerto, endpoint, ids, args.peticiones, args.hilos)
+                print(f"{'servicio /' + endpoint:<30}{rps:>12,.0f}{p50:>10.3f}{p99:>10.3f}{errores:>10}")
+
+            rps, p50, p99 = medir_lectura_por_peticion(ruta_csv, ids, args.repeticiones_csv)
+            print(f"{'read_csv por petición':<30}{rps:>12,.1f}{p50:>10.1f}{p99:>10.1f}{0:>10}")
+
+            os.environ.update(entorno)
+            for nombre, us in medir_lookup_en_proceso(ids).items():
+                print(f"Lookup en proceso ({nombre}): {us:.2f} µs")
+
+            # 🔁 Hot-reload: se agrega un cliente y se espera a que el servicio lo vea
+            with open(ruta_csv, "a", encoding="utf-8") as f:
+                f.write("NUEVO-0" + "," * (total_columnas - 1) + "\n")
+            inicio = time.perf_counter()
+            conexion = http.client.HTTPConnection("127.0.0.1", args.puerto, timeout=10)
+            while time.perf_counter() - inicio < 30:
+                conexion.request("GET", "/validar?id_cliente=NUEVO-0")
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status == 200:
+                    print(f"Hot-reload visible en {time.perf_counter() - inicio:.2f} s")
+                    break
+                time.sleep(0.05)
+            else:
+                print("Hot-reload no detectado en 30 s")
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# bench_bubble.py
+# ░ Envío a Bubble contra un servidor stub local: secuencial (requests.post) vs pool concurrente y lotes ░
+#
+# Uso:
+#   python benchmarks/bench_bubble.py --clientes 2000 --latencia-ms 20 --fallas 0.05
+#
+# El stub responde 503 / 429 (con Retry-After) a una fracción de las peticiones
+# y registra las Idempotency-Key aplicadas, para comprobar que cada cliente
+# queda aplicado una sola vez aunque haya reintentos.
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+
+class StubBubble(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latencia, fallas):
+        super().__init__(("127.0.0.1", 0), ManejadorStub)
+        self.latencia = latencia
+        self.fallas = fallas
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.aplicados = {}
+        self.claves = set()
+        self.peticiones = 0
+        self.duplicadas = 0
+        self.conexiones = set()
+
+
+class ManejadorStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        servidor = self.server
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(servidor.latencia)
+        with servidor.lock:
+            servidor.peticiones += 1
+            servidor.conexiones.add(self.client_address)
+        sorteo = random.random()
+        if sorteo < servidor.fallas / 2:
+            return self._responder(503, {})
+        if sorteo < servidor.fallas:
+            return self._responder(429, {}, {"Retry-After": "0.05"})
+
+        clave = self.headers.get("Idempotency-Key")
+        with servidor.lock:
+            if clave and clave in servidor.claves:
+                servidor.duplicadas += 1
+            else:
+                if clave:
+                    servidor.claves.add(clave)
+                for cliente in cuerpo.get("clientes", [cuerpo]):
+                    servidor.aplicados[cliente["id_cliente"]] = servidor.aplicados.get(cliente["id_cliente"], 0) + 1
+        self._responder(200, {"status": "success"})
+
+    def _responder(self, estado, cuerpo, cabeceras=None):
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        for k, v in (cabeceras or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+def secuencial(resultados, url):
+    """Ruta anterior: un requests.post por cliente, sin sesión, timeout ni reintentos."""
+    import requests
+
+    enviados = 0
+    for r in resultados:
+        respuesta = requests.post(url, json={"id_cliente": r["id_cliente"],
+                                             "promociones_sugeridas": r["promociones_sugeridas"]})
+        enviados += respuesta.status_code == 200
+    return {"enviados": enviados, "reintentos": 0}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--fallas", type=float, default=0.05)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--tasa", type=float, default=0, help="peticiones/s del token bucket (0 = sin límite)")
+    args = parser.parse_args()
+
+    from modulo_bubble import enviar_promociones
+
+    servidor = StubBubble(args.latencia_ms / 1000, args.fallas)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}/api/1.1/wf"
+    resultados = [{"id_cliente": f"C{k:06d}", "promociones_sugeridas": ["Asesoría personalizada sin costo"]}
+                  for k in range(args.clientes)]
+
+    modos = [
+        ("secuencial (requests.post)", lambda: secuencial(resultados, f"{base}/actualizar_cliente")),
+        (f"pool x{args.concurrencia}", lambda: enviar_promociones(
+            resultados, url=f"{base}/actualizar_cliente", url_lote="", concurrencia=args.concurrencia,
+            tasa=args.tasa)),
+        (f"pool x{args.concurrencia} + lotes de 50", lambda: enviar_promociones(
+            resultados, url_lote=f"{base}/actualizar_clientes_lote", concurrencia=args.concurrencia,
+            tasa=args.tasa, tamano_lote=50)),
+    ]
+    print(f"stub: {args.latencia_ms:.0f} ms por petición · {args.fallas:.0%} respuestas 503/429 · "
+          f"{args.clientes:,} clientes")
+    print(f"{'modo':<30}{'s':>8}{'clientes/s':>12}{'peticiones':>12}{'conexiones':>12}"
+          f"{'reintentos':>12}{'aplicados':>11}{'dobles':>8}")
+    for etiqueta, ejecutar in modos:
+        servidor.reiniciar()
+        inicio = time.perf_counter()
+        resumen = ejecutar()
+        segundos = time.perf_counter() - inicio
+        dobles = sum(1 for n in servidor.aplicados.values() if n > 1)
+        print(f"{etiqueta:<30}{segundos:>8.2f}{args.clientes / segundos:>12,.0f}{servidor.peticiones:>12,}"
+              f"{len(servidor.conexiones):>12,}{resumen['reintentos']:>12,}{len(servidor.aplicados):>11,}{dobles:>8}")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# bench_consultas.py
+# ░ Camino pandas vs SQL embebido (DuckDB / SQLite): filtros KPI, perfil por cliente y rollup trimestral ░
+#
+# Uso:
+#   python benchmarks/bench_consultas.py                                  # 10k, pandas + duckdb + sqlite
+#   python benchmarks/bench_consultas.py --escalas 1m --motores pandas duckdb --datos /tmp/madoli_sinteticos
+#
+# Las bases se generan con generar_sinteticos.py y se convierten a snapshots una vez por escala.
+# Cada motor corre en un proceso hijo con las bases ya cargadas y mide, por consulta:
+#   preparación   construir el índice pandas o el objeto SQL (opciones de filtros, IDs, ramos;
+#                 para SQLite incluye copiar la base a consultas.sqlite)
+#   frío          primera consulta
+#   mediana       selecciones / clientes / ramos distintos, sin acierto de memo
+# además del pico de RSS sobre las bases cargadas y las filas que vuelven a Python.
+# Cada hijo reporta también una huella de lo que devolvió (opciones de filtros, KPIs, conteos,
+# perfiles, rollups; números a 2 decimales): si la de un motor difiere de la del primero de
+# --motores la consulta cuenta como falla y el script termina con código 1.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RUTA_REPO)
+sys.path.insert(0, RUTA_BENCH)
+
+from bench_pestanas import _preparar_datos, _reiniciar_pico, _status_mb  # noqa: E402
+
+MOTORES = ["pandas", "duckdb", "sqlite"]
+CONSULTAS = ["kpis", "perfil", "trimestral"]
+REPETICIONES = 20
+
+
+def _ms(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return (time.perf_counter() - inicio) * 1000, resultado
+
+
+def _normalizar(valor):
+    """Valor comparable entre motores: tipos de Python, números a 2 decimales, nulos como None."""
+    import pandas as pd
+
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        # SUM de enteros vuelve como float en SQL: se comparan como número, no por tipo
+        return round(float(valor), 2) + 0.0
+    return valor
+
+
+def _tabla(df):
+    return [list(df.columns), _normalizar(df.to_numpy(dtype=object).tolist())]
+
+
+def _huella(resultados):
+    texto = json.dumps(_normalizar(resultados), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _columnas_kpi(df):
+    col_aseguradora = "source" if "source" in df.columns else None
+    col_product = "product" if "product" in df.columns else None
+    return ({"Aseguradora": col_aseguradora, "Producto": col_product, "Ramo": "Ramo", "Subramo": "Subramo"},
+            {"polizas": "policy_number", "clientes": "id_cliente",
+             "aseguradoras": col_aseguradora, "productos": col_product})
+
+
+def consulta_kpis(motor, datos, azar):
+    from modulo_consultas import filtros_sql
+    from modulo_filtros import indice_filtros
+
+    df = datos["base"]
+    columnas, metricas = _columnas_kpi(df)
+    preparar = (lambda: indice_filtros(df, columnas, columnas_metricas=metricas)[0]) if motor is None else \
+        (lambda: filtros_sql(df, "madoli_base.csv", motor, columnas, metricas)[0])
+    ms_preparacion, indice = _ms(preparar)
+
+    todo = {k: indice.valores.get(k, []) for k in columnas}
+    selecciones = [todo] + [
+        {k: (azar.sample(v, max(1, len(v) // 2)) if k in ("Ramo", "Aseguradora") else v) for k, v in todo.items()}
+        for _ in range(REPETICIONES)
+    ]
+
+    def una(seleccion):
+        kpis, _ = indice.kpis(seleccion)
+        return kpis, indice.conteos(seleccion, "Aseguradora")
+
+    ms_frio, primera = _ms(lambda: una(selecciones[0]))
+    medidas = [_ms(lambda: una(s)) for s in selecciones[1:]]
+    devueltos = [primera] + [r for _, r in medidas]
+    resultados = {"valores": todo, "kpis": [(k, _tabla(c)) for k, c in devueltos]}
+    return ms_preparacion, ms_frio, [ms for ms, _ in medidas], 1 + len(primera[1]), resultados
+
+
+def consulta_perfil(motor, datos, azar):
+    from modulo_clientes import indice_clientes
+    from modulo_consultas import clientes_sql
+
+    df = datos["base"]
+    preparar = (lambda: indice_clientes(df)[0]) if motor is None else \
+        (lambda: clientes_sql(df, "madoli_base.csv", motor)[0])
+    ms_preparacion, indice = _ms(preparar)
+    ids = azar.sample(indice.ids, min(len(indice.ids), REPETICIONES + 1))
+    ms_frio, primero = _ms(lambda: indice.resumen_de(ids[0]))
+    medidas = [_ms(lambda: indice.resumen_de(i)) for i in ids[1:]]
+    resultados = {"ids": len(indice.ids), "perfiles": [primero] + [r for _, r in medidas]}
+    return ms_preparacion, ms_frio, [ms for ms, _ in medidas], 1, resultados
+
+
+def consulta_trimestral(motor, datos, azar):
+    from modulo_consultas import ventas_sql
+    from modulo_sectorial import cubo_ventas
+
+    df = datos["ventas"]
+    if motor is None:
+        ms_preparacion, cubo = _ms(lambda: cubo_ventas(df)[0])
+        trimestral = lambda ramo: cubo.rebanada(ramo)[["nombre", "trimestre", "Ventas"]]
+        ramos = cubo.ramos()
+    else:
+        ms_preparacion, ventas = _ms(lambda: ventas_sql(df, "ventas_sectoriales.csv", motor)[0])
+        trimestral = ventas.trimestral
+        ramos = ventas.ramos()
+    ms_frio, tabla = _ms(lambda: trimestral(ramos[0]))
+    medidas = [_ms(lambda: trimestral(r)) for r in ramos[1:REPETICIONES + 1]]
+    resultados = {"ramos": ramos, "trimestral": [_tabla(t) for t in [tabla] + [r for _, r in medidas]]}
+    return ms_preparacion, ms_frio, [ms for ms, _ in medidas], len(tabla), resultados
+
+
+FUNCIONES = {"kpis": consulta_kpis, "perfil": consulta_perfil, "trimestral": consulta_trimestral}
+
+
+def hijo(nombre_motor, consulta):
+    from modulo_carga import cargar_base
+    from modulo_consultas import motor_consultas
+
+    datos = {"base": cargar_base("madoli_base.csv"), "ventas": cargar_base("ventas_sectoriales.csv")}
+    motor = motor_consultas(nombre_motor)
+    rss_inicial = _status_mb("VmRSS")
+    _reiniciar_pico()
+    ms_preparacion, ms_frio, tiempos, filas, resultados = FUNCIONES[consulta](motor, datos, random.Random(7))
+    pico = max(0.0, _status_mb("VmHWM") - rss_inicial)
+    print(json.dumps({"preparacion_ms": round(ms_preparacion, 1), "frio_ms": round(ms_frio, 2),
+                      "mediana_ms": round(statistics.median(tiempos), 2) if tiempos else None,
+                      "pico_mb": round(pico, 1), "filas": filas, "huella": _huella(resultados),
+                      "motor": motor.nombre if motor is not None else "pandas"}))
+
+
+def medir(nombre_motor, consulta, entorno):
+    salida = subprocess.run([sys.executable, __file__, "--hijo", nombre_motor, consulta], env=entorno,
+                            cwd=RUTA_REPO, capture_output=True, text=True)
+    if salida.returncode != 0:
+        return {"error": (salida.stderr.strip().splitlines() or ["sin salida"])[-1]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", nargs="+", default=["10k"], help="10k, 1m, 10m o enteros")
+    parser.add_argument("--motores", nargs="+", default=MOTORES, choices=MOTORES)
+    parser.add_argument("--consultas", nargs="+", default=CONSULTAS, choices=CONSULTAS)
+    parser.add_argument("--datos", help="carpeta donde generar/reutilizar las bases (por escala)")
+    parser.add_argument("--salida", help="guarda los resultados en JSON")
+    parser.add_argument("--hijo", nargs=2)
+    args = parser.parse_args()
+
+    if args.hijo:
+        hijo(*args.hijo)
+        return
+
+    raiz = args.datos or tempfile.mkdtemp(prefix="madoli_bench_")
+    resultados, fallas = {}, []
+    try:
+        print(f"{'escala':<8}{'consulta':<12}{'motor':<9}{'prep ms':>11}{'frío ms':>11}{'mediana ms':>12}"
+              f"{'pico MB':>10}{'filas':>8}")
+        for escala in args.escalas:
+            carpeta = os.path.join(raiz, str(escala))
+            os.makedirs(carpeta, exist_ok=True)
+            _preparar_datos(escala, carpeta)
+            snapshots = os.path.join(carpeta, "snapshots")
+            entorno = dict(os.environ, MADOLI_RUTA_DATOS=carpeta, MADOLI_RUTA_SNAPSHOTS=snapshots,
+                           MADOLI_RUTA_LOGS=carpeta)
+            # Snapshots al día antes de medir: todos los motores parten de las mismas bases
+            subprocess.run([sys.executable, os.path.join(RUTA_REPO, "modulo_snapshots.py"),
+                            "madoli_base.csv", "ventas_sectoriales.csv"],
+                           env=entorno, cwd=RUTA_REPO, capture_output=True, check=True)
+            for consulta in args.consultas:
+                for nombre_motor in args.motores:
+                    # SQLite en frío en cada corrida: su primera consulta incluye la copia de la base
+                    if os.path.isfile(os.path.join(snapshots, "consultas.sqlite")):
+                        os.remove(os.path.join(snapshots, "consultas.sqlite"))
+                    resultado = medir(nombre_motor, consulta, entorno)
+                    por_motor = resultados.setdefault(str(escala), {}).setdefault(consulta, {})
+                    por_motor[nombre_motor] = resultado
+                    if "error" in resultado:
+                        print(f"{escala:<8}{consulta:<12}{nombre_motor:<9}  ERROR {resultado['error']}")
+                        fallas.append(f"{escala} {consulta} {nombre_motor}: {resultado['error']}")
+                        continue
+                    referencia = next(iter(por_motor.values()))
+                    if "huella" in referencia and resultado["huella"] != referencia["huella"]:
+                        fallas.append(f"{escala} {consulta}: {resultado['motor']} devuelve resultados distintos "
+                                      f"de {args.motores[0]}")
+                    mediana = resultado["mediana_ms"]
+                    print(f"{escala:<8}{consulta:<12}{resultado['motor']:<9}{resultado['preparacion_ms']:>11,.1f}"
+                          f"{resultado['frio_ms']:>11,.2f}{mediana if mediana is not None else float('nan'):>12,.2f}"
+                          f"{resultado['pico_mb']:>10,.1f}{resultado['filas']:>8,}")
+    finally:
+        if not args.datos:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, indent=2)
+    if fallas:
+        print("\n❌ Fallas:")
+        for falla in fallas:
+            print(f"   {falla}")
+        sys.exit(1)
+    print("\n✅ Todos los motores devuelven los mismos resultados.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_ingesta.py
+# ░ DENUE a escala nacional: lectura completa vs ingesta por bloques con poda de columnas ░
+#
+# Uso:
+#   python benchmarks/bench_ingesta.py --filas 2000000 --presupuesto 256 --entidades 9
+#
+# Cada medición corre en un proceso hijo para que el pico de RSS (VmHWM) sea propio.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def escalar_denue(filas, destino):
+    """Replica empresa.csv repartiendo las filas entre las 32 entidades."""
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(RUTA_REPO, "empresa.csv"), encoding="utf-8-sig")
+    repeticiones = max(1, -(-filas // len(df)))
+    df = pd.concat([df] * repeticiones, ignore_index=True).iloc[:filas]
+    df["Clave entidad"] = np.arange(len(df)) % 32 + 1
+    ruta = os.path.join(destino, "denue.csv")
+    df.to_csv(ruta, index=False, encoding="utf-8-sig")
+    return ruta
+
+
+def hijo(modo, ruta, presupuesto, entidades):
+    import pandas as pd
+    from modulo_ingesta import leer_denue
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    if modo == "completa":
+        df = pd.read_csv(ruta, encoding="utf-8-sig")
+        if entidades:
+            df = df[df["Clave entidad"].isin(entidades)]
+    else:
+        df = leer_denue(ruta, entidades=entidades, presupuesto_mb=presupuesto)
+    ms = (time.perf_counter() - inicio) * 1000
+    mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"{ms:.1f} {_rss_mb() - rss_inicial:.1f} {mb:.1f} {len(df)}")
+
+
+def medir(modo, ruta, presupuesto, entidades):
+    args = [sys.executable, __file__, "--hijo", modo, "--ruta", ruta, "--presupuesto", str(presupuesto),
+            "--entidades", ",".join(map(str, entidades))]
+    resultado = subprocess.run(args, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        return None, resultado.stderr.strip().splitlines()[-1]
+    return tuple(float(x) for x in resultado.stdout.split()), None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--presupuesto", type=float, default=256)
+    parser.add_argument("--entidades", default="9")
+    parser.add_argument("--hijo")
+    parser.add_argument("--ruta")
+    args = parser.parse_args()
+    entidades = [int(e) for e in args.entidades.split(",") if e]
+
+    if args.hijo:
+        hijo(args.hijo, args.ruta, args.presupuesto, entidades)
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = escalar_denue(args.filas, carpeta)
+        print(f"denue.csv: {args.filas:,} filas · {os.path.getsize(ruta) / 1e6:,.0f} MB en disco · "
+              f"presupuesto {args.presupuesto:.0f} MB")
+        print(f"{'modo':<34}{'ms':>10}{'ΔRSS pico MB':>14}{'MB df':>10}{'filas':>12}")
+        for modo, filtro in (("completa", []), ("completa", entidades),
+                             ("bloques", []), ("bloques", entidades)):
+            medicion, error = medir(modo, ruta, args.presupuesto, filtro)
+            etiqueta = modo + (f" (entidades {','.join(map(str, filtro))})" if filtro else "")
+            if error:
+                print(f"{etiqueta:<34}{error}")
+                continue
+            ms, rss, mb, filas = medicion
+            print(f"{etiqueta:<34}{ms:>10.0f}{rss:>14.1f}{mb:>10.1f}{filas:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# bench_pestanas.py
+# ░ Suite sintética por pestaña: tiempo (frío / recarga) y pico de memoria a 10k, 1M y 10M filas ░
+#
+# Uso:
+#   python benchmarks/bench_pestanas.py                              # 10k, todas las pestañas
+#   python benchmarks/bench_pestanas.py --escalas 10k 1m --app       # + AppTest del script completo
+#   python benchmarks/bench_pestanas.py --escalas 10m --datos /mnt/madoli_sinteticos
+#
+# Las bases se generan con generar_sinteticos.py (y se reutilizan si ya existen en --datos).
+# Cada pestaña corre en un proceso hijo: carga los snapshots, reinicia el pico de RSS y
+# ejecuta la lógica de la pestaña dos veces, en frío (sin derivados) y como recarga (con
+# los derivados memorizados por huella, que es lo que paga cada rerun de Streamlit).
+# Sin red ni GPU. Termina con código 1 si alguna medición supera su umbral.
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RUTA_REPO)
+sys.path.insert(0, RUTA_BENCH)
+
+# Catálogo de productos del caso de alta cardinalidad (índice de filtros)
+PRODUCTOS_CARDINALIDAD = 2_000
+BASES = {"base": ("madoli_base.csv", ()), "denue": ("denue.csv", ("empresa.csv",)),
+         "ventas": ("ventas_sectoriales.csv", ()), "censo": ("censo_inegi.csv", ())}
+
+# (frío ms, recarga ms, pico MB) por escala y pestaña; None = sin umbral.
+# ~3x lo medido en un Linux x86 de 4 núcleos sin GPU: una regresión real los rebasa, el ruido no.
+UMBRALES = {
+    "10k": {
+        "carga": (5_000, 50, 500), "snapshot": (3_000, 50, 450),
+        "kpis": (2_000, 150, 120), "kpis_cardinalidad": (2_000, 150, 150), "perfil": (500, 50, 60), "territorial": (1_000, 300, 80),
+        "sectorial": (2_500, 800, 160), "ia": (5_000, 150, 400), "bitacora": (600, 200, 50),
+        "app": (12_000, 3_000, 900),
+    },
+    "1m": {
+        "carga": (160_000, 50, 7_000), "snapshot": (12_000, 50, 4_500),
+        "kpis": (9_000, 150, 300), "kpis_cardinalidad": (9_000, 150, 400), "perfil": (18_000, 600, 800), "territorial": (6_000, 1_800, 500),
+        "sectorial": (7_000, 800, 400), "ia": (36_000, 6_000, 1_800), "bitacora": (3_000, 200, 500),
+        "app": (80_000, 13_000, 9_000),
+    },
+    # Provisionales (≈10x de 1M) hasta tener corridas de referencia a esta escala
+    "10m": {
+        "carga": (1_600_000, 100, 70_000), "snapshot": (120_000, 100, 45_000),
+        "kpis": (90_000, 1_500, 3_000), "kpis_cardinalidad": (120_000, 3_000, 8_000), "perfil": (180_000, 6_000, 8_000), "territorial": (60_000, 18_000, 5_000),
+        "sectorial": (70_000, 2_000, 4_000), "ia": (360_000, 60_000, 18_000), "bitacora": (30_000, 200, 5_000),
+        "app": (None, None, None),
+    },
+}
+
+
+# 📏 Memoria del proceso (Linux)
+def _status_mb(campo):
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def _reiniciar_pico():
+    """VmHWM vuelve al RSS actual (Linux ≥ 4.0): el pico medido es sólo el de la pestaña."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# 🗂️ Lógica de cada pestaña, como la ejecuta madoli360_streamlit.py
+def _cargar():
+    from modulo_carga import cargar_base
+
+    return {clave: cargar_base(nombre, alternativas=alternativas) for clave, (nombre, alternativas) in BASES.items()}
+
+
+def pestana_carga(datos):
+    """CSV → homologación → snapshot (frío); la recarga es un acierto de la caché de proceso."""
+    return sum(len(df) for df in _cargar().values())
+
+
+def pestana_snapshot(datos):
+    return sum(len(df) for df in _cargar().values())
+
+
+def pestana_kpis(datos):
+    from modulo_filtros import indice_filtros
+    from modulo_graficos import grafico_barras
+
+    df = datos["base"]
+    col_aseguradora = "source" if "source" in df.columns else None
+    col_product = "product" if "product" in df.columns else None
+    indice, _ = indice_filtros(
+        df, {"Aseguradora": col_aseguradora, "Producto": col_product, "Ramo": "Ramo", "Subramo": "Subramo"},
+        columnas_metricas={"polizas": "policy_number", "clientes": "id_cliente",
+                           "aseguradoras": col_aseguradora, "productos": col_product},
+    )
+    # Selección por omisión (todo) y una acotada, como al mover un filtro del sidebar
+    seleccion = {clave: indice.valores.get(clave, []) for clave in ["Aseguradora", "Producto", "Ramo", "Subramo"]}
+    acotada = dict(seleccion, Ramo=seleccion["Ramo"][: max(1, len(seleccion["Ramo"]) // 2)])
+    for sel in (seleccion, acotada):
+        kpis, _ = indice.kpis(sel)
+        for etiqueta, col in [("Aseguradora", col_aseguradora), ("Producto", col_product)]:
+            if col and etiqueta in indice.columnas_filtro:
+                grafico_barras(indice.conteos(sel, etiqueta), col)
+    return kpis["filas"]
+
+
+def pestana_kpis_cardinalidad(datos):
+    """KPIs con un catálogo de PRODUCTOS_CARDINALIDAD productos: cada recarga mueve el filtro (sin memo)."""
+    import numpy as np
+    import pandas as pd
+
+    from modulo_filtros import indice_filtros
+
+    if "base_cardinalidad" not in datos:
+        base = datos["base"]
+        productos = pd.Categorical.from_codes(np.arange(len(base)) * 7919 % PRODUCTOS_CARDINALIDAD,
+                                              [f"PRODUCTO {k:05d}" for k in range(PRODUCTOS_CARDINALIDAD)])
+        df = base.assign(product=productos)
+        df.attrs["madoli_huella"] = f"{base.attrs.get('madoli_huella')}@productos{PRODUCTOS_CARDINALIDAD}"
+        datos["base_cardinalidad"] = df
+    df = datos["base_cardinalidad"]
+    indice, _ = indice_filtros(
+        df, {"Aseguradora": "source", "Producto": "product", "Ramo": "Ramo", "Subramo": "Subramo"},
+        columnas_metricas={"polizas": "policy_number", "clientes": "id_cliente", "productos": "product"},
+    )
+    datos["corrida_cardinalidad"] = corrida = datos.get("corrida_cardinalidad", 0) + 1
+    seleccion = {clave: indice.valores.get(clave, []) for clave in ["Aseguradora", "Producto", "Ramo", "Subramo"]}
+    acotada = dict(seleccion, Producto=seleccion["Producto"][corrida::3])
+    kpis, _ = indice.kpis(acotada)
+    indice.conteos(acotada, "Ramo")
+    return kpis["filas"]
+
+
+def pestana_perfil(datos):
+    from modulo_clientes import indice_clientes
+    from modulo_retencion import clasificar, ranking_retencion, score_retencion
+
+    df = datos["base"]
+    indice, _ = indice_clientes(df)
+    resumen = indice.resumen_de(indice.ids[len(indice.ids) // 2])
+    clasificar(score_retencion(resumen["polizas"], resumen["productos"], resumen["vencimientos"]))
+    ranking, _ = ranking_retencion(df)
+    ranking.pagina(1, 50, "score", False, [])
+    # Página filtrada por una clase real de modulo_retencion.CLASES (una vacía no mide nada)
+    pagina, _ = ranking.pagina(3, 50, "contratante", True, ["En riesgo"])
+    if pagina.empty:
+        raise RuntimeError("La página filtrada por 'En riesgo' quedó vacía")
+    return len(ranking)
+
+
+def pestana_territorial(datos):
+    from modulo_espacial import coordenadas_clientes, indice_espacial
+    from modulo_territorial import territorio
+
+    terr, _ = territorio(datos["denue"], datos["censo"])
+    clave = terr.opciones()[0]
+    filas = len(terr.denue.leer(clave))
+    terr.censo.leer(clave)
+    terr.giros_de(clave)
+    indice, _ = indice_espacial(datos["denue"])
+    coords = coordenadas_clientes(datos["base"])
+    lat_min, lat_max, lon_min, lon_max = indice.extension()
+    if not coords.empty:
+        lat, lon = float(coords["latitude"].iloc[0]), float(coords["longitude"].iloc[0])
+    else:
+        lat, lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    indice.radio(lat, lon, 2.0)
+    indice.recuadro(lat_min, lat_max, lon_min, lon_max)
+    return filas
+
+
+def pestana_sectorial(datos):
+    import plotly.express as px
+    from modulo_graficos import grafico_plotly
+    from modulo_sectorial import cubo_ventas
+
+    cubo, _ = cubo_ventas(datos["ventas"])
+    for ramo in cubo.ramos()[:1]:
+        grafico_plotly(cubo.rebanada(ramo)[["nombre", "trimestre", "Ventas"]], "nombre", "Ventas",
+                       lambda d: px.bar(d, x="trimestre", y="Ventas", color="nombre", barmode="group"),
+                       agrupar=["trimestre"])
+        cubo.ultimo_trimestre(ramo)
+    return len(cubo.celdas)
+
+
+def pestana_ia(datos):
+    from modulo_bitacora import Bitacora
+    from modulo_graficos import agregar_conteo, grafico_barras
+    from modulo_promociones import generar_promociones_consolidadas
+    from modulo_segmentacion import error_segmentacion, estado_segmentacion, segmentar
+
+    tabla, modelo, estado = segmentar(datos["base"])
+    while tabla is None:
+        # Sin modelo: se mide hasta que el entrenamiento en segundo plano termina
+        if estado == "error":
+            raise RuntimeError(error_segmentacion(datos["base"]))
+        while estado_segmentacion()["entrenando"]:
+            time.sleep(0.02)
+        tabla, modelo, estado = segmentar(datos["base"])
+    grafico_barras(agregar_conteo(tabla, "cluster"), "cluster")
+    modelo.perfiles()
+    fuentes = tabla[["id_cliente"]].assign(segmento=tabla["cluster"].astype(str))
+    return len(generar_promociones_consolidadas(fuentes, Bitacora()))
+
+
+def pestana_bitacora(datos):
+    from modulo_bitacora import Bitacora
+    from modulo_carga import estadisticas_cache
+    from modulo_esquemas import mapa_ramos
+    from modulo_ingesta import reportes_ingesta_df
+    from modulo_sectorial import cubo_ventas
+
+    estadisticas_cache()
+    reportes_ingesta_df()
+    cubo_ventas(datos["ventas"])[0].historial_df()
+    df = datos["base"]
+    homologados = [v for v in df["Ramo"].dropna().unique() if v in mapa_ramos] if "Ramo" in df.columns else []
+    # Bitácora llena: el buffer circular a tope, con varias recargas medidas
+    bitacora = Bitacora()
+    for corrida in range(20):
+        bitacora.nueva_corrida()
+        for etapa in ("carga", "normalizacion", "filtro", "grafico", "cluster", "exportacion"):
+            with bitacora.etapa(etapa, filas=len(df)):
+                for i in range(15):
+                    bitacora.append(f"✅ Evento {i} · {len(homologados)} ramos homologados")
+    bitacora.desglose()
+    bitacora.historial_latencias()
+    return len(bitacora.exportar_json())
+
+
+PESTANAS = {
+    "carga": pestana_carga, "snapshot": pestana_snapshot, "kpis": pestana_kpis,
+    "kpis_cardinalidad": pestana_kpis_cardinalidad, "perfil": pestana_perfil,
+    "territorial": pestana_territorial, "sectorial": pestana_sectorial, "ia": pestana_ia,
+    "bitacora": pestana_bitacora,
+}
+
+
+def app(datos):
+    """Script completo en modo headless (todas las pestañas, como hoy las ejecuta Streamlit)."""
+    from streamlit.testing.v1 import AppTest
+
+    if "prueba" not in datos:
+        datos["prueba"] = AppTest.from_file(os.path.join(RUTA_REPO, "madoli360_streamlit.py"), default_timeout=3_600)
+    datos["prueba"].run()
+    if datos["prueba"].exception:
+        raise RuntimeError(str(datos["prueba"].exception[0].value))
+    return len(datos["prueba"].main.children)
+
+
+def hijo(pestana):
+    # La pestaña de carga mide justamente la carga: no se precarga nada
+    datos = _cargar() if pestana not in ("carga", "snapshot", "app") else {}
+    funcion = app if pestana == "app" else PESTANAS[pestana]
+
+    rss_inicial = _status_mb("VmRSS")
+    _reiniciar_pico()
+    inicio = time.perf_counter()
+    filas = funcion(datos)
+    frio = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    funcion(datos)
+    tibio = (time.perf_counter() - inicio) * 1000
+    pico = max(0.0, _status_mb("VmHWM") - rss_inicial)
+    print(json.dumps({"frio_ms": round(frio, 1), "tibio_ms": round(tibio, 1), "pico_mb": round(pico, 1),
+                      "filas": int(filas)}))
+
+
+def medir(pestana, entorno):
+    salida = subprocess.run([sys.executable, __file__, "--hijo", pestana], env=entorno, cwd=RUTA_REPO,
+                            capture_output=True, text=True)
+    if salida.returncode != 0:
+        return {"error": (salida.stderr.strip().splitlines() or ["sin salida"])[-1]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _preparar_datos(escala, carpeta):
+    from generar_sinteticos import ARCHIVOS, filas_de, generar
+
+    marca = os.path.join(carpeta, "filas.txt")
+    filas = filas_de(escala)
+    if os.path.isfile(marca) and open(marca).read().strip() == str(filas) and \
+            all(os.path.isfile(os.path.join(carpeta, a)) for a in ARCHIVOS):
+        return 0.0
+    inicio = time.perf_counter()
+    generar(filas, carpeta)
+    with open(marca, "w") as f:
+        f.write(str(filas))
+    return time.perf_counter() - inicio
+
+
+def _excedidos(escala, pestana, resultado, umbrales):
+    limites = umbrales.get(escala, {}).get(pestana)
+    if not limites or "error" in resultado:
+        return []
+    return [f"{pestana}@{escala}: {campo} {resultado[campo]:,.1f} > {limite:,}"
+            for campo, limite in zip(("frio_ms", "tibio_ms", "pico_mb"), limites)
+            if limite is not None and resultado[campo] > limite]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", nargs="+", default=["10k"], help="10k, 1m, 10m o enteros")
+    parser.add_argument("--pestanas", nargs="+", default=list(PESTANAS), choices=list(PESTANAS))
+    parser.add_argument("--app", action="store_true", help="incluye el script completo vía AppTest")
+    parser.add_argument("--datos", help="carpeta donde generar/reutilizar las bases (por escala)")
+    parser.add_argument("--umbrales", help="JSON {escala: {pestana: [frio_ms, tibio_ms, pico_mb]}}")
+    parser.add_argument("--salida", help="guarda los resultados en JSON")
+    parser.add_argument("--hijo")
+    args = parser.parse_args()
+
+    if args.hijo:
+        hijo(args.hijo)
+        return
+
+    umbrales = UMBRALES
+    if args.umbrales:
+        with open(args.umbrales) as f:
+            umbrales = {e: {**UMBRALES.get(e, {}), **v} for e, v in json.load(f).items()}
+
+    raiz = args.datos or tempfile.mkdtemp(prefix="madoli_bench_")
+    pestanas = ["carga"] + [p for p in args.pestanas if p != "carga"] + (["app"] if args.app else [])
+    resultados, fallas = {}, []
+    try:
+        print(f"{'escala':<8}{'pestaña':<20}{'frío ms':>12}{'recarga ms':>12}{'pico MB':>10}{'filas':>12}")
+        for escala in args.escalas:
+            carpeta = os.path.join(raiz, str(escala))
+            os.makedirs(carpeta, exist_ok=True)
+            segundos = _preparar_datos(escala, carpeta)
+            if segundos:
+                print(f"{escala:<8}{'(generación)':<20}{segundos * 1000:>12,.0f}")
+            # Snapshots y modelos nuevos en cada corrida: 'carga' mide siempre la ingesta en frío
+            snapshots = os.path.join(carpeta, "snapshots")
+            shutil.rmtree(snapshots, ignore_errors=True)
+            entorno = dict(os.environ, MADOLI_RUTA_DATOS=carpeta, MADOLI_RUTA_SNAPSHOTS=snapshots,
+                           MADOLI_RUTA_LOGS=carpeta, MADOLI_RUTA_EXPORTES=os.path.join(carpeta, "exportes"))
+            for pestana in pestanas:
+                resultado = medir(pestana, entorno)
+                resultados.setdefault(str(escala), {})[pestana] = resultado
+                if "error" in resultado:
+                    print(f"{escala:<8}{pestana:<20}  ERROR {resultado['error']}")
+                    fallas.append(f"{pestana}@{escala}: {resultado['error']}")
+                    continue
+                print(f"{escala:<8}{pestana:<20}{resultado['frio_ms']:>12,.1f}{resultado['tibio_ms']:>12,.1f}"
+                      f"{resultado['pico_mb']:>10,.1f}{resultado['filas']:>12,}")
+                fallas += _excedidos(str(escala), pestana, resultado, umbrales)
+    finally:
+        if not args.datos:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, indent=2)
+    if fallas:
+        print("\n❌ Regresiones:")
+        for falla in fallas:
+            print(f"   {falla}")
+        sys.exit(1)
+    print("\n✅ Todas las mediciones dentro de umbral.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# bench_promociones.py
+# ░ Promociones: función por dict en bucle vs motor de reglas por lote ░
+#
+# Uso:
+#   python benchmarks/bench_promociones.py --clientes 100000 1000000
+#
+# Verifica además que ambas rutas sugieren exactamente las mismas promociones.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+HISTORIALES = [[], ["reclamación reciente"], ["visita reciente"], ["visita reciente", "reclamación reciente"]]
+
+
+def generar_clientes(n, semilla=7):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    historial = np.empty(n, dtype=object)
+    historial[:] = [HISTORIALES[k] for k in rng.integers(0, len(HISTORIALES), n)]
+    return pd.DataFrame({
+        "id_cliente": [f"C{k:07d}" for k in range(n)],
+        "segmento": rng.choice(["A", "B", "C", "0", "1", "2"], n).astype(object),
+        "historial": historial,
+    })
+
+
+def por_dict(fuentes):
+    from modulo_promociones import bloque_promociones_predictivas
+
+    resultados = []
+    for fuente in fuentes:
+        resultado = bloque_promociones_predictivas(fuente)
+        if "error" not in resultado:
+            resultados.append(resultado)
+    return resultados
+
+
+class LogSincrono:
+    """Ruta anterior: logging.basicConfig a archivo, f-string y escritura con flush por registro."""
+
+    def __init__(self, ruta):
+        import logging
+
+        self.logger = logging.getLogger("bench.promociones.sincrono")
+        self.logger.propagate = False
+        self.manejador = logging.FileHandler(ruta, encoding="utf-8")
+        self.manejador.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+        self.logger.addHandler(self.manejador)
+        self.logger.setLevel(logging.INFO)
+
+    def isEnabledFor(self, nivel):
+        return self.logger.isEnabledFor(nivel)
+
+    def info(self, mensaje, **campos):
+        self.logger.info(f"{mensaje} | {campos}")
+
+    debug = warning = info
+
+    def cerrar(self):
+        self.logger.removeHandler(self.manejador)
+        self.manejador.close()
+
+
+def modos_log(modulo, carpeta):
+    """Configuraciones de logging a comparar: (etiqueta, preparar, restaurar)."""
+    original = modulo.log
+
+    def nivel(valor):
+        return lambda: original.setLevel(valor)
+
+    def sincrono():
+        modulo.log = LogSincrono(os.path.join(carpeta, "sincrono.log"))
+
+    def restaurar():
+        if modulo.log is not original:
+            modulo.log.cerrar()
+            modulo.log = original
+
+    return [
+        ("apagado", nivel("WARNING"), restaurar),
+        ("INFO cola JSONL", nivel("INFO"), restaurar),
+        ("DEBUG cola JSONL", nivel("DEBUG"), restaurar),
+        ("INFO síncrono", sincrono, restaurar),
+    ]
+
+
+def esperar_cola():
+    from modulo_logs import esperar_logs
+
+    esperar_logs()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--sin-logs", action="store_true", help="omitir la comparación de logging")
+    args = parser.parse_args()
+
+    # Los logs se escriben en la carpeta de trabajo: se aísla en una carpeta temporal
+    with tempfile.TemporaryDirectory() as carpeta:
+        os.chdir(carpeta)
+        os.environ["MADOLI_RUTA_LOGS"] = carpeta
+        import modulo_promociones
+        from modulo_promociones import generar_promociones_consolidadas, log, promociones_lote
+
+        print(f"{'clientes':>12}{'por dict s':>12}{'lote s':>10}{'lote→dicts s':>14}{'aceleración':>14}{'iguales':>10}")
+        log.setLevel("WARNING")
+        for n in args.clientes:
+            clientes = generar_clientes(n)
+            fuentes = clientes.to_dict("records")
+
+            inicio = time.perf_counter()
+            esperados = por_dict(fuentes)
+            s_dict = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            promociones_lote(clientes)
+            s_lote = time.perf_counter() - inicio
+
+            # Misma salida que la ruta por dict (lista de dicts), para comparar resultados
+            inicio = time.perf_counter()
+            obtenidos = generar_promociones_consolidadas(clientes, [])
+            s_dicts = time.perf_counter() - inicio
+
+            iguales = len(esperados) == len(obtenidos) and all(
+                a["id_cliente"] == b["id_cliente"] and a["promociones_sugeridas"] == b["promociones_sugeridas"]
+                for a, b in zip(esperados, obtenidos))
+            print(f"{n:>12,}{s_dict:>12.2f}{s_lote:>10.2f}{s_dicts:>14.2f}{s_dict / s_lote:>13.1f}x{str(iguales):>10}")
+
+        if args.sin_logs:
+            return
+        n = args.clientes[0]
+        clientes = generar_clientes(n)
+        fuentes = clientes.to_dict("records")
+        print(f"\nlogging · {n:,} clientes (clientes/s; 'vaciado' = espera tras la ruta por dict hasta escribir la cola)")
+        print(f"{'logging':<20}{'por dict':>12}{'lote':>12}{'vaciado s':>11}")
+        for etiqueta, preparar, restaurar in modos_log(modulo_promociones, carpeta):
+            preparar()
+            inicio = time.perf_counter()
+            por_dict(fuentes)
+            s_dict = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            esperar_cola()
+            s_vaciado = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            promociones_lote(clientes)
+            s_lote = time.perf_counter() - inicio
+            esperar_cola()
+            restaurar()
+            print(f"{etiqueta:<20}{n / s_dict:>12,.0f}{n / s_lote:>12,.0f}{s_vaciado:>11.2f}")
+        log.setLevel("INFO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# bench_remoto.py
+# ░ Descarga del censo contra un servidor HTTP local: bytes por arranque y comportamiento ante caídas ░
+#
+# Uso:
+#   python benchmarks/bench_remoto.py                  # censo sintético de 100k filas
+#   python benchmarks/bench_remoto.py --filas 1m
+#
+# El servidor local imita al bucket de GCS: ETag, Last-Modified, gzip si el cliente lo acepta,
+# 304 ante If-None-Match / If-Modified-Since y 503 cuando se simula una caída. Cada escenario es
+# un arranque nuevo (proceso hijo) que comparte la caché de disco con los anteriores; se reportan
+# peticiones y bytes recibidos por arranque. Termina con código 1 si algún escenario no se
+# comporta como se espera (sirve como prueba de modulo_remoto sin red).
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RUTA_REPO)
+sys.path.insert(0, RUTA_BENCH)
+
+
+class ServidorCenso:
+    """Recurso único /censo_inegi.csv con validadores, gzip y caída simulada."""
+
+    def __init__(self, contenido: bytes):
+        self.caido = False
+        self.peticiones = []
+        self.publicar(contenido)
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.atender(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}/censo_inegi.csv"
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def publicar(self, contenido: bytes):
+        self.contenido = contenido
+        self.comprimido = gzip.compress(contenido, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(contenido).hexdigest()[:16] + '"'
+        self.modificado = formatdate(time.time(), usegmt=True)
+
+    def atender(self, peticion):
+        condicional = peticion.headers.get("If-None-Match") or peticion.headers.get("If-Modified-Since")
+        if self.caido:
+            estado, cuerpo, cabeceras = 503, b"", {}
+        elif condicional and (peticion.headers.get("If-None-Match") == self.etag or
+                              (not peticion.headers.get("If-None-Match") and
+                               peticion.headers.get("If-Modified-Since") == self.modificado)):
+            estado, cuerpo, cabeceras = 304, b"", {"ETag": self.etag}
+        elif "gzip" in peticion.headers.get("Accept-Encoding", ""):
+            estado, cuerpo, cabeceras = 200, self.comprimido, {"Content-Encoding": "gzip"}
+        else:
+            estado, cuerpo, cabeceras = 200, self.contenido, {}
+        if estado == 200:
+            cabeceras.update({"ETag": self.etag, "Last-Modified": self.modificado, "Content-Type": "text/csv"})
+        self.peticiones.append({"estado": estado, "bytes": len(cuerpo), "condicional": bool(condicional)})
+        peticion.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            peticion.send_header(nombre, valor)
+        peticion.send_header("Content-Length", str(len(cuerpo)))
+        peticion.end_headers()
+        peticion.wfile.write(cuerpo)
+
+    def cerrar(self):
+        self._http.shutdown()
+
+
+def hijo(url):
+    """Un arranque: obtiene el censo, lo lee como el script y reporta lo transferido."""
+    import pandas as pd
+
+    from modulo_remoto import estadisticas_remoto, obtener
+
+    inicio = time.perf_counter()
+    try:
+        descarga = obtener(url)
+        filas = len(pd.read_csv(descarga.ruta, encoding="utf-8-sig"))
+        resultado = {"origen": descarga.origen, "bytes_red": descarga.bytes_red, "filas": filas,
+                     "error": descarga.error}
+    except Exception as e:
+        resultado = {"origen": "error", "bytes_red": 0, "filas": 0, "error": type(e).__name__}
+    resultado["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    # La revalidación en segundo plano termina antes de reportar
+    for hilo in threading.enumerate():
+        if hilo.name == "revalidar-remoto":
+            hilo.join()
+    resultado["estadisticas"] = estadisticas_remoto()
+    print(json.dumps(resultado))
+
+
+def arrancar(url, cache, max_edad, ventana):
+    entorno = dict(os.environ, MADOLI_RUTA_CACHE_REMOTA=cache, MADOLI_MAX_EDAD_REMOTA=str(max_edad),
+                   MADOLI_VENTANA_OBSOLETA=str(ventana))
+    salida = subprocess.run([sys.executable, __file__, "--hijo", url], env=entorno, cwd=RUTA_REPO,
+                            capture_output=True, text=True)
+    if salida.returncode != 0:
+        return {"origen": "fallo", "error": (salida.stderr.strip().splitlines() or ["sin salida"])[-1]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", default="100000", help="filas del censo sintético (10k, 1m o entero)")
+    parser.add_argument("--hijo")
+    args = parser.parse_args()
+
+    if args.hijo:
+        hijo(args.hijo)
+        return
+
+    from generar_sinteticos import filas_de, generar
+
+    raiz = tempfile.mkdtemp(prefix="madoli_remoto_")
+    try:
+        generar(filas_de(args.filas), raiz, archivos=("censo_inegi.csv",))
+        with open(os.path.join(raiz, "censo_inegi.csv"), "rb") as f:
+            contenido = f.read()
+        servidor = ServidorCenso(contenido)
+        cache = os.path.join(raiz, "cache")
+        cache_vacia = os.path.join(raiz, "cache_vacia")
+
+        def cambiar():
+            servidor.publicar(contenido + contenido.splitlines(keepends=True)[-1])
+
+        def caer():
+            servidor.caido = True
+
+        # (nombre, preparación, caché, max_edad, ventana, origen esperado, ¿hay petición?, ¿viaja cuerpo?)
+        escenarios = [
+            ("arranque en frío", None, cache, 900, 0, "red", True, True),
+            ("reinicio, copia fresca", None, cache, 900, 0, "fresca", False, False),
+            ("reinicio, copia vencida", None, cache, 0, 0, "revalidada", True, False),
+            ("censo actualizado", cambiar, cache, 0, 0, "red", True, True),
+            ("copia vencida en ventana", None, cache, 0, 3_600, "obsoleta", True, False),
+            ("servidor caído con copia", caer, cache, 0, 0, "obsoleta", True, False),
+            ("servidor caído sin copia", None, cache_vacia, 0, 0, "error", True, False),
+        ]
+
+        fallas = []
+        print(f"{'escenario':<28}{'origen':<12}{'peticiones':>11}{'KB red':>10}{'KB cuerpo':>11}{'ms':>9}")
+        for nombre, preparar, carpeta, max_edad, ventana, esperado, con_peticion, con_cuerpo in escenarios:
+            if preparar:
+                preparar()
+            previas = len(servidor.peticiones)
+            resultado = arrancar(servidor.url, carpeta, max_edad, ventana)
+            peticiones = servidor.peticiones[previas:]
+            kb_red = sum(p["bytes"] for p in peticiones) / 1024
+            estadisticas = (resultado.get("estadisticas") or [{}])[0]
+            print(f"{nombre:<28}{resultado['origen']:<12}{len(peticiones):>11}{kb_red:>10,.1f}"
+                  f"{estadisticas.get('bytes_cuerpo', 0) / 1024:>11,.1f}{resultado.get('ms', 0):>9,.1f}")
+            if resultado["origen"] != esperado:
+                fallas.append(f"{nombre}: origen {resultado['origen']} (esperado {esperado}) {resultado.get('error')}")
+            if bool(peticiones) != con_peticion or (kb_red > 0) != con_cuerpo:
+                fallas.append(f"{nombre}: {len(peticiones)} peticiones, {kb_red:.1f} KB")
+        # Una falla sin copia no deja nada en la caché
+        if os.path.isdir(cache_vacia) and [n for n in os.listdir(cache_vacia) if not n.endswith(".tmp")]:
+            fallas.append("servidor caído sin copia: la falla quedó en la caché de disco")
+        servidor.cerrar()
+        print(f"\nCenso: {len(contenido) / 1024:,.1f} KB sin comprimir · "
+              f"{len(servidor.comprimido) / 1024:,.1f} KB con gzip")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+    if fallas:
+        print("\n❌ Escenarios con comportamiento inesperado:")
+        for falla in fallas:
+            print(f"   {falla}")
+        sys.exit(1)
+    print("\n✅ Todos los escenarios se comportan como se espera.")
+
+
+if __name__ == "__main__":
+    main()
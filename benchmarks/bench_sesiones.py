@@ -0,0 +1,298 @@
+# bench_sesiones.py
+# ░ RSS del servidor Streamlit contra número de sesiones concurrentes ░
+#
+# Uso:
+#   python benchmarks/bench_sesiones.py                                   # 100k filas, 1/4/8/12 sesiones × 3
+#   python benchmarks/bench_sesiones.py --escala 1m --sesiones 1 4 16 --repeticiones 5 --datos /tmp/madoli_sinteticos
+#
+# Cada medición levanta un 'streamlit run' real y le conecta clientes por websocket (el mismo
+# protocolo que el navegador). Una sesión de calentamiento hace la primera visita (lee las bases,
+# construye índices, cubo y modelo) y se cierra; luego N sesiones simultáneas recorren todas las
+# pestañas. Se reporta el RSS del servidor sobre el proceso caliente: el pico mientras las N
+# sesiones corren y el que queda con las N abiertas. Las bases viven una sola vez en la caché de
+# proceso; lo que crece con N es el trabajo propio de cada sesión. Cada N se mide --repeticiones
+# veces (un servidor nuevo por medición) y la pendiente se ajusta sobre la mediana de cada N: el
+# ruido de malloc de una sola corrida es del orden de la diferencia que se quiere detectar.
+# Termina con código 1 si esa pendiente supera --max-mb-sesion más --max-fraccion del tamaño de
+# las bases, o si alguna sesión falla.
+# El censo se sirve con el servidor HTTP local de bench_remoto (sin red).
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RUTA_REPO)
+sys.path.insert(0, RUTA_BENCH)
+
+from bench_pestanas import _preparar_datos  # noqa: E402
+
+PESTANAS = ["📊 KPIs Generales", "🗂️ Perfil por Cliente", "🌎 Territorial",
+            "🏢 Sectorial", "🧠 IA Predictiva", "📜 Bitácora Técnica"]
+TIMEOUT_CORRIDA = 1_800
+# Pendiente de la ruta compartida (mediana de 5, README): 8.2-11.7 MB con 10.5 MB de bases y
+# 20.6-23.2 MB con 105.5 MB; las copias por sesión daban 54.5 MB. El límite queda por encima del
+# máximo compartido y a medio camino de las copias: 17.1 MB a 10k, 36.1 MB a 100k.
+MAX_MB_SESION = 15.0
+MAX_FRACCION = 0.20
+
+
+# 📏 Memoria del servidor (Linux)
+def _status_mb(pid, campo):
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def _reiniciar_pico(pid):
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# 🔌 Cliente de sesión (protocolo websocket de Streamlit)
+class Sesion:
+    def __init__(self, puerto):
+        self.url = f"ws://127.0.0.1:{puerto}/_stcore/stream"
+        self.id_pestanas = None
+        self.errores = []
+
+    async def __aenter__(self):
+        import websockets
+
+        self._ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None,
+                                            open_timeout=60, ping_interval=None)
+        return self
+
+    async def __aexit__(self, *args):
+        await self._ws.close()
+
+    async def correr(self, pestana=None):
+        """Un rerun; con 'pestana' se envía el estado del widget de pestañas. Devuelve el texto de avisos."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        mensaje = BackMsg()
+        mensaje.rerun_script.query_string = ""
+        mensaje.rerun_script.page_script_hash = ""
+        if pestana is not None and self.id_pestanas:
+            estado = mensaje.rerun_script.widget_states.widgets.add()
+            estado.id = self.id_pestanas
+            estado.string_value = pestana
+        await self._ws.send(mensaje.SerializeToString())
+
+        avisos = []
+        while True:
+            recibido = ForwardMsg()
+            recibido.ParseFromString(await asyncio.wait_for(self._ws.recv(), TIMEOUT_CORRIDA))
+            tipo = recibido.WhichOneof("type")
+            if tipo == "script_finished":
+                return " ".join(avisos)
+            if tipo != "delta":
+                continue
+            delta = recibido.delta
+            if delta.WhichOneof("type") == "add_block" and delta.add_block.WhichOneof("type") == "tab_container":
+                self.id_pestanas = delta.add_block.id
+            elif delta.WhichOneof("type") == "new_element":
+                elemento = delta.new_element
+                if elemento.WhichOneof("type") == "exception":
+                    self.errores.append(f"{elemento.exception.type}: {elemento.exception.message}")
+                elif elemento.WhichOneof("type") == "alert":
+                    avisos.append(elemento.alert.body)
+                    if elemento.alert.format == elemento.alert.ERROR:
+                        self.errores.append(elemento.alert.body)
+
+    async def recorrer(self):
+        """Abre el tablero y visita cada pestaña, como un usuario."""
+        await self.correr()
+        for pestana in PESTANAS[1:]:
+            avisos = await self.correr(pestana)
+            # El modelo de segmentación se entrena en segundo plano en la primera visita
+            while "Entrenando" in avisos:
+                await asyncio.sleep(0.5)
+                avisos = await self.correr(pestana)
+
+
+async def _medir_sesiones(puerto, pid, n):
+    async with Sesion(puerto) as calentamiento:
+        await calentamiento.recorrer()
+    errores = list(calentamiento.errores)
+    await asyncio.sleep(1)
+    rss_inicial = _status_mb(pid, "VmRSS")
+    _reiniciar_pico(pid)
+
+    sesiones = [Sesion(puerto) for _ in range(n)]
+    abiertas = [await s.__aenter__() for s in sesiones]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(s.recorrer() for s in abiertas))
+    segundos = time.perf_counter() - inicio
+    pico = max(0.0, _status_mb(pid, "VmHWM") - rss_inicial)
+    await asyncio.sleep(1)
+    con_sesiones = max(0.0, _status_mb(pid, "VmRSS") - rss_inicial)
+    for s in abiertas:
+        await s.__aexit__()
+        errores += s.errores
+    return {"sesiones": n, "base_mb": round(rss_inicial, 1), "pico_mb": round(pico, 1),
+            "abiertas_mb": round(con_sesiones, 1), "segundos": round(segundos, 2), "errores": errores[:5]}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir(n, entorno):
+    """Levanta el servidor, mide N sesiones y lo detiene."""
+    puerto = _puerto_libre()
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(RUTA_REPO, "madoli360_streamlit.py"),
+         "--server.headless", "true", "--server.port", str(puerto), "--browser.gatherUsageStats", "false"],
+        env=entorno, cwd=RUTA_REPO, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        for _ in range(300):
+            with socket.socket() as s:
+                if s.connect_ex(("127.0.0.1", puerto)) == 0:
+                    break
+            if servidor.poll() is not None:
+                return {"error": (servidor.stderr.read().strip().splitlines() or ["sin salida"])[-1]}
+            time.sleep(0.2)
+        return asyncio.run(_medir_sesiones(puerto, servidor.pid, n))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        servidor.terminate()
+        try:
+            servidor.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            servidor.kill()
+
+
+def _bases_mb(carpeta, entorno):
+    """MB en memoria de las bases que comparten las sesiones (como las deja la caché de proceso)."""
+    codigo = (
+        "from modulo_carga import cargar_base\n"
+        "import os, pandas as pd\n"
+        "bases = [cargar_base('madoli_base.csv'), cargar_base('denue.csv', alternativas=('empresa.csv',)),\n"
+        "         cargar_base('ventas_sectoriales.csv'), pd.read_csv(os.environ['CENSO'], encoding='utf-8-sig')]\n"
+        "print(sum(df.memory_usage(deep=True).sum() for df in bases) / 1024 ** 2)\n"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RUTA_REPO, capture_output=True, text=True,
+                            env=dict(entorno, CENSO=os.path.join(carpeta, "censo_inegi.csv")), check=True)
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def _pendiente(puntos):
+    """MB por sesión adicional (mínimos cuadrados sobre (sesiones, MB))."""
+    if len(puntos) < 2:
+        return None
+    media_x = sum(x for x, _ in puntos) / len(puntos)
+    media_y = sum(y for _, y in puntos) / len(puntos)
+    varianza = sum((x - media_x) ** 2 for x, _ in puntos)
+    return sum((x - media_x) * (y - media_y) for x, y in puntos) / varianza if varianza else None
+
+
+def _mediana(valores):
+    valores = sorted(valores)
+    mitad = len(valores) // 2
+    return valores[mitad] if len(valores) % 2 else (valores[mitad - 1] + valores[mitad]) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", default="100000", help="10k, 1m o entero")
+    parser.add_argument("--sesiones", nargs="+", type=int, default=[1, 4, 8, 12])
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="mediciones por número de sesiones; la pendiente usa la mediana")
+    parser.add_argument("--datos", help="carpeta donde generar/reutilizar las bases")
+    # Presupuesto por sesión adicional: parte fija (lo que Streamlit serializa por sesión) + fracción de las bases
+    parser.add_argument("--max-mb-sesion", type=float, default=MAX_MB_SESION,
+                        help="parte fija del pico por sesión adicional, en MB")
+    parser.add_argument("--max-fraccion", type=float, default=MAX_FRACCION,
+                        help="parte proporcional del pico por sesión adicional, como fracción de las bases")
+    parser.add_argument("--salida", help="guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    from bench_remoto import ServidorCenso
+
+    raiz = args.datos or tempfile.mkdtemp(prefix="madoli_bench_")
+    carpeta = os.path.join(raiz, str(args.escala))
+    resultados, fallas = [], []
+    servidor_censo = None
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        _preparar_datos(args.escala, carpeta)
+        with open(os.path.join(carpeta, "censo_inegi.csv"), "rb") as f:
+            servidor_censo = ServidorCenso(f.read())
+        entorno = dict(os.environ, MADOLI_RUTA_DATOS=carpeta, MADOLI_RUTA_SNAPSHOTS=os.path.join(carpeta, "snapshots"),
+                       MADOLI_RUTA_LOGS=carpeta, MADOLI_RUTA_EXPORTES=os.path.join(carpeta, "exportes"),
+                       MADOLI_RUTA_CACHE_REMOTA=os.path.join(carpeta, "cache_remota"),
+                       MADOLI_URL_CENSO=servidor_censo.url)
+        # Snapshots al día: la sesión de calentamiento mide lo mismo en cada servidor
+        subprocess.run([sys.executable, os.path.join(RUTA_REPO, "modulo_snapshots.py"),
+                        "madoli_base.csv", "ventas_sectoriales.csv"],
+                       env=entorno, cwd=RUTA_REPO, capture_output=True, check=True)
+        bases_mb = _bases_mb(carpeta, entorno)
+
+        print(f"Bases compartidas: {bases_mb:,.1f} MB en memoria\n")
+        print(f"{'rep':>4}{'sesiones':>9}{'RSS base MB':>13}{'pico MB':>10}{'abiertas MB':>13}{'segundos':>10}")
+        for repeticion in range(args.repeticiones):
+            for n in args.sesiones:
+                resultado = dict(medir(n, entorno), sesiones=n, repeticion=repeticion)
+                resultados.append(resultado)
+                if "error" in resultado:
+                    print(f"{repeticion:>4}{n:>9}  ERROR {resultado['error']}")
+                    fallas.append(f"{n} sesiones: {resultado['error']}")
+                    continue
+                print(f"{repeticion:>4}{n:>9}{resultado['base_mb']:>13,.1f}{resultado['pico_mb']:>10,.1f}"
+                      f"{resultado['abiertas_mb']:>13,.1f}{resultado['segundos']:>10,.2f}")
+                fallas += [f"{n} sesiones: {e}" for e in resultado["errores"]]
+    finally:
+        if servidor_censo is not None:
+            servidor_censo.cerrar()
+        if not args.datos:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    validos = [r for r in resultados if "error" not in r]
+    picos = {}
+    for r in validos:
+        picos.setdefault(r["sesiones"], []).append(r["pico_mb"])
+    pendiente = _pendiente([(n, _mediana(v)) for n, v in picos.items()])
+    por_repeticion = [p for p in (_pendiente([(r["sesiones"], r["pico_mb"]) for r in validos if r["repeticion"] == k])
+                                  for k in range(args.repeticiones)) if p is not None]
+    if pendiente is not None:
+        limite = args.max_mb_sesion + args.max_fraccion * bases_mb
+        dispersion = f"; por repetición {min(por_repeticion):,.1f}–{max(por_repeticion):,.1f}" if por_repeticion else ""
+        print(f"\nPico por sesión adicional (mediana de {args.repeticiones}): {pendiente:,.1f} MB "
+              f"({pendiente / bases_mb:.0%} de las bases{dispersion}; límite {limite:,.1f} MB)")
+        if pendiente > limite:
+            fallas.append(f"{pendiente:,.1f} MB por sesión > {args.max_mb_sesion:,.0f} MB + "
+                          f"{args.max_fraccion:.0%} de las bases ({limite:,.1f} MB)")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump({"bases_mb": bases_mb, "pendiente_mb": pendiente, "pendientes_repeticion": por_repeticion,
+                       "mediciones": resultados}, f, indent=2)
+    if fallas:
+        print("\n❌ Fallas:")
+        for falla in fallas:
+            print(f"   {falla}")
+        sys.exit(1)
+    print("\n✅ Las sesiones comparten las bases.")
+
+
+if __name__ == "__main__":
+    main()
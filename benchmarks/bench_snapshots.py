@@ -0,0 +1,100 @@
+# bench_snapshots.py
+# ░ Tiempo de carga y RSS: ruta CSV + homologación vs snapshot Parquet ░
+#
+# Uso:
+#   python benchmarks/bench_snapshots.py --filas 500000
+#
+# Cada medición corre en un proceso hijo para que el pico de RSS sea propio.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+BASES = ("madoli_base.csv", "empresa.csv", "ventas_sectoriales.csv")
+
+
+def _rss_mb():
+    # VmHWM (pico de RSS del proceso); ru_maxrss arrastra el pico del padre tras fork
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def escalar_csv(nombre, filas, destino):
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(RUTA_REPO, nombre), encoding="utf-8-sig")
+    repeticiones = max(1, -(-filas // len(df)))
+    df = pd.concat([df] * repeticiones, ignore_index=True).iloc[:filas]
+    df.to_csv(os.path.join(destino, nombre), index=False, encoding="utf-8-sig")
+
+
+def hijo(modo, nombre, columnas):
+    import pandas as pd
+    from modulo_carga import leer_snapshot, ruta_snapshot
+    from modulo_homologacion import homologar
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    if modo == "csv":
+        df = homologar(nombre, pd.read_csv(os.path.join(os.environ["MADOLI_RUTA_DATOS"], nombre),
+                                           encoding="utf-8-sig"))
+    else:
+        df = leer_snapshot(ruta_snapshot(nombre), columnas)
+    ms = (time.perf_counter() - inicio) * 1000
+    print(f"{ms:.1f} {_rss_mb() - rss_inicial:.1f} {len(df)}")
+
+
+def medir(modo, nombre, entorno, columnas=None):
+    args = [sys.executable, __file__, "--hijo", modo, "--base", nombre]
+    if columnas:
+        args += ["--columnas", ",".join(columnas)]
+    salida = subprocess.run(args, env=entorno, capture_output=True, text=True, check=True).stdout
+    ms, rss, filas = salida.split()
+    return float(ms), float(rss), int(filas)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--hijo")
+    parser.add_argument("--base")
+    parser.add_argument("--columnas")
+    args = parser.parse_args()
+
+    if args.hijo:
+        hijo(args.hijo, args.base, args.columnas.split(",") if args.columnas else None)
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        entorno = dict(os.environ, MADOLI_RUTA_DATOS=carpeta,
+                       MADOLI_RUTA_SNAPSHOTS=os.path.join(carpeta, "snapshots"))
+        os.environ.update(entorno)
+        from modulo_snapshots import construir_snapshot
+
+        print(f"{'base':<26}{'modo':<22}{'ms':>10}{'ΔRSS MB':>10}{'filas':>10}")
+        for nombre in BASES:
+            escalar_csv(nombre, args.filas, carpeta)
+            logico = "denue.csv" if nombre == "empresa.csv" else nombre
+            os.replace(os.path.join(carpeta, nombre), os.path.join(carpeta, logico))
+            construir_snapshot(logico, forzar=True)
+
+            mediciones = [("csv", None), ("snapshot", None)]
+            if logico == "denue.csv":
+                mediciones.append(("snapshot", ["nombre", "giro", "municipio", "latitude", "longitude"]))
+            for modo, columnas in mediciones:
+                ms, rss, filas = medir(modo, logico, entorno, columnas)
+                etiqueta = modo + (f" ({len(columnas)} cols)" if columnas else "")
+                print(f"{logico:<26}{etiqueta:<22}{ms:>10.1f}{rss:>10.1f}{filas:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# generar_sinteticos.py
+# ░ Bases sintéticas con el esquema de las reales: madoli_base, empresa (DENUE), ventas y censo ░
+#
+# Uso:
+#   python benchmarks/generar_sinteticos.py --filas 1000000 --destino /tmp/madoli_1m
+#
+# Las columnas (nombres, orden, encabezados con mojibake incluidos) salen de los CSV del
+# repositorio. Las categorías de baja cardinalidad se muestrean por fila completa de la
+# plantilla, así que Ramo/Subramo/producto o SCIAN/actividad siguen siendo coherentes;
+# las de alta cardinalidad (nombres, correos, direcciones) reciben un sufijo único.
+# Se escribe por bloques: 10M de filas no se materializan en memoria.
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RUTA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RUTA_REPO)
+
+FILAS_BLOQUE = 500_000
+# Proporciones de la plantilla: 68 clientes en 91 pólizas
+CLIENTES_POR_POLIZA = 0.75
+MUNICIPIOS = 2_469
+ENTIDADES = 32
+ASEGURADORAS_VENTAS = 40
+PATRON_FECHA = re.compile(r"^\d{1,2}/\d{1,2}/\d{2}( 0:00)?$")
+# Columnas con más de esta proporción de valores distintos en la plantilla se tratan como texto libre
+RATIO_TEXTO_LIBRE = 0.5
+# Proporción de valores que deben parecer fecha o número para tipar la columna así (la plantilla trae basura)
+RATIO_TIPO = 0.5
+
+ESCALAS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+ARCHIVOS = ("madoli_base.csv", "empresa.csv", "ventas_sectoriales.csv", "censo_inegi.csv")
+
+
+def filas_de(escala) -> int:
+    """'10k', '1m', '10m' o un entero."""
+    return ESCALAS.get(str(escala).lower()) or int(escala)
+
+
+# 🧬 Perfil de columnas de la plantilla
+def _perfil(muestra: pd.DataFrame) -> dict:
+    perfil = {}
+    for col in muestra.columns:
+        valores = muestra[col].dropna()
+        valores = valores[valores.str.strip() != ""]
+        if valores.empty:
+            perfil[col] = ("vacia", None)
+            continue
+        if valores.map(lambda v: bool(PATRON_FECHA.match(v))).mean() >= RATIO_TIPO:
+            fechas = pd.to_datetime(valores.str.slice(0, 8), format="%d/%m/%y", errors="coerce").dropna()
+            formato = "%d/%m/%y" + (" 0:00" if valores.str.endswith(" 0:00").any() else "")
+            perfil[col] = ("fecha", (fechas.min(), fechas.max(), formato))
+            continue
+        distintos = valores.nunique() / len(valores)
+        numeros = pd.to_numeric(valores, errors="coerce")
+        if numeros.notna().mean() >= RATIO_TIPO and distintos > RATIO_TEXTO_LIBRE:
+            numeros = numeros.dropna()
+            entero = bool((numeros == numeros.round()).all())
+            perfil[col] = ("numerica", (float(numeros.min()), float(numeros.max()), entero))
+        elif distintos > RATIO_TEXTO_LIBRE:
+            perfil[col] = ("texto", muestra[col].to_numpy(dtype=object))
+        else:
+            perfil[col] = ("categoria", muestra[col].to_numpy(dtype=object))
+    return perfil
+
+
+def _catalogo_fechas(inicio, fin, formato="%d/%m/%y"):
+    """Texto de cada día del rango: formatear unos miles de días y luego indexar (strftime por fila es lento)."""
+    return pd.date_range(inicio, max(fin, inicio), freq="D").strftime(formato).to_numpy(dtype=object)
+
+
+def _fechas(rng, n, inicio, fin, formato):
+    catalogo = _catalogo_fechas(inicio, fin, formato)
+    return catalogo[rng.integers(0, len(catalogo), n)]
+
+
+def _con_sufijo(base, numeros):
+    """Valor de la plantilla + número único; los nulos de la plantilla siguen nulos."""
+    return pd.Series(base).str.cat(pd.Series(numeros).astype(str), sep=" ").to_numpy(dtype=object)
+
+
+def _bloque(perfil, rng, n, desde, especiales) -> dict:
+    fila = rng.integers(0, len(next(v for t, v in perfil.values() if t in ("categoria", "texto"))), n)
+    columnas = {}
+    for col, (tipo, datos) in perfil.items():
+        if col in especiales:
+            columnas[col] = especiales[col]
+        elif tipo == "vacia":
+            columnas[col] = np.full(n, None, dtype=object)
+        elif tipo == "fecha":
+            columnas[col] = _fechas(rng, n, *datos)
+        elif tipo == "numerica":
+            minimo, maximo, entero = datos
+            if entero:
+                columnas[col] = rng.integers(int(minimo), int(maximo) + 1, n)
+            else:
+                columnas[col] = np.round(rng.uniform(minimo, maximo, n), 2)
+        elif tipo == "texto":
+            columnas[col] = _con_sufijo(datos[fila], np.arange(desde, desde + n))
+        else:
+            columnas[col] = datos[fila]
+    return columnas
+
+
+def _escribir(ruta, columnas_orden, bloques):
+    """Escribe los bloques (dicts columna → arreglo) como CSV con pyarrow, uno tras otro."""
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+
+    escritor = None
+    try:
+        for bloque in bloques:
+            tabla = pa.table({c: pa.array(bloque[c], from_pandas=True) for c in columnas_orden})
+            tabla = tabla.cast(pa.schema([(c, pa.string()) for c in columnas_orden]))
+            if escritor is None:
+                escritor = pcsv.CSVWriter(ruta, tabla.schema)
+            escritor.write_table(tabla)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _plantilla(nombre):
+    return pd.read_csv(os.path.join(RUTA_REPO, nombre), encoding="utf-8-sig", dtype=str, keep_default_na=False,
+                       na_values=[""])
+
+
+def _municipios(rng):
+    """Catálogo de municipios: los de la plantilla DENUE (con su mojibake) más sintéticos por entidad."""
+    reales = _plantilla("empresa.csv")["municipio"].dropna().unique()
+    entidad = np.arange(MUNICIPIOS) % ENTIDADES + 1
+    nombres = np.array([f"Municipio {e:02d}-{i:04d}" for i, e in enumerate(entidad)], dtype=object)
+    nombres[:len(reales)] = reales
+    centro_lat = rng.uniform(14.5, 32.7, MUNICIPIOS)
+    centro_lon = rng.uniform(-117.0, -86.7, MUNICIPIOS)
+    # Concentración tipo Zipf: pocos municipios reúnen la mayoría de registros
+    peso = 1.0 / (np.arange(MUNICIPIOS) + 10)
+    return {"nombre": nombres, "entidad": entidad, "lat": centro_lat, "lon": centro_lon, "p": peso / peso.sum()}
+
+
+# 🏦 Generadores por base
+def generar_base(filas, ruta, rng):
+    muestra = _plantilla("madoli_base.csv")
+    perfil = _perfil(muestra)
+    clientes = max(1, int(filas * CLIENTES_POR_POLIZA))
+    prefijos = muestra["id_prefix"].dropna().unique().astype(object)
+    nombres = muestra["contractor_name"].dropna().unique().astype(object)
+    lat_cli = rng.uniform(19.2, 19.6, clientes)
+    lon_cli = rng.uniform(-99.3, -98.9, clientes)
+    dias = _catalogo_fechas(pd.Timestamp("2019-01-01"), pd.Timestamp("2026-01-01"))
+
+    def bloques():
+        for desde in range(0, filas, FILAS_BLOQUE):
+            n = min(FILAS_BLOQUE, filas - desde)
+            cliente = rng.integers(0, clientes, n)
+            prefijo = prefijos[cliente % len(prefijos)]
+            id_cliente = pd.Series(prefijo).str.cat(pd.Series(cliente.astype(str)).str.zfill(7)).to_numpy(dtype=object)
+            nombre = _con_sufijo(nombres[cliente % len(nombres)], cliente)
+            inicio = rng.integers(0, 6 * 365, n)
+            fin = inicio + 365 + rng.integers(0, 2, n)
+            prima = np.round(rng.lognormal(np.log(8_000), 1.0, n), 2)
+            especiales = {
+                "id_cliente": id_cliente, "id_prefix": prefijo,
+                "contractor_name": nombre, "Solicitud": nombre,
+                "policy_number": np.char.add("POL", np.arange(desde, desde + n).astype(str)).astype(object),
+                "start_date": dias[inicio], "end_date": dias[fin],
+                "premium_mxn": prima, "total_premium": prima, "net_premium": np.round(prima / 1.16, 2),
+                "latitud": np.round(lat_cli[cliente], 6), "longitud": np.round(lon_cli[cliente], 6),
+            }
+            yield _bloque(perfil, rng, n, desde, especiales)
+
+    _escribir(ruta, list(muestra.columns), bloques())
+
+
+def generar_denue(filas, ruta, rng, municipios):
+    muestra = _plantilla("empresa.csv")
+    perfil = _perfil(muestra)
+
+    def bloques():
+        for desde in range(0, filas, FILAS_BLOQUE):
+            n = min(FILAS_BLOQUE, filas - desde)
+            mun = rng.choice(MUNICIPIOS, n, p=municipios["p"])
+            nombre_mun = municipios["nombre"][mun]
+            especiales = {
+                "id_institucional": np.arange(desde, desde + n) + 1_000_000,
+                "Clee": np.char.add("CLEE", np.arange(desde, desde + n).astype(str)).astype(object),
+                "Clave entidad": municipios["entidad"][mun],
+                "id_municipio": mun + 1,
+                "municipio": nombre_mun, "nombre_municipio": nombre_mun,
+                "latitude": np.round(municipios["lat"][mun] + rng.normal(0, 0.05, n), 8),
+                "longitude": np.round(municipios["lon"][mun] + rng.normal(0, 0.05, n), 8),
+            }
+            yield _bloque(perfil, rng, n, desde, especiales)
+
+    _escribir(ruta, list(muestra.columns), bloques())
+
+
+def generar_ventas(filas, ruta, rng):
+    muestra = _plantilla("ventas_sectoriales.csv")
+    perfil = _perfil(muestra)
+    reales = muestra["nombre"].dropna().unique()
+    aseguradoras = np.array(list(reales) + [f"Aseguradora {i:02d}" for i in range(ASEGURADORAS_VENTAS - len(reales))],
+                            dtype=object)
+    giros = np.array(list(muestra["Giro"].dropna().unique()) + ["Vida", "Automóviles", "Daños sin automóviles",
+                                                                "Accidentes y enfermedades"], dtype=object)
+    entidades = np.array(list(muestra["Entidad"].dropna().unique()) + [f"Entidad {i:02d}" for i in range(2, 33)],
+                         dtype=object)
+    # Fin de mes en los últimos cinco años; el corte es el cierre de su trimestre
+    meses = pd.period_range("2020-01", periods=60, freq="M")
+    fin_mes = meses.to_timestamp(how="end").strftime("%d/%m/%y").to_numpy(dtype=object)
+    cierre_trimestre = meses.asfreq("Q").to_timestamp(how="end").strftime("%d/%m/%y").to_numpy(dtype=object)
+
+    def bloques():
+        for desde in range(0, filas, FILAS_BLOQUE):
+            n = min(FILAS_BLOQUE, filas - desde)
+            mes = rng.integers(0, len(fin_mes), n)
+            especiales = {
+                "fecha": fin_mes[mes],
+                "fecha_corte": cierre_trimestre[mes],
+                "nombre": aseguradoras[rng.integers(0, len(aseguradoras), n)],
+                "Giro": giros[rng.integers(0, len(giros), n)],
+                "Entidad": entidades[rng.integers(0, len(entidades), n)],
+            }
+            for medida, media in (("Ventas", 5e6), ("PRIMA_EMI", 6e6), ("SUMA_ASEG", 2e9),
+                                  ("RIESGOS_ASEG_VIG", 5e4), ("NUM_SIN_O_RECLAMACION", 2e3)):
+                especiales[medida] = np.round(rng.lognormal(np.log(media), 1.2, n)).astype(np.int64)
+            yield _bloque(perfil, rng, n, desde, especiales)
+
+    _escribir(ruta, list(muestra.columns), bloques())
+
+
+COLUMNAS_CENSO = ["ENTIDAD", "NOM_ENT", "MUN", "municipio", "LOC", "NOM_LOC", "LONGITUD", "LATITUD", "ALTITUD",
+                  "POBTOT", "POBFEM", "POBMAS", "TOTHOG", "VIVTOT"]
+
+
+def generar_censo(filas, ruta, rng, municipios):
+    """Localidades tipo ITER del Censo 2020, con la columna 'municipio' que espera la homologación."""
+
+    def bloques():
+        for desde in range(0, filas, FILAS_BLOQUE):
+            n = min(FILAS_BLOQUE, filas - desde)
+            mun = rng.choice(MUNICIPIOS, n, p=municipios["p"])
+            poblacion = np.round(rng.lognormal(np.log(400), 1.8, n)).astype(np.int64) + 1
+            mujeres = np.round(poblacion * rng.uniform(0.48, 0.53, n)).astype(np.int64)
+            hogares = np.maximum(1, poblacion // 4)
+            yield {
+                "ENTIDAD": municipios["entidad"][mun], "NOM_ENT": np.char.add("Entidad ", municipios["entidad"][mun].astype(str)),
+                "MUN": mun + 1, "municipio": municipios["nombre"][mun],
+                "LOC": np.arange(desde, desde + n) + 1, "NOM_LOC": np.char.add("Localidad ", np.arange(desde, desde + n).astype(str)),
+                "LONGITUD": np.round(municipios["lon"][mun] + rng.normal(0, 0.1, n), 6),
+                "LATITUD": np.round(municipios["lat"][mun] + rng.normal(0, 0.1, n), 6),
+                "ALTITUD": rng.integers(0, 3_000, n),
+                "POBTOT": poblacion, "POBFEM": mujeres, "POBMAS": poblacion - mujeres,
+                "TOTHOG": hogares, "VIVTOT": hogares + rng.integers(0, 3, n),
+            }
+
+    _escribir(ruta, COLUMNAS_CENSO, bloques())
+
+
+def generar(filas: int, destino: str, semilla: int = 20250803, archivos=ARCHIVOS) -> dict:
+    """Escribe las bases sintéticas en 'destino'. Devuelve segundos por archivo."""
+    os.makedirs(destino, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    municipios = _municipios(rng)
+    generadores = {
+        "madoli_base.csv": lambda ruta: generar_base(filas, ruta, rng),
+        "empresa.csv": lambda ruta: generar_denue(filas, ruta, rng, municipios),
+        "ventas_sectoriales.csv": lambda ruta: generar_ventas(filas, ruta, rng),
+        "censo_inegi.csv": lambda ruta: generar_censo(filas, ruta, rng, municipios),
+    }
+    tiempos = {}
+    for nombre in archivos:
+        inicio = time.perf_counter()
+        ruta = os.path.join(destino, nombre)
+        generadores[nombre](ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+        tiempos[nombre] = time.perf_counter() - inicio
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", default="10k", help="10k, 1m, 10m o un entero")
+    parser.add_argument("--destino", required=True)
+    parser.add_argument("--semilla", type=int, default=20250803)
+    args = parser.parse_args()
+
+    filas = filas_de(args.filas)
+    for nombre, segundos in generar(filas, args.destino, args.semilla).items():
+        tamano = os.path.getsize(os.path.join(args.destino, nombre)) / 1e6
+        print(f"{nombre:<26}{filas:>12,} filas{tamano:>10.1f} MB{segundos:>8.1f} s")
+
+
+if __name__ == "__main__":
+    main()
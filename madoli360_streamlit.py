@@ -5,25 +5,23 @@ Autor: CCPI S.A.S. de C.V.
 Versión: 1.0.0 · Fecha de despliegue: 2025-08-03
 """
 import os
+import modulo_arranque
+# Con MADOLI_PERFIL_ARRANQUE=1 se mide cada import a partir de aquí (ver modulo_arranque)
+modulo_arranque.iniciar()
 import streamlit as st
-import pandas as pd
-import altair as alt
-import plotly.express as px
-from mod_json import generar_respuesta_json
 from datetime import datetime
-from google.cloud import bigquery
 
 # === CONFIGURACIÓN INICIAL ===
 st.set_page_config(page_title="Madoli360", layout="wide")
-bitacora = []
-RUTA_DATOS = "/Users/robertoibarrasuarez/Desktop/homologación_madoli/"
 CREDENCIALES_BIGQUERY = "/Users/robertoibarrasuarez/Desktop/credenciales_gcp.json"
 
 # === PARÁMETROS BUBBLE ===
 query_params = st.query_params
-id_cliente_url = query_params.get("id_cliente", [None])[0]
+# st.query_params devuelve el valor como texto (no lista): indexar [0] truncaba el ID
+id_cliente_url = query_params.get("id_cliente")
 
 # === LOGOS INSTITUCIONALES ===
+# Se dibujan antes de importar pandas y los módulos de datos: el primer pintado no espera esas cargas
 col_logo, col_titulo = st.columns([1, 5])
 with col_logo:
     try:
@@ -33,81 +31,101 @@ with col_logo:
 
 with col_titulo:
     st.markdown("## 🛡️ Madoli360 – Inteligencia Institucional Predictiva")
+modulo_arranque.marcar("primer_pintado")
 
-# === FUNCIÓN GENERAL PARA CARGA DE BASES ===
-def cargar_base(nombre_archivo):
-    path_local = os.path.join(RUTA_DATOS, nombre_archivo)
-    URL_GITHUB_BASE = "https://raw.githubusercontent.com/ibarrasuarez22-ux/madoli360_streamlit/main/"
-    ruta_github = URL_GITHUB_BASE + nombre_archivo
+import pandas as pd
+from mod_json import generar_respuesta_json
+from modulo_clientes import indice_clientes
+from modulo_consultas import aviso_motor, clientes_sql, filtros_sql, motor_consultas, ventas_sql
+from modulo_bitacora import Bitacora
+from modulo_exportes import FORMATOS, descarga_diferida, estadisticas_exportes
+from modulo_espacial import coordenadas_clientes, indice_espacial
+from modulo_filtros import indice_filtros
+from modulo_graficos import agregar_conteo, figura_memorizada, grafico_barras, grafico_plotly
+from modulo_carga import (
+    base_compartida, cargar_base, estadisticas_cache, huella_local, invalidar_cache, leer_snapshot, ruta_snapshot,
+    snapshot_vigente,
+)
+from modulo_esquemas import mapa_ramos
+from modulo_homologacion import homologar
+from modulo_ingesta import reportes_ingesta_df
+from modulo_territorial import territorio
+from modulo_remoto import estadisticas_remoto, obtener
+from modulo_retencion import CLASES, clasificar, ranking_retencion, score_retencion
+from modulo_sectorial import cubo_ventas
+from modulo_segmentacion import ESPERA_REINTENTO, error_segmentacion, segmentar
+
+# Bitácora por sesión: eventos tipados en un buffer acotado que sobrevive a las recargas
+if "bitacora" not in st.session_state:
+    st.session_state["bitacora"] = Bitacora()
+bitacora = st.session_state["bitacora"]
+bitacora.nueva_corrida()
+# Motor de consultas (MADOLI_MOTOR_CONSULTAS): None = índices pandas en memoria; duckdb/sqlite/bigquery = SQL
+motor_sql = motor_consultas()
+if aviso_motor():
+    bitacora.append(f"⚠️ {aviso_motor()}")
+
+# === CARGA DE BASES CLAVE (caché de proceso con huella de fuente) ===
+with bitacora.etapa("carga") as medicion:
+    df_base = cargar_base("madoli_base.csv", bitacora)
+    df_denue = cargar_base("denue.csv", bitacora, alternativas=("empresa.csv",))
+    df_ventas = cargar_base("ventas_sectoriales.csv", bitacora)
+    medicion["filas"] = len(df_base) + len(df_denue) + len(df_ventas)
+
+    # === VALIDACIÓN SILENCIOSA CON LOG INSTITUCIONAL ===
+    if df_base.empty:
+        bitacora.append(f"[{datetime.now()}] ERROR carga madoli_base.csv: base vacía")
+
+    if df_denue.empty:
+        bitacora.append(f"[{datetime.now()}] ERROR carga denue.csv: base vacía")
 
-    try:
-        df = pd.read_csv(path_local, encoding="utf-8")
-        bitacora.append(f"[{datetime.now()}] {nombre_archivo} cargado localmente ({len(df):,} registros)")
-        return df
-    except:
-        bitacora.append(f"[{datetime.now()}] {nombre_archivo} no encontrado en local. Intentando GitHub...")
-        try:
-            df = pd.read_csv(ruta_github, encoding="utf-8")
-            bitacora.append(f"[{datetime.now()}] {nombre_archivo} cargado desde GitHub ({len(df):,} registros)")
-            return df
-        except Exception as e:
-            bitacora.append(f"[{datetime.now()}] ERROR carga {nombre_archivo}: {str(e)}")
-            return pd.DataFrame()
-
-# === CARGA DE BASES CLAVE ===
-df_base = cargar_base("madoli_base.csv")
-df_denue = cargar_base("denue.csv")
-df_ventas = cargar_base("ventas_sectoriales.csv")
-
-# === VALIDACIÓN SILENCIOSA CON LOG INSTITUCIONAL ===
-if df_base.empty:
-    bitacora.append(f"[{datetime.now()}] ERROR carga madoli_base.csv: base vacía")
-
-if df_denue.empty:
-    bitacora.append(f"[{datetime.now()}] ERROR carga denue.csv: base vacía")
-
-if df_ventas.empty:
-    bitacora.append(f"[{datetime.now()}] ERROR carga ventas_sectoriales.csv: base vacía")
-
-# === CARGA DE BASES ===
-def cargar_base(nombre_archivo):
-    # Ruta local
-    path_local = os.path.join(RUTA_DATOS, nombre_archivo)
-
-    # Ruta GitHub
-    URL_GITHUB_BASE = "https://raw.githubusercontent.com/ibarrasuarez22-ux/madoli360_streamlit/main/data/"
-    ruta_github = URL_GITHUB_BASE + nombre_archivo
-
-    # Intento local primero
-    try:
-        return pd.read_csv(path_local, encoding="utf-8")
-    except:
-        st.warning(f"⚠️ No se encontró {nombre_archivo} en local, intentando carga desde GitHub...")
-        try:
-            return pd.read_csv(ruta_github, encoding="utf-8")
-        except Exception as e:
-            st.error(f"⛔ Fallo doble en carga de {nombre_archivo}: {str(e)}")
-            return pd.DataFrame()
+    if df_ventas.empty:
+        bitacora.append(f"[{datetime.now()}] ERROR carga ventas_sectoriales.csv: base vacía")
 
 # === INGESTA CENSO INEGI DESDE GCS (PÚBLICO) ===
 
-URL_CENSO_PUBLICO = "https://storage.googleapis.com/madoli360-archivos/censo_inegi.csv"
-
-def cargar_censo_desde_gcs(url_csv: str) -> pd.DataFrame:
+URL_CENSO_PUBLICO = os.environ.get("MADOLI_URL_CENSO",
+                                   "https://storage.googleapis.com/madoli360-archivos/censo_inegi.csv")
+
+def fuente_censo(url_csv: str):
+    """
+    Copia vigente del censo, consultando primero la caché de disco de modulo_remoto
+    (GET condicional, gzip, stale-while-revalidate). El snapshot local se prefiere
+    sólo si se generó con el mismo ETag; sin red ni copia descargada se usa el
+    snapshot de la versión actual. Devuelve (ruta, huella, descarga o None).
+    Sin ninguna copia el error se propaga.
+    """
+    ruta_snap = ruta_snapshot("censo_inegi.csv")
     try:
-        df_censo = pd.read_csv(url_csv, encoding="utf-8")
-        bitacora.append(f"[{datetime.now()}] Censo INEGI cargado correctamente ({len(df_censo):,} registros)")
-        return df_censo
+        descarga = obtener(url_csv)
+    except Exception:
+        if not snapshot_vigente(ruta_snap):
+            raise
+        return ruta_snap, f"snapshot@{huella_local(ruta_snap)}", None
+    if snapshot_vigente(ruta_snap, huella_origen=descarga.huella):
+        return ruta_snap, f"snapshot@{huella_local(ruta_snap)}", descarga
+    return descarga.ruta, descarga.huella, descarga
+
+def leer_censo(ruta: str, huella: str) -> pd.DataFrame:
+    if huella.startswith("snapshot@"):
+        return leer_snapshot(ruta)
+    return homologar("censo_inegi.csv", pd.read_csv(ruta, encoding="utf-8-sig"))
+
+# Carga institucional: una sola copia en la caché de proceso por huella, compartida por todas
+# las sesiones (sin la copia por corrida de st.cache_data); los errores no se cachean
+with bitacora.etapa("carga") as medicion:
+    try:
+        ruta_censo, huella_censo, descarga_censo = fuente_censo(URL_CENSO_PUBLICO)
+        df_censo = base_compartida("censo_inegi.csv", huella_censo, lambda: leer_censo(ruta_censo, huella_censo),
+                                   origen="snapshot" if huella_censo.startswith("snapshot@") else "gcs", bitacora=bitacora)
+        if descarga_censo is not None:
+            bitacora.append(f"🌐 Censo INEGI: copia {descarga_censo.origen} · "
+                            f"{descarga_censo.bytes_red / 1024:,.1f} KB por red"
+                            + (f" · ⚠️ servidor no disponible ({descarga_censo.error})" if descarga_censo.error else ""))
     except Exception as e:
         bitacora.append(f"[{datetime.now()}] ERROR carga Censo INEGI: {str(e)}")
-        return pd.DataFrame()
-
-@st.cache_data(show_spinner="🔄 Cargando Censo INEGI desde GCS...")
-def cargar_censo_cacheada(url_csv: str) -> pd.DataFrame:
-    return cargar_censo_desde_gcs(url_csv)
-
-# Carga institucional
-df_censo = cargar_censo_cacheada(URL_CENSO_PUBLICO)
+        df_censo = pd.DataFrame()
+    medicion["filas"] = len(df_censo)
 
 # Registro en bitácora (ya fuera de caché)
 if 'bitacora' in globals():
@@ -117,456 +135,597 @@ if 'bitacora' in globals():
         bitacora.append(f"✅ Censo INEGI disponible ({df_censo.shape[0]:,} registros)")
 
 # === NORMALIZACIÓN Y HOMOLOGACIÓN ===
-bitacora = []
-
-for col in ['start_date', 'end_date', 'birth_date']:
-    if col in df_base.columns:
-        df_base[col] = pd.to_datetime(df_base[col], errors='coerce')
-        bitacora.append(f"✔️ Normalizada columna: {col}")
-
-for campo in ['Ramo', 'Subramo', 'product']:
-    if campo in df_base.columns:
-        df_base[campo] = df_base[campo].astype(str).str.strip().str.upper()
-
-mapa_ramos = {
-    'AUTO': 'AUTOS', 'AUTOS PARTICULAR': 'AUTOS', 'CAMIONES': 'AUTOS',
-    'BENEFICIOS': 'BENEFICIOS', 'DAÑOS': 'DAÑOS', 'GMM': 'GMM', 'HOGAR': 'HOGAR',
-    'PMM': 'PMM', 'SALUD': 'SALUD', 'VDA': 'VIDA', 'VIDA': 'VIDA'
-}
-mapa_subramos = {
-    'ACCIDENTES': 'ACCIDENTES', 'AUTOS PARTICULAR': 'AUTOS', 'CAMIONES': 'AUTOS',
-    'GMM INDIVIDUAL / FAMILIA': 'GMM', 'GERENTE GENERAL': 'GERENCIA',
-    'RC': 'RESPONSABILIDAD CIVIL', 'RESPONSABILIDAD CIVIL': 'RESPONSABILIDAD CIVIL',
-    'HOGAR': 'HOGAR', 'YAYA': 'YAYA', 'EDUCATIVO': 'EDUCATIVO',
-    'EMPRESARIAL': 'EMPRESARIAL', 'SALUD': 'SALUD', 'VIDA': 'VIDA'
-}
-df_base['Ramo'] = df_base['Ramo'].replace(mapa_ramos)
-df_base['Subramo'] = df_base['Subramo'].replace(mapa_subramos)
-
-bitacora.append("✔️ Homologación de Ramo y Subramo aplicada")
+# Aplicada (y medida como etapa 'normalizacion') en la ingesta por cargar_base y modulo_homologacion
+# Nombres canónicos del esquema (modulo_esquemas): los alias ya se renombraron en la ingesta
+renombres_base = df_base.attrs.get("madoli_esquema", {})
+col_aseguradora = "source" if "source" in df_base.columns else None
+col_product = "product" if "product" in df_base.columns else None
+
+# El resultado de la homologación se anota una vez por huella de datos, no en cada recarga
+huella_base = df_base.attrs.get("madoli_huella")
+if st.session_state.get("normalizacion_anotada") != huella_base:
+    st.session_state["normalizacion_anotada"] = huella_base
+    for col in ['start_date', 'end_date', 'birth_date']:
+        if col in df_base.columns:
+            bitacora.append(f"✔️ Normalizada columna: {col}")
+
+    if 'Ramo' in df_base.columns:
+        bitacora.append("✔️ Homologación de Ramo y Subramo aplicada")
+
+    if col_product:
+        bitacora.append(f"✅ Columna homologada para 'Producto': '{renombres_base.get(col_product, col_product)}'")
+    else:
+        bitacora.append("⚠️ Columna 'product' no encontrada. Filtro omitido.")
 
 # === TABS INSTITUCIONALES ===
-tabs = st.tabs([
-    "📊 KPIs Generales", "🗂️ Perfil por Cliente", "🌎 Territorial",
-    "🏢 Sectorial", "🧠 IA Predictiva", "📜 Bitácora Técnica"
-])
-# === 📊 KPIs Generales ===
-with tabs[0]:
-    st.header("📈 Panel Estratégico de Pólizas")
+# Con estado (on_change="rerun") sólo se ejecuta el cuerpo de la pestaña seleccionada: cambiar de
+# pestaña provoca un rerun y cada recarga cuesta lo que cuesta el panel visible. Los derivados
+# pesados (índices, cubo, modelo) siguen memorizados por huella entre pestañas y sesiones.
+PESTANAS = ["📊 KPIs Generales", "🗂️ Perfil por Cliente", "🌎 Territorial",
+            "🏢 Sectorial", "🧠 IA Predictiva", "📜 Bitácora Técnica"]
+# Un enlace de Bubble con id_cliente abre directamente el perfil
+tabs = st.tabs(PESTANAS, key="pestana", on_change="rerun", default=PESTANAS[1] if id_cliente_url else None)
 
-    # Homologación aseguradora
-    col_aseguradora = "source" if "source" in df_base.columns else ("aseguradora" if "aseguradora" in df_base.columns else None)
-    col_product = None
 
-    # Homologación de columna 'product'
-    for posible in ["product", "producto", "nombre_producto", "tipo_producto"]:
-        if posible in df_base.columns:
-            col_product = posible
-            bitacora.append(f"✅ Columna homologada para 'Producto': '{posible}'")
-            break
+def pestana_activa(pestana) -> bool:
+    # .open es None si las pestañas no llevan estado: en ese caso se ejecutan todas, como antes
+    return pestana.open is not False
 
-    if not col_product:
-        bitacora.append("⚠️ Columna 'product' no encontrada. Filtro omitido.")
 
-    # Filtros dinámicos
-    filtros = {
-        "Aseguradora": sorted(df_base[col_aseguradora].dropna().unique()) if col_aseguradora else [],
-        "Producto": sorted(df_base[col_product].dropna().unique()) if col_product else [],
-        "Ramo": sorted(df_base['Ramo'].dropna().unique()) if 'Ramo' in df_base.columns else [],
-        "Subramo": sorted(df_base['Subramo'].dropna().unique()) if 'Subramo' in df_base.columns else []
-    }
-
-    seleccion = {
-        clave: st.sidebar.multiselect(clave, valores, default=valores)
-        for clave, valores in filtros.items()
-    }
-
-    # Aplicación de filtros
-    condiciones = (
-        df_base[col_aseguradora].isin(seleccion['Aseguradora']) if col_aseguradora else True
-    ) & (
-        df_base[col_product].isin(seleccion['Producto']) if col_product else True
-    ) & (
-        df_base['Ramo'].isin(seleccion['Ramo']) if 'Ramo' in df_base.columns else True
-    ) & (
-        df_base['Subramo'].isin(seleccion['Subramo']) if 'Subramo' in df_base.columns else True
-    )
-
-    df_kpi = df_base[condiciones].copy()
-
-    # Validación de 'premium_mxn'
-    if 'premium_mxn' in df_kpi.columns:
-        df_kpi['premium_mxn'] = pd.to_numeric(df_kpi['premium_mxn'], errors='coerce')
-        df_kpi = df_kpi[df_kpi['premium_mxn'] > 0]
-        bitacora.append("✅ Validación de 'premium_mxn': valores positivos y numéricos")
-
-    # Métricas y gráficos
-    if df_kpi.empty:
-        st.warning("⚠️ No se encontraron pólizas con los filtros aplicados.")
-    else:
-        col1, col2, col3, col4, col5 = st.columns(5)
+# Los widgets que no se dibujan pierden su estado al final del rerun: se conserva la
+# selección de filtros del sidebar mientras la pestaña KPIs no se ejecuta
+for clave_widget in [k for k in st.session_state if str(k).startswith("filtro_")]:
+    st.session_state[clave_widget] = st.session_state[clave_widget]
 
-        if 'policy_number' in df_kpi.columns:
-            col1.metric("📄 Pólizas", f"{df_kpi['policy_number'].nunique():,}")
-        else:
-            col1.metric("📄 Pólizas", "Columna no disponible")
-            bitacora.append("⚠️ Columna 'policy_number' no presente en vista KPIs")
-
-        col2.metric("👥 Clientes", f"{df_kpi['id_cliente'].nunique():,}" if 'id_cliente' in df_kpi.columns else "N/D")
-        col3.metric("🏢 Aseguradoras", f"{df_kpi[col_aseguradora].nunique():,}" if col_aseguradora in df_kpi.columns else "N/D")
-        col4.metric("🧾 Productos", f"{df_kpi[col_product].nunique():,}" if col_product in df_kpi.columns else "N/D")
-        col5.metric("💰 Prima total MXN", f"${df_kpi['premium_mxn'].sum():,.2f}" if 'premium_mxn' in df_kpi.columns else "$0.00")
-
-        st.subheader("📊 Distribución del Portafolio")
-
-        # Gráficos solo si columnas existen
-        if col_aseguradora and col_aseguradora in df_kpi.columns:
-            graf1 = alt.Chart(df_kpi).mark_bar().encode(
-                x='count()', y=col_aseguradora, color=col_aseguradora
-            ).properties(height=300)
-            st.altair_chart(graf1, use_container_width=True)
-
-        if col_product and col_product in df_kpi.columns:
-            graf2 = alt.Chart(df_kpi).mark_bar().encode(
-                x='count()', y=col_product, color=col_product
-            ).properties(height=300)
-            st.altair_chart(graf2, use_container_width=True)
-   
+# === 📊 KPIs Generales ===
+if pestana_activa(tabs[0]):
+    with tabs[0]:
+        st.header("📈 Panel Estratégico de Pólizas")
+
+        with bitacora.etapa("filtro") as medicion:
+            # 🧮 Índice de celdas por combinación de filtros (compartido por huella de datos)
+            columnas_kpi = {"Aseguradora": col_aseguradora, "Producto": col_product, "Ramo": "Ramo", "Subramo": "Subramo"}
+            metricas_kpi = {"polizas": "policy_number", "clientes": "id_cliente",
+                            "aseguradoras": col_aseguradora, "productos": col_product}
+            if motor_sql is None:
+                indice_kpi, ms_indice = indice_filtros(df_base, columnas_kpi, columnas_metricas=metricas_kpi)
+            else:
+                # Mismas llamadas (valores, kpis, conteos) resueltas con SQL en el motor
+                indice_kpi, ms_indice = filtros_sql(df_base, "madoli_base.csv", motor_sql, columnas_kpi, metricas_kpi)
+            if ms_indice:
+                bitacora.append(f"✅ Índice de filtros KPI ({motor_sql.nombre if motor_sql else 'pandas'}) "
+                                f"construido en {ms_indice:.1f} ms")
+
+            # Filtros dinámicos
+            filtros = {
+                clave: indice_kpi.valores.get(clave, [])
+                for clave in ["Aseguradora", "Producto", "Ramo", "Subramo"]
+            }
+
+            seleccion = {
+                clave: st.sidebar.multiselect(clave, valores, key=f"filtro_{clave}",
+                                              default=None if f"filtro_{clave}" in st.session_state else valores)
+                for clave, valores in filtros.items()
+            }
+
+            # Aplicación de filtros: tabla por código y AND entre columnas, métricas memorizadas por selección
+            inicio_filtro = datetime.now()
+            kpis, kpis_en_cache = indice_kpi.kpis(seleccion)
+            ms_filtro = (datetime.now() - inicio_filtro).total_seconds() * 1000
+            bitacora.append(
+                f"✅ Filtro KPI resuelto en {ms_filtro:.2f} ms ({'memo' if kpis_en_cache else (motor_sql.nombre if motor_sql else 'celdas')}, {kpis['filas']:,} registros)"
+            )
+            medicion["filas"] = kpis['filas']
 
-# === 🗂️ Perfil por Cliente ===
-with tabs[1]:
-    st.title("🧑‍💼 Perfil por Cliente – Madoli360")
+        # Validación de 'premium_mxn'
+        if 'premium_mxn' in df_base.columns:
+            bitacora.append("✅ Validación de 'premium_mxn': valores positivos y numéricos")
 
-    if 'id_cliente' not in df_base.columns:
-        st.error("⛔ La base no contiene la columna 'id_cliente'")
-    else:
-        if id_cliente_url:
-            id_seleccionado = id_cliente_url
-            st.success(f"ID cliente recibido desde Bubble: `{id_seleccionado}`")
+        # Métricas y gráficos
+        if kpis['filas'] == 0:
+            st.warning("⚠️ No se encontraron pólizas con los filtros aplicados.")
         else:
-            id_seleccionado = st.selectbox("Seleccionar cliente (ID)", sorted(df_base['id_cliente'].dropna().unique()))
+            col1, col2, col3, col4, col5 = st.columns(5)
 
-        perfil_df = df_base[df_base['id_cliente'] == id_seleccionado].copy()
+            if 'policy_number' in df_base.columns:
+                col1.metric("📄 Pólizas", f"{kpis['polizas']:,}")
+            else:
+                col1.metric("📄 Pólizas", "Columna no disponible")
+                bitacora.append("⚠️ Columna 'policy_number' no presente en vista KPIs")
 
-        if perfil_df.empty:
-            st.warning("⚠️ No se encontraron pólizas asociadas.")
-        else:
-            nombre = perfil_df['contractor_name'].dropna().iloc[0] if 'contractor_name' in perfil_df.columns else "Sin nombre"
-            st.markdown(f"### 👤 Contratante: `{nombre}`")
-
-            # Validación de prima
-            if 'premium_mxn' in perfil_df.columns:
-                perfil_df['premium_mxn'] = pd.to_numeric(perfil_df['premium_mxn'], errors='coerce')
-                perfil_df = perfil_df[perfil_df['premium_mxn'] > 0]
-
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric("📄 Pólizas", f"{perfil_df.shape[0]}")
-            col2.metric("🏢 Aseguradoras", f"{perfil_df['source'].nunique() if 'source' in perfil_df.columns else 0}")
-            col3.metric("🧾 Productos", f"{perfil_df['product'].nunique() if 'product' in perfil_df.columns else 0}")
-            col4.metric("💰 Prima total MXN", f"${perfil_df['premium_mxn'].sum():,.2f}" if 'premium_mxn' in perfil_df.columns else "$0.00")
-
-            st.subheader("🧠 Score Institucional")
-            total_p = perfil_df.shape[0]
-            diversidad = perfil_df['product'].nunique() if 'product' in perfil_df.columns else 0
-            vencimientos = perfil_df['end_date'].notna().sum() if 'end_date' in perfil_df.columns else 0
-            retencion_score = ((total_p * 0.5) + (diversidad * 0.3) + (vencimientos * 0.2)) / 10
-
-            clasificacion = "En riesgo"
-            if retencion_score >= 7:
-                clasificacion = "Prioritario"
-            elif retencion_score >= 4:
-                clasificacion = "Promotor"
-
-            colr1, colr2 = st.columns([1, 3])
-            colr1.metric("🔄 Score Retención", f"{retencion_score:.2f}")
-            colr2.markdown(f"**Clasificación institucional:** `{clasificacion}`")
-
-            bitacora.append(f"✅ Perfil cliente desplegado: {id_seleccionado} con score {retencion_score:.2f}")
+            col2.metric("👥 Clientes", f"{kpis['clientes']:,}" if 'clientes' in kpis else "N/D")
+            col3.metric("🏢 Aseguradoras", f"{kpis['aseguradoras']:,}" if 'aseguradoras' in kpis else "N/D")
+            col4.metric("🧾 Productos", f"{kpis['productos']:,}" if 'productos' in kpis else "N/D")
+            col5.metric("💰 Prima total MXN", f"${kpis['prima_total']:,.2f}" if kpis['prima_total'] is not None else "$0.00")
 
-# === 🌎 Territorial ===
-with tabs[2]:
-    st.title("🌎 Módulo Territorial")
+            st.subheader("📊 Distribución del Portafolio")
 
-    if df_censo.empty or df_denue.empty:
-        st.warning("⚠️ No se encontraron bases censales o empresariales.")
-        bitacora.append("⚠️ Bases censales o DENUE no disponibles para módulo territorial.")
-    else:
-        # 🔄 Renombrado institucional para compatibilidad
-        if 'latitud' in df_denue.columns and 'longitud' in df_denue.columns:
-            df_denue = df_denue.rename(columns={'latitud': 'latitude', 'longitud': 'longitude'})
-            bitacora.append("✅ Coordenadas renombradas para st.map")
-
-        if 'nombre_empresa' in df_denue.columns:
-            df_denue = df_denue.rename(columns={'nombre_empresa': 'nombre'})
-            bitacora.append("✅ Columna 'nombre_empresa' renombrada a 'nombre'")
-
-        if 'giro' not in df_denue.columns:
-            posibles_giro = ['actividad', 'rama', 'C√≥digo de la clase de actividad SCIAN']
-            for p in posibles_giro:
-                if p in df_denue.columns:
-                    df_denue = df_denue.rename(columns={p: 'giro'})
-                    bitacora.append(f"✅ Columna '{p}' renombrada a 'giro'")
-                    break
-
-        # 📬 Renombres adicionales para dirección y correo
-        renombres_adicionales = {
-            'domicilio': 'direccion',
-            'direccion_empresa': 'direccion',
-            'correo': 'correo_electronico',
-            'email': 'correo_electronico'
-        }
-
-        for col_orig, col_nueva in renombres_adicionales.items():
-            if col_orig in df_denue.columns and col_nueva not in df_denue.columns:
-                df_denue = df_denue.rename(columns={col_orig: col_nueva})
-                bitacora.append(f"✅ Columna '{col_orig}' renombrada a '{col_nueva}'")
-
-        # 🧩 Homologación columna municipio
-        col_municipio_censo = None
-        for posible in ["municipio", "nombre_municipio", "nom_mun", "localidad"]:
-            if posible in df_censo.columns:
-                col_municipio_censo = posible
-                bitacora.append(f"✅ Columna censal homologada: '{posible}'")
-                break
-
-        col_municipio_denue = "municipio" if "municipio" in df_denue.columns else None
-        if col_municipio_denue:
-            bitacora.append("✅ Columna DENUE reconocida como 'municipio'")
+            with bitacora.etapa("grafico", filas=0, bytes=0) as medicion:
+                # Gráficos sobre conteos agregados en servidor (no se envían filas de pólizas)
+                for etiqueta, col_grafico in [("Aseguradora", col_aseguradora), ("Producto", col_product)]:
+                    if col_grafico and etiqueta in indice_kpi.columnas_filtro:
+                        agregado = indice_kpi.conteos(seleccion, etiqueta)
+                        graf, bytes_graf, filas_graf = grafico_barras(agregado, col_grafico)
+                        st.altair_chart(graf, use_container_width=True)
+                        medicion["filas"] += filas_graf
+                        medicion["bytes"] += bytes_graf
+                        bitacora.append(f"📦 Gráfico '{etiqueta}': {filas_graf} filas agregadas · {bytes_graf / 1024:.1f} KB enviados")
+
+
+# === 🗂️ Perfil por Cliente ===
+if pestana_activa(tabs[1]):
+    with tabs[1], bitacora.etapa("perfil"):
+        st.title("🧑‍💼 Perfil por Cliente – Madoli360")
+
+        if 'id_cliente' not in df_base.columns:
+            st.error("⛔ La base no contiene la columna 'id_cliente'")
         else:
-            bitacora.append("⚠️ Columna 'municipio' no presente en df_denue")
-
-        # 🧼 Normalización territorial
-        if col_municipio_censo:
-            df_censo[col_municipio_censo] = df_censo[col_municipio_censo].astype(str).str.upper()
-        if col_municipio_denue:
-            df_denue[col_municipio_denue] = df_denue[col_municipio_denue].astype(str).str.upper()
-        if 'giro' in df_denue.columns:
-            df_denue['giro'] = df_denue['giro'].astype(str).str.upper()
-
-        # 🗺️ Activación selector de municipio
-        if col_municipio_censo and col_municipio_denue:
-            municipios = sorted(df_denue[col_municipio_denue].dropna().unique())
-            municipio_sel = st.selectbox("Seleccionar municipio", municipios)
-
-            df_mun_censo = df_censo[df_censo[col_municipio_censo] == municipio_sel]
-            df_mun_denue = df_denue[df_denue[col_municipio_denue] == municipio_sel]
-
-            st.subheader(f"📍 Empresas registradas en {municipio_sel}")
-            cols_denue_vis = ['nombre', 'giro', 'latitude', 'longitude', 'direccion', 'correo_electronico']
-
-            faltantes = [col for col in cols_denue_vis if col not in df_mun_denue.columns]
-            if not faltantes:
-                st.dataframe(df_mun_denue[cols_denue_vis])
-                bitacora.append(f"✅ Tabla completa desplegada para '{municipio_sel}'")
+            if motor_sql is None:
+                indice_cli, ms_indice_cli = indice_clientes(df_base)
+            else:
+                indice_cli, ms_indice_cli = clientes_sql(df_base, "madoli_base.csv", motor_sql)
+            if ms_indice_cli:
+                bitacora.append(f"🗂️ Índice de clientes construido en {ms_indice_cli:.1f} ms ({len(indice_cli.ids)} clientes)")
+
+            if id_cliente_url:
+                id_seleccionado = id_cliente_url
+                st.success(f"ID cliente recibido desde Bubble: `{id_seleccionado}`")
             else:
-                st.warning(f"⚠️ Faltan columnas clave para despliegue completo: {faltantes}")
-                bitacora.append(f"⚠️ Visualización incompleta para '{municipio_sel}': {faltantes}")
+                id_seleccionado = st.selectbox("Seleccionar cliente (ID)", indice_cli.ids)
+
+            resumen_cli = indice_cli.resumen_de(id_seleccionado)
 
-            # 📦 Descarga institucional
+            if resumen_cli is None:
+                st.warning("⚠️ No se encontraron pólizas asociadas.")
+            else:
+                nombre = resumen_cli["contratante"]
+                st.markdown(f"### 👤 Contratante: `{nombre}`")
+
+                # Métricas precalculadas sobre pólizas con prima > 0
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("📄 Pólizas", f"{resumen_cli['polizas']}")
+                col2.metric("🏢 Aseguradoras", f"{resumen_cli['aseguradoras']}")
+                col3.metric("🧾 Productos", f"{resumen_cli['productos']}")
+                col4.metric("💰 Prima total MXN", f"${resumen_cli['prima_total']:,.2f}")
+
+                st.subheader("🧠 Score Institucional")
+                retencion_score = score_retencion(resumen_cli["polizas"], resumen_cli["productos"],
+                                                  resumen_cli["vencimientos"])
+                clasificacion = clasificar(retencion_score)
+
+                colr1, colr2 = st.columns([1, 3])
+                colr1.metric("🔄 Score Retención", f"{retencion_score:.2f}")
+                colr2.markdown(f"**Clasificación institucional:** `{clasificacion}`")
+
+                bitacora.append(f"✅ Perfil cliente desplegado: {id_seleccionado} con score {retencion_score:.2f}")
+
+            # 🏆 Ranking de retención de toda la cartera
+            st.subheader("🏆 Ranking de retención – cartera completa")
+            ranking, ms_ranking = ranking_retencion(df_base)
+            if ms_ranking:
+                bitacora.append(f"🏆 Ranking de retención calculado en {ms_ranking:.1f} ms ({len(ranking)} clientes)")
+
+            colc = st.columns(len(CLASES))
+            for col_clase, clase in zip(colc, CLASES):
+                col_clase.metric(clase, f"{ranking.conteo_clases.get(clase, 0):,}")
+
+            colo1, colo2, colo3, colo4 = st.columns([2, 1, 2, 1])
+            columna_orden = colo1.selectbox("Ordenar por", ["posicion", "score", "prima_total", "polizas",
+                                                             "productos", "vencimientos", "contratante"])
+            ascendente = colo2.toggle("Ascendente", value=columna_orden in ("posicion", "contratante"))
+            clases_sel = colo3.multiselect("Clasificación", list(CLASES))
+            tamano_pagina = colo4.selectbox("Filas", [25, 50, 100], index=1)
+
+            total_filtrado = len(ranking.filtrar(clases_sel))
+            paginas = max(1, -(-total_filtrado // tamano_pagina))
+            numero_pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1)
+            filas_pagina, paginas = ranking.pagina(int(numero_pagina), tamano_pagina, columna_orden, ascendente, clases_sel)
+            st.caption(f"Página {int(numero_pagina)} de {paginas} · {total_filtrado:,} clientes")
+            st.dataframe(filas_pagina, hide_index=True)
+
+            formato_ranking = st.selectbox("Formato de descarga", list(FORMATOS), key="formato_ranking")
+            datos, archivo, mime = descarga_diferida(lambda: ranking.filtrar(clases_sel), "ranking_retencion",
+                                                     formato_ranking, filtro=("ranking", tuple(sorted(clases_sel))))
             st.download_button(
-                label=f"📁 Descargar empresas de {municipio_sel} en CSV",
-                data=df_mun_denue.to_csv(index=False).encode('utf-8'),
-                file_name=f"empresas_{municipio_sel}.csv",
-                mime='text/csv'
+                label=f"📁 Descargar ranking de retención ({formato_ranking})",
+                data=bitacora.diferido("exportacion", datos),
+                file_name=archivo,
+                mime=mime,
+                on_click="ignore"
             )
-            bitacora.append(f"✅ Botón de descarga activado para '{municipio_sel}'")
 
-            st.subheader(f"📊 Indicadores censales de {municipio_sel}")
-            st.dataframe(df_mun_censo)
+# === 🌎 Territorial ===
+if pestana_activa(tabs[2]):
+    with tabs[2], bitacora.etapa("territorial"):
+        st.title("🌎 Módulo Territorial")
 
-            if 'latitude' in df_mun_denue.columns and 'longitude' in df_mun_denue.columns:
-                st.map(df_mun_denue[['latitude', 'longitude']].dropna())
-                bitacora.append(f"✅ Mapa desplegado para municipio '{municipio_sel}'")
-            else:
-                st.info("ℹ️ Coordenadas no disponibles para mapeo DENUE.")
-                bitacora.append(f"ℹ️ Mapa omitido por falta de coordenadas en '{municipio_sel}'")
+        if df_denue.empty:
+            st.warning("⚠️ No se encontraron bases censales o empresariales.")
+            bitacora.append("⚠️ Base DENUE no disponible para módulo territorial.")
         else:
-            st.warning("⚠️ No se pudo homologar 'municipio' en ambas bases.")
-            bitacora.append("⚠️ Homologación de 'municipio' fallida entre censo y DENUE")
+            # 🧩 Particiones por clave de municipio y cruce censo × DENUE (una vez por huella)
+            terr, ms_terr = territorio(df_denue, df_censo)
+            if ms_terr:
+                bitacora.append(f"🧩 Particiones territoriales construidas en {ms_terr:.1f} ms "
+                                f"({len(terr.municipios):,} municipios)")
+            if df_censo.empty:
+                st.info("ℹ️ Censo INEGI no disponible: se muestran sólo datos DENUE.")
+            elif terr.col_municipio_censo:
+                bitacora.append(f"✅ Columna censal homologada: '{terr.col_municipio_censo}'")
+            else:
+                bitacora.append("⚠️ Homologación de 'municipio' fallida entre censo y DENUE")
+
+            if not terr.col_municipio_denue:
+                st.warning("⚠️ No se pudo homologar 'municipio' en la base DENUE.")
+                bitacora.append("⚠️ Columna 'municipio' no presente en df_denue")
+            else:
+                # 🗺️ Activación selector de municipio (sólo se lee la partición elegida)
+                clave_sel = st.selectbox("Seleccionar municipio", terr.opciones(), format_func=terr.nombre)
+                municipio_sel = terr.nombre(clave_sel)
+                df_mun_denue = terr.denue.leer(clave_sel)
+                df_mun_censo = terr.censo.leer(clave_sel)
+
+                st.subheader(f"📍 Empresas registradas en {municipio_sel}")
+                cols_denue_vis = ['nombre', 'giro', 'latitude', 'longitude', 'direccion', 'correo_electronico']
+
+                faltantes = [col for col in cols_denue_vis if col not in df_mun_denue.columns]
+                if not faltantes:
+                    st.dataframe(df_mun_denue[cols_denue_vis])
+                    bitacora.append(f"✅ Tabla completa desplegada para '{municipio_sel}'")
+                else:
+                    st.warning(f"⚠️ Faltan columnas clave para despliegue completo: {faltantes}")
+                    bitacora.append(f"⚠️ Visualización incompleta para '{municipio_sel}': {faltantes}")
+
+                # 📦 Descarga institucional
+                formato_mun = st.selectbox("Formato de descarga", list(FORMATOS), key="formato_municipio")
+                datos, archivo, mime = descarga_diferida(df_mun_denue, f"empresas_{municipio_sel}",
+                                                         formato_mun, filtro=("municipio", clave_sel))
+                st.download_button(
+                    label=f"📁 Descargar empresas de {municipio_sel} ({formato_mun})",
+                    data=bitacora.diferido("exportacion", datos),
+                    file_name=archivo,
+                    mime=mime,
+                    on_click="ignore"
+                )
+                bitacora.append(f"✅ Botón de descarga activado para '{municipio_sel}'")
+
+                st.subheader(f"🏭 Empresas por giro en {municipio_sel}")
+                st.dataframe(terr.giros_de(clave_sel), hide_index=True)
+
+                st.subheader(f"📊 Indicadores censales de {municipio_sel}")
+                st.dataframe(terr.municipios.loc[[clave_sel]])
+                if not df_mun_censo.empty:
+                    st.dataframe(df_mun_censo)
+
+                if 'latitude' in df_mun_denue.columns and 'longitude' in df_mun_denue.columns:
+                    st.map(df_mun_denue[['latitude', 'longitude']].dropna())
+                    bitacora.append(f"✅ Mapa desplegado para municipio '{municipio_sel}'")
+                else:
+                    st.info("ℹ️ Coordenadas no disponibles para mapeo DENUE.")
+                    bitacora.append(f"ℹ️ Mapa omitido por falta de coordenadas en '{municipio_sel}'")
+
+        # 📡 Búsqueda espacial sobre DENUE (no depende del censo)
+        if {'latitude', 'longitude'} <= set(df_denue.columns):
+            indice_geo, ms_geo = indice_espacial(df_denue)
+            if ms_geo:
+                bitacora.append(f"📡 Índice espacial DENUE construido en {ms_geo:.1f} ms ({len(indice_geo):,} puntos)")
+
+            if len(indice_geo):
+                st.subheader("📡 Empresas cercanas a un cliente")
+                lat_min, lat_max, lon_min, lon_max = indice_geo.extension()
+                coords_cli = coordenadas_clientes(df_base)
+
+                if not coords_cli.empty:
+                    id_geo = st.selectbox("Cliente con domicilio georreferenciado", coords_cli['id_cliente'])
+                    punto = coords_cli[coords_cli['id_cliente'] == id_geo].iloc[0]
+                    lat_ref, lon_ref = float(punto['latitude']), float(punto['longitude'])
+                else:
+                    st.info("ℹ️ La base no trae latitud/longitud de clientes; capture el punto de referencia.")
+                    colg1, colg2 = st.columns(2)
+                    lat_ref = colg1.number_input("Latitud", value=(lat_min + lat_max) / 2, format="%.5f")
+                    lon_ref = colg2.number_input("Longitud", value=(lon_min + lon_max) / 2, format="%.5f")
+
+                radio_km = st.slider("Radio (km)", min_value=0.5, max_value=50.0, value=2.0, step=0.5)
+                inicio_geo = datetime.now()
+                cercanas = indice_geo.radio(lat_ref, lon_ref, radio_km)
+                ms_consulta = (datetime.now() - inicio_geo).total_seconds() * 1000
+                st.caption(f"{len(cercanas):,} empresas a ≤ {radio_km} km · consulta {ms_consulta:.1f} ms")
+
+                cols_cercanas = [c for c in ['distancia_km', 'nombre', 'giro', 'municipio', 'direccion']
+                                 if c in cercanas.columns]
+                st.dataframe(cercanas[cols_cercanas], hide_index=True)
+                if not cercanas.empty:
+                    st.map(cercanas[['latitude', 'longitude']])
+                bitacora.append(f"📡 Radio {radio_km} km: {len(cercanas):,} empresas en {ms_consulta:.1f} ms")
+
+                with st.expander("🔲 Consulta por recuadro (viewport)"):
+                    colb1, colb2, colb3, colb4 = st.columns(4)
+                    b_lat_min = colb1.number_input("Lat. mínima", value=lat_min, format="%.5f")
+                    b_lat_max = colb2.number_input("Lat. máxima", value=lat_max, format="%.5f")
+                    b_lon_min = colb3.number_input("Lon. mínima", value=lon_min, format="%.5f")
+                    b_lon_max = colb4.number_input("Lon. máxima", value=lon_max, format="%.5f")
+                    en_recuadro = indice_geo.recuadro(b_lat_min, b_lat_max, b_lon_min, b_lon_max)
+                    st.caption(f"{len(en_recuadro):,} puntos enviados al mapa (tope por consulta)")
+                    if not en_recuadro.empty:
+                        st.map(en_recuadro[['latitude', 'longitude']])
 
 # === 🏢 Sectorial ===
-with tabs[3]:
-    st.title("🏢 Módulo Sectorial")
+if pestana_activa(tabs[3]):
+    with tabs[3], bitacora.etapa("sectorial"):
+        st.title("🏢 Módulo Sectorial")
 
-    if df_ventas.empty:
-        st.warning("⚠️ No se encontró base de ventas.")
-        bitacora.append("⚠️ Base 'ventas_sectoriales.csv' vacía o no cargada.")
-    else:
-        # 📅 Conversión de fechas y cálculo de trimestre
-        if 'fecha' in df_ventas.columns:
-            try:
-                df_ventas['fecha'] = pd.to_datetime(df_ventas['fecha'], errors='coerce')
-                df_ventas = df_ventas.dropna(subset=['fecha'])
-                df_ventas['trimestre'] = df_ventas['fecha'].dt.to_period('Q').astype(str)
-                bitacora.append("✅ Fechas convertidas y trimestres calculados.")
-            except Exception as e:
-                st.error(f"❌ Error al procesar fechas: {e}")
-                bitacora.append(f"❌ Error en conversión de fechas: {e}")
+        if df_ventas.empty:
+            st.warning("⚠️ No se encontró base de ventas.")
+            bitacora.append("⚠️ Base 'ventas_sectoriales.csv' vacía o no cargada.")
         else:
-            st.warning("⚠️ Columna 'fecha' no encontrada.")
-            bitacora.append("⚠️ Columna 'fecha' ausente en base de ventas.")
-
-        # 🧩 Homologación de columna 'Ramo'
-        col_ramo_ventas = None
-        for posible in ["Ramo", "ramo", "tipo_ramo", "segmento_ramo"]:
-            if posible in df_ventas.columns:
-                col_ramo_ventas = posible
-                df_ventas[posible] = df_ventas[posible].astype(str).str.upper()
-                bitacora.append(f"✅ Columna homologada para 'Ramo': '{posible}'")
-                break
-
-        # 📊 Visualización por trimestre y aseguradora
-        if col_ramo_ventas and all(col in df_ventas.columns for col in ['Ventas', 'nombre', 'trimestre']):
-            ramo_sel = st.selectbox("Seleccionar ramo", sorted(df_ventas[col_ramo_ventas].dropna().unique()))
-            df_ramo = df_ventas[df_ventas[col_ramo_ventas] == ramo_sel]
-
-            df_trimestral = df_ramo.groupby(['nombre', 'trimestre'])['Ventas'].sum().reset_index()
-            df_trimestral['Ventas'] = df_trimestral['Ventas'].round(2)
-
-            st.subheader("📊 Ventas Trimestrales por Aseguradora")
-            fig = px.bar(
-                df_trimestral,
-                x='trimestre',
-                y='Ventas',
-                color='nombre',
-                text='Ventas',
-                barmode='group',
-                labels={'trimestre': 'Trimestre', 'Ventas': 'Ventas Totales', 'nombre': 'Aseguradora'},
-                title=f"Ventas por Trimestre – {ramo_sel}"
-            )
-            fig.update_layout(xaxis_title="Trimestre", yaxis_title="Ventas", legend_title="Aseguradora")
-            fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
-            bitacora.append("✅ Gráfico de ventas trimestrales desplegado.")
-        else:
-            st.warning("⚠️ Columnas clave faltantes para graficar por trimestre.")
-            bitacora.append("⚠️ No se pudo graficar ventas por aseguradora y trimestre.")
+            # 🧊 Cubo materializado: fechas dd/mm/yy, trimestre y Ramo ya homologados en la ingesta
+            cubo, ms_cubo = cubo_ventas(df_ventas)
+            estado_cubo = "reutilizado" if ms_cubo == 0.0 else f"actualizado en {ms_cubo:.1f} ms"
+            bitacora.append(f"🧊 Cubo de ventas {estado_cubo}: {len(cubo.celdas):,} celdas · "
+                            f"{len(cubo.cortes)} corte(s) incorporados")
+
+            # 📊 Visualización por trimestre y aseguradora (rebanada del cubo por ramo)
+            if cubo.ramos():
+                ramo_sel = st.selectbox("Seleccionar ramo", cubo.ramos())
+
+                def figura_trimestral():
+                    import plotly.express as px
+
+                    if motor_sql is None:
+                        df_trimestral = cubo.rebanada(ramo_sel)[['nombre', 'trimestre', 'Ventas']]
+                    else:
+                        # Rollup nombre × trimestre agregado en el motor: sólo vuelven las filas del gráfico
+                        ventas_consulta, _ = ventas_sql(df_ventas, "ventas_sectoriales.csv", motor_sql)
+                        df_trimestral = ventas_consulta.trimestral(ramo_sel)
+
+                    def barras(datos):
+                        datos = datos.assign(Ventas=datos['Ventas'].round(2))
+                        fig = px.bar(
+                            datos,
+                            x='trimestre',
+                            y='Ventas',
+                            color='nombre',
+                            text='Ventas',
+                            barmode='group',
+                            labels={'trimestre': 'Trimestre', 'Ventas': 'Ventas Totales', 'nombre': 'Aseguradora'},
+                            title=f"Ventas por Trimestre – {ramo_sel}"
+                        )
+                        fig.update_layout(xaxis_title="Trimestre", yaxis_title="Ventas", legend_title="Aseguradora")
+                        fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+                        return fig
+
+                    # Mismo tope de payload que los gráficos Altair (MAX_BYTES_GRAFICO)
+                    fig, bytes_fig, filas_fig = grafico_plotly(df_trimestral, 'nombre', 'Ventas', barras,
+                                                               agrupar=['trimestre'])
+                    return fig, filas_fig, bytes_fig
+
+                st.subheader("📊 Ventas Trimestrales por Aseguradora")
+                with bitacora.etapa("grafico") as medicion:
+                    (fig, filas_fig, bytes_fig), _ = figura_memorizada(
+                        df_ventas.attrs.get("madoli_huella"), ("ventas_trimestrales", len(cubo.celdas), ramo_sel, motor_sql and motor_sql.nombre),
+                        figura_trimestral)
+                    st.plotly_chart(fig, use_container_width=True)
+                    medicion.update(filas=filas_fig, bytes=bytes_fig)
+                bitacora.append("✅ Gráfico de ventas trimestrales desplegado.")
+                bitacora.append(f"📦 Gráfico 'Ventas trimestrales': {filas_fig} filas agregadas · {bytes_fig / 1024:.1f} KB enviados")
+
+                # 📈 Crecimiento precalculado en el cubo
+                ultimo = cubo.ultimo_trimestre(ramo_sel)
+                if not ultimo.empty:
+                    st.subheader(f"📈 Crecimiento {ultimo['trimestre'].iloc[0]} (QoQ / YoY)")
+                    st.dataframe(
+                        ultimo[['nombre', 'Ventas', 'Ventas_qoq', 'Ventas_yoy', 'PRIMA_EMI', 'PRIMA_EMI_qoq', 'PRIMA_EMI_yoy']]
+                        .sort_values('Ventas', ascending=False),
+                        use_container_width=True,
+                        column_config={c: st.column_config.NumberColumn(format="percent")
+                                       for c in ['Ventas_qoq', 'Ventas_yoy', 'PRIMA_EMI_qoq', 'PRIMA_EMI_yoy']},
+                    )
+            else:
+                st.warning("⚠️ Columnas clave faltantes para graficar por trimestre.")
+                bitacora.append("⚠️ No se pudo graficar ventas por aseguradora y trimestre.")
 
 # === 🧠 IA Predictiva ===
-with tabs[4]:
-    st.title("🧠 IA Predictiva – Clustering Institucional")
+if pestana_activa(tabs[4]):
+    with tabs[4]:
+        st.title("🧠 IA Predictiva – Clustering Institucional")
 
-    if df_base.empty or 'id_cliente' not in df_base.columns or 'contractor_name' not in df_base.columns:
-        st.warning("⚠️ No se puede aplicar clustering por falta de columnas clave.")
-        bitacora.append("⚠️ Clustering omitido por ausencia de 'id_cliente' o 'contractor_name'.")
-    else:
-        # 🧩 Preparación de datos
-        df_cluster = df_base[['id_cliente', 'contractor_name']].dropna()
-
-        # 🔢 Codificación categórica
-        df_cluster['id_cliente_encoded'] = df_cluster['id_cliente'].astype('category').cat.codes
-        df_cluster['contractor_encoded'] = df_cluster['contractor_name'].astype('category').cat.codes
-
-        # 🧠 Clustering KMeans
-        from sklearn.cluster import KMeans
-        X = df_cluster[['id_cliente_encoded', 'contractor_encoded']]
-        kmeans = KMeans(n_clusters=3, random_state=42).fit(X)
-        df_cluster['cluster'] = kmeans.labels_
-
-        # 📊 Visualización de distribución
-        st.subheader("📊 Distribución por cluster")
-        import altair as alt
-        graf_cluster = alt.Chart(df_cluster).mark_bar().encode(
-            x='count()', y='cluster:N', color='cluster:N'
-        ).properties(height=300)
-        st.altair_chart(graf_cluster, use_container_width=True)
-        bitacora.append("✅ Clustering por cliente y contratante ejecutado.")
-
-        # 📋 Tabla de clientes clasificados
-        st.subheader("📋 Clientes clasificados por cluster")
-        st.dataframe(df_cluster[['id_cliente', 'contractor_name', 'cluster']].sort_values(by='cluster'))
-
-        # 📁 Descarga CSV institucional
-        st.download_button(
-            label="📁 Descargar clasificación por cluster (CSV)",
-            data=df_cluster[['id_cliente', 'contractor_name', 'cluster']].to_csv(index=False).encode('utf-8'),
-            file_name="clientes_clusterizados.csv",
-            mime="text/csv"
-        )
-        bitacora.append("✅ Botón de descarga CSV activado para clustering por cliente.")
-
-        # 🔄 Consolidación de clientes por cluster
-        fuentes = []
-        for _, row in df_cluster.iterrows():
-            fuentes.append({
-                "id_cliente": row["id_cliente"],
-                "segmento": str(row["cluster"]),
-                "historial": []  # 🔁 puede integrarse desde otro módulo si aplica
-            })
-
-        # 🧠 Generación por botón
-        st.subheader("🎯 Promociones predictivas por cliente clasificado")
-        if st.button("🧠 Generar promociones predictivas"):
-            from modulo_promociones import generar_promociones_consolidadas
-            resultados_promos = generar_promociones_consolidadas(fuentes, bitacora)
-
-            # 👁️ Visualización de resultados
-            st.markdown("### 🔍 Resultados de promociones sugeridas")
-            for r in resultados_promos:
-                if "error" not in r:
-                    st.markdown(f"- ✅ `{r['id_cliente']}` → {', '.join(r['promociones_sugeridas'])}")
+        if df_base.empty or 'id_cliente' not in df_base.columns or 'contractor_name' not in df_base.columns:
+            st.warning("⚠️ No se puede aplicar clustering por falta de columnas clave.")
+            bitacora.append("⚠️ Clustering omitido por ausencia de 'id_cliente' o 'contractor_name'.")
+        else:
+            with bitacora.etapa("cluster") as medicion:
+                # 🧠 Segmentación por rasgos de comportamiento (modelo persistido por huella de datos)
+                df_cluster, modelo_seg, estado_seg = segmentar(df_base)
+
+                if estado_seg == "error":
+                    error_seg = error_segmentacion(df_base)
+                    mensaje_seg = f"❌ Falló el entrenamiento del modelo de segmentación: {error_seg}"
+                    if df_cluster is None:
+                        st.error(mensaje_seg)
+                    else:
+                        st.warning(mensaje_seg + " · se muestra el modelo previo.")
+                    bitacora.append(f"❌ Segmentación: ajuste fallido ({error_seg}); se reintenta en "
+                                    f"{ESPERA_REINTENTO:.0f} s.")
+                if df_cluster is None:
+                    if estado_seg == "entrenando":
+                        st.info("⏳ Entrenando el modelo de segmentación en segundo plano; recargue en unos segundos.")
+                        bitacora.append("⏳ Segmentación en entrenamiento (segundo plano).")
+                    df_cluster = pd.DataFrame(columns=['id_cliente', 'contractor_name', 'cluster'])
                 else:
-                    st.warning(f"⚠️ Cliente `{r['id_cliente']}`: {r['error']}")
-
-            # 📤 Envío automático a Bubble
-            if st.button("📤 Enviar promociones a Bubble"):
-                import requests
-                enviados = 0
+                    if estado_seg == "anterior":
+                        st.caption("🔄 Datos actualizados: se muestra el modelo previo mientras se reentrena en segundo plano.")
+                    bitacora.append(f"🧠 Modelo de segmentación {estado_seg}: {modelo_seg.k} clusters · "
+                                    f"{modelo_seg.clientes:,} clientes · entrenado {modelo_seg.entrenado_en} "
+                                    f"en {modelo_seg.segundos * 1000:.0f} ms")
+
+                    # 📊 Visualización de distribución
+                    st.subheader("📊 Distribución por cluster")
+                    graf_cluster, bytes_cluster, _ = grafico_barras(agregar_conteo(df_cluster, 'cluster'), 'cluster')
+                    st.altair_chart(graf_cluster, use_container_width=True)
+                    bitacora.append(f"📦 Gráfico 'Cluster': {bytes_cluster / 1024:.1f} KB enviados")
+                    bitacora.append("✅ Clustering por rasgos de cliente ejecutado.")
+
+                    st.subheader("🧬 Perfil promedio por cluster")
+                    st.dataframe(modelo_seg.perfiles(), use_container_width=True)
+
+                    # 📋 Tabla de clientes clasificados
+                    st.subheader("📋 Clientes clasificados por cluster")
+                    st.dataframe(df_cluster.sort_values(by='cluster'))
+
+                    # 📁 Descarga CSV institucional
+                    formato_cluster = st.selectbox("Formato de descarga", list(FORMATOS), key="formato_cluster")
+                    datos, archivo, mime = descarga_diferida(df_cluster, "clientes_clusterizados", formato_cluster,
+                                                             filtro=("segmentacion", modelo_seg.huella, modelo_seg.entrenado_en))
+                    st.download_button(
+                        label=f"📁 Descargar clasificación por cluster ({formato_cluster})",
+                        data=bitacora.diferido("exportacion", datos),
+                        file_name=archivo,
+                        mime=mime,
+                        on_click="ignore"
+                    )
+                    bitacora.append("✅ Botón de descarga CSV activado para clustering por cliente.")
+                medicion["filas"] = len(df_cluster)
+
+            # 🔄 Consolidación de clientes por cluster (lote para el motor de reglas; historial desde otro módulo si aplica)
+            fuentes = df_cluster[['id_cliente']].assign(segmento=df_cluster['cluster'].astype(str))
+
+            # 🧠 Generación por botón
+            st.subheader("🎯 Promociones predictivas por cliente clasificado")
+            if st.button("🧠 Generar promociones predictivas"):
+                from modulo_promociones import generar_promociones_consolidadas
+                # En session_state: el botón de envío provoca otro rerun en el que este botón ya no está activo
+                with bitacora.etapa("promociones", filas=len(fuentes)):
+                    st.session_state["resultados_promos"] = generar_promociones_consolidadas(fuentes, bitacora)
+
+            resultados_promos = st.session_state.get("resultados_promos")
+            if resultados_promos:
+                # 👁️ Visualización de resultados
+                st.markdown("### 🔍 Resultados de promociones sugeridas")
                 for r in resultados_promos:
                     if "error" not in r:
-                        payload = {
-                            "id_cliente": r["id_cliente"],
-                            "promociones_sugeridas": r["promociones_sugeridas"]
-                        }
-                        response = requests.post(
-                            "https://madoli360.bubbleapps.io/api/1.1/wf/actualizar_cliente",
-                            json=payload
+                        st.markdown(f"- ✅ `{r['id_cliente']}` → {', '.join(r['promociones_sugeridas'])}")
+                    else:
+                        st.warning(f"⚠️ Cliente `{r['id_cliente']}`: {r['error']}")
+
+                # 📤 Envío a Bubble: sesión con pool, concurrencia acotada, límite de tasa y reintentos
+                if st.button("📤 Enviar promociones a Bubble"):
+                    from modulo_bubble import enviar_promociones
+                    barra = st.progress(0.0, text="Enviando promociones a Bubble…")
+                    with bitacora.etapa("envio", filas=len(resultados_promos)):
+                        resumen_envio = enviar_promociones(
+                            resultados_promos,
+                            progreso=lambda hechos, total: barra.progress(hechos / max(total, 1),
+                                                                          text=f"Enviadas {hechos:,} de {total:,}"),
                         )
-                        if response.status_code == 200:
-                            enviados += 1
-                        else:
-                            st.error(f"❌ Falla para `{r['id_cliente']}` | {response.status_code}")
+                    for id_cliente, detalle in resumen_envio["errores"][:20]:
+                        st.error(f"❌ Falla para `{id_cliente}` | {detalle}")
 
-                st.success(f"📬 {enviados} promociones enviadas exitosamente a Bubble.")
-                bitacora.append(f"📤 {enviados} promociones enviadas a Bubble vía Streamlit.")
+                    st.success(f"📬 {resumen_envio['enviados']} promociones enviadas exitosamente a Bubble.")
+                    bitacora.append(
+                        f"📤 {resumen_envio['enviados']} promociones enviadas a Bubble vía Streamlit · "
+                        f"{resumen_envio['fallidos']} fallidas · {resumen_envio['reintentos']} reintentos · "
+                        f"{resumen_envio['segundos']:.1f} s"
+                    )
 
 ## === 📜 Bitácora Técnica ===
-with tabs[5]:
-    st.title("📜 Bitácora Técnica")
-    st.markdown("### 🧾 Log institucional de carga y homologación")
-
-    # Mostrar bitácora acumulada
-    if bitacora:
-        for entrada in bitacora:
-            st.markdown(f"- {entrada}")
-    else:
-        st.info("ℹ️ No se han registrado eventos en la bitácora técnica.")
-
-    # Validación estructural de columnas obligatorias
-    columnas_obligatorias = ['policy_number', 'id_cliente', col_product, 'Ramo', 'Subramo', 'premium_mxn']
-    columnas_faltantes = []
-
-    for posible in columnas_obligatorias:
-        if posible and posible in df_base.columns:
-            bitacora.append(f"✅ Columna presente: '{posible}'")
+if pestana_activa(tabs[5]):
+    with tabs[5]:
+        st.title("📜 Bitácora Técnica")
+        # Se llena al final de la pestaña, cuando ya se registraron todos los eventos de esta recarga
+        panel_bitacora = st.container()
+
+        # 🗃️ Estado de la caché de carga (aciertos, fallos y tiempos por fuente)
+        st.markdown("### 🗃️ Caché de carga de bases")
+        df_cache = estadisticas_cache()
+        if df_cache.empty:
+            st.info("ℹ️ Sin actividad registrada en la caché de carga.")
         else:
-            msg = f"⚠️ Falta columna: {posible}" if posible else "⚠️ Columna 'product' no homologada"
-            st.warning(msg)
-            bitacora.append(f"⛔ Columna no encontrada u omisa: '{posible}'")
-            columnas_faltantes.append(posible)
-
-    # Resumen de validación
-    if columnas_faltantes:
-        st.warning(f"⚠️ Columnas faltantes en base principal: {', '.join([c for c in columnas_faltantes if c])}")
-    else:
-        st.success("✅ Todas las columnas clave están presentes en la base principal.")
+            st.dataframe(df_cache, use_container_width=True)
+        descargas_remotas = estadisticas_remoto()
+        if descargas_remotas:
+            st.markdown("### 🌐 Descargas remotas desde el arranque")
+            st.dataframe(pd.DataFrame(descargas_remotas), use_container_width=True, hide_index=True)
+        exportes = estadisticas_exportes()
+        st.caption(f"📁 Exportaciones: {exportes['generados']} generadas · {exportes['reutilizados']} reutilizadas de caché")
+
+        reportes_ingesta = reportes_ingesta_df()
+        if not reportes_ingesta.empty:
+            st.markdown("### 📥 Ingesta por bloques (pico de memoria por archivo)")
+            st.dataframe(reportes_ingesta, use_container_width=True)
+        if not df_ventas.empty:
+            st.markdown("### 🧊 Cubo de ventas sectoriales (cortes incorporados)")
+            st.dataframe(cubo_ventas(df_ventas)[0].historial_df(), use_container_width=True)
+        if st.button("🔄 Invalidar caché y recargar bases"):
+            invalidar_cache()
+            bitacora.append(f"[{datetime.now()}] Caché de carga invalidada manualmente")
+            st.rerun()
+
+        # Validación estructural de columnas obligatorias
+        with bitacora.etapa("validacion"):
+            columnas_obligatorias = ['policy_number', 'id_cliente', col_product, 'Ramo', 'Subramo', 'premium_mxn']
+            columnas_faltantes = []
+
+            for posible in columnas_obligatorias:
+                if posible and posible in df_base.columns:
+                    bitacora.append(f"✅ Columna presente: '{posible}'")
+                else:
+                    msg = f"⚠️ Falta columna: {posible}" if posible else "⚠️ Columna 'product' no homologada"
+                    st.warning(msg)
+                    bitacora.append(f"⛔ Columna no encontrada u omisa: '{posible}'")
+                    columnas_faltantes.append(posible)
+
+            # Resumen de validación
+            if columnas_faltantes:
+                st.warning(f"⚠️ Columnas faltantes en base principal: {', '.join([c for c in columnas_faltantes if c])}")
+            else:
+                st.success("✅ Todas las columnas clave están presentes en la base principal.")
+
+            # Homologación de 'Ramo'
+            if 'Ramo' in df_base.columns and mapa_ramos:
+                # Una sola línea por recarga (antes, una por valor de ramo)
+                homologados = [f"'{v}' → '{mapa_ramos[v]}'" for v in df_base['Ramo'].dropna().unique() if v in mapa_ramos]
+                if homologados:
+                    bitacora.append(f"🔄 Ramos homologados detectados ({len(homologados)}): "
+                                    + ", ".join(homologados[:10]) + (" …" if len(homologados) > 10 else ""))
+
+        with panel_bitacora:
+            # ⏱️ Latencia por etapa de esta recarga y de las anteriores de la sesión
+            st.markdown(f"### ⏱️ Latencia por etapa · recarga #{bitacora.corrida} ({bitacora.ms_corrida():,.0f} ms)")
+            desglose = bitacora.desglose()
+            if not desglose.empty:
+                st.bar_chart(desglose["duracion_ms"], horizontal=True)
+                st.dataframe(desglose, use_container_width=True,
+                             column_config={"pct": st.column_config.NumberColumn(format="percent")})
+            historial_latencias = bitacora.historial_latencias()
+            if len(historial_latencias) > 1:
+                with st.expander("📈 Recargas anteriores (ms por etapa)"):
+                    st.dataframe(historial_latencias, use_container_width=True)
 
-    # Homologación de 'Ramo'
-    if 'Ramo' in df_base.columns and mapa_ramos:
-        valores_ramo = df_base['Ramo'].dropna().unique()
-        for original in valores_ramo:
-            if original in mapa_ramos:
-                bitacora.append(f"🔄 Ramo homologado detectado: '{original}' → '{mapa_ramos[original]}'")
+            st.download_button(
+                label="📤 Exportar bitácora (JSON)",
+                data=lambda: bitacora.exportar_json().encode("utf-8"),
+                file_name="bitacora_madoli360.json",
+                mime="application/json",
+                on_click="ignore"
+            )
 
+            st.markdown("### 🧾 Log institucional de carga y homologación")
+            eventos = [e for e in bitacora.de_corrida() if e.tipo == "evento"]
+            if eventos:
+                niveles = st.multiselect("Nivel", ["info", "warning", "error"], default=["info", "warning", "error"],
+                                         key="niveles_bitacora")
+                for evento in eventos:
+                    if evento.nivel in niveles:
+                        st.markdown(f"- {evento.mensaje}")
+            else:
+                st.info("ℹ️ No se han registrado eventos en la bitácora técnica.")
+            if bitacora.descartados:
+                st.caption(f"{bitacora.descartados:,} eventos antiguos descartados (buffer de {bitacora.eventos.maxlen:,})")
 
+            if modulo_arranque.activo():
+                with st.expander("🚀 Perfil de arranque del proceso"):
+                    perfil_arranque = modulo_arranque.reporte(top=25)
+                    st.json(perfil_arranque["marcas_ms"])
+                    st.dataframe(pd.DataFrame(perfil_arranque["importaciones"]), use_container_width=True)
 
+modulo_arranque.marcar("script_completo")
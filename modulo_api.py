@@ -1,10 +1,128 @@
 # modulo_api.py
 
 import streamlit as st
-import pandas as pd
 import json
 import datetime
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from streamlit.components.v1 import html
+import numpy as np
+
+from modulo_carga import cargar_base
+from modulo_clientes import indice_clientes
+from modulo_retencion import clasificar, score_retencion
+
+# ⏱️ Cada cuánto se revisa la huella de la base (hot-reload) en modo servicio
+INTERVALO_RECARGA = float(os.environ.get("MADOLI_INTERVALO_RECARGA", 2.0))
+PUERTO_SERVICIO = int(os.environ.get("MADOLI_PUERTO_API", 8360))
+
+
+# 🔥 Índice caliente de clientes
+class ServicioClientes:
+    """
+    Base e índice de clientes residentes en memoria.
+
+    La huella de la base se revisa como máximo una vez cada
+    'intervalo' segundos (un os.stat); si el archivo cambió se recarga y se
+    reconstruye el índice. Entre revisiones, validar un ID es un lookup en
+    un diccionario y un perfil es la fila del resumen en la posición del ID:
+    sólo esa fila se serializa, por petición.
+    """
+
+    def __init__(self, nombre_archivo: str = "madoli_base.csv", intervalo: float = INTERVALO_RECARGA):
+        self.nombre_archivo = nombre_archivo
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._revisado = 0.0
+        self._huella = None
+        self.indice = None
+        # (índice, resumen con score) se reemplazan juntos en cada recarga
+        self._vigentes = (None, None)
+        self.recargas = 0
+        self.cargado_en = None
+
+    def _vigente(self):
+        ahora = time.monotonic()
+        if self.recargas and ahora - self._revisado < self.intervalo:
+            return self.indice
+        with self._lock:
+            if self.recargas and ahora - self._revisado < self.intervalo:
+                return self.indice
+            df = cargar_base(self.nombre_archivo)
+            huella = df.attrs.get("madoli_huella")
+            if not self.recargas or huella != self._huella:
+                indice = indice_clientes(df)[0] if "id_cliente" in df.columns else None
+                self._vigentes = (indice, self._materializar(indice))
+                self.indice = indice
+                self._huella = huella
+                self.recargas += 1
+                self.cargado_en = datetime.datetime.now().isoformat()
+            self._revisado = ahora
+        return self.indice
+
+    @staticmethod
+    def _materializar(indice):
+        """
+        Columnas del resumen del índice más score y clasificación, como
+        arreglos en las mismas posiciones que indice.ids (sin serializar).
+        """
+        if indice is None:
+            return None
+        resumen = indice.resumen.rename(columns={indice.col_id: "id_cliente"})
+        score = score_retencion(resumen["polizas"], resumen["productos"], resumen["vencimientos"]).round(2)
+        columnas = {nombre: serie.to_numpy() for nombre, serie in resumen.items()}
+        columnas["score_retencion"] = score.to_numpy()
+        columnas["clasificacion"] = clasificar(columnas["score_retencion"])
+        return columnas
+
+    def disponible(self) -> bool:
+        return self._vigente() is not None
+
+    def existe(self, id_cliente) -> bool:
+        self._vigente()
+        indice, _ = self._vigentes
+        return indice is not None and id_cliente in indice
+
+    def perfil(self, id_cliente):
+        self._vigente()
+        indice, columnas = self._vigentes
+        k = indice.codigo(id_cliente) if indice is not None else None
+        if k is None:
+            return None
+        # Sólo la fila pedida pasa a tipos de Python (NaN → null, como to_json)
+        perfil = {}
+        for nombre, valores in columnas.items():
+            valor = valores[k]
+            valor = valor.item() if isinstance(valor, np.generic) else valor
+            perfil[nombre] = None if isinstance(valor, float) and valor != valor else valor
+        return perfil
+
+    def salud(self) -> dict:
+        indice = self._vigente()
+        return {
+            "estado": "OK" if indice is not None else "SIN_BASE",
+            "clientes": len(indice.ids) if indice is not None else 0,
+            "registros": len(indice.df) if indice is not None else 0,
+            "huella": self._huella,
+            "recargas": self.recargas,
+            "cargado_en": self.cargado_en,
+        }
+
+
+_servicio = None
+_servicio_lock = threading.Lock()
+
+
+def servicio_clientes() -> ServicioClientes:
+    """Instancia única por proceso (compartida por sesiones y por el servidor HTTP)."""
+    global _servicio
+    with _servicio_lock:
+        if _servicio is None:
+            _servicio = ServicioClientes()
+        return _servicio
 
 def generar_respuesta_json():
     st.set_page_config(page_title="Madoli360 · Visualización", layout="wide")
@@ -22,18 +140,19 @@ def generar_respuesta_json():
     # 📅 Timestamp institucional
     timestamp = datetime.datetime.now().isoformat()
 
-    # 📄 Carga de base institucional con trazabilidad
+    # 📄 Base institucional residente en memoria (se recarga sólo si cambia el archivo)
+    servicio = servicio_clientes()
     try:
-        df = pd.read_csv("madoli_base.csv")
-    except FileNotFoundError:
-        st.error("❌ No se encontró el archivo `madoli_base.csv`. Verifique ruta y acceso.")
-        st.stop()
+        disponible = servicio.disponible()
     except Exception as e:
         st.error(f"❌ Error al cargar la base institucional: {e}")
         st.stop()
+    if not disponible:
+        st.error("❌ No se encontró el archivo `madoli_base.csv`. Verifique ruta y acceso.")
+        st.stop()
 
-    # 🔎 Validación estricta del ID
-    if id_cliente not in df["id_cliente"].astype(str).values:
+    # 🔎 Validación estricta del ID (lookup en el índice, sin recorrer la columna)
+    if not servicio.existe(id_cliente):
         st.error(f"❌ El ID recibido (`{id_cliente}`) no existe en la base institucional.")
         st.stop()
 
@@ -72,3 +191,76 @@ def generar_respuesta_json():
 
     st.markdown("### 📦 Respuesta JSON estructurada")
     st.json(respuesta)
+
+
+# === MODO SERVICIO HTTP/JSON ===
+class _ManejadorClientes(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas: sin TCP_NODELAY, Nagle + ACK diferido suman ~40 ms
+    disable_nagle_algorithm = True
+    servicio = None
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        id_cliente = parse_qs(url.query).get("id_cliente", [None])[0]
+        timestamp = datetime.datetime.now().isoformat()
+
+        if url.path == "/salud":
+            self._responder(200, self.servicio.salud())
+        elif url.path not in ("/validar", "/perfil"):
+            self._responder(404, {"estado": "ERROR", "mensaje": f"Ruta no encontrada: {url.path}"})
+        elif not id_cliente:
+            self._responder(400, {"estado": "ERROR", "mensaje": "Parámetro `id_cliente` no recibido."})
+        elif url.path == "/validar":
+            existe = self.servicio.existe(id_cliente)
+            self._responder(200 if existe else 404, {
+                "estado": "OK" if existe else "NO_ENCONTRADO",
+                "id_cliente": id_cliente,
+                "marca_de_tiempo": timestamp,
+                "mensaje": "Parámetro validado correctamente." if existe
+                           else "El ID no existe en la base institucional.",
+            })
+        else:
+            perfil = self.servicio.perfil(id_cliente)
+            if perfil is None:
+                self._responder(404, {"estado": "NO_ENCONTRADO", "id_cliente": id_cliente,
+                                      "marca_de_tiempo": timestamp})
+            else:
+                self._responder(200, {"estado": "OK", "marca_de_tiempo": timestamp, "perfil": perfil})
+
+    def log_message(self, formato, *args):
+        # Sin log por petición: el costo de escribir en stderr domina la latencia
+        pass
+
+
+def crear_servidor(puerto: int = PUERTO_SERVICIO, host: str = "127.0.0.1", servicio: ServicioClientes = None):
+    """Servidor HTTP/JSON (hilos, keep-alive) sobre el índice caliente de clientes."""
+    manejador = type("ManejadorClientes", (_ManejadorClientes,), {"servicio": servicio or servicio_clientes()})
+    manejador.servicio.disponible()  # Carga en caliente antes de aceptar conexiones
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servicio local de validación y perfil de clientes")
+    parser.add_argument("--puerto", type=int, default=PUERTO_SERVICIO)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.puerto, args.host)
+    print(f"Madoli360 API en http://{args.host}:{args.puerto} (/validar, /perfil, /salud)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
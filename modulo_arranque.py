@@ -0,0 +1,161 @@
+# modulo_arranque.py
+# ░ Perfil de arranque: tiempo de importación por módulo y tiempo hasta el primer pintado ░
+#
+# Uso:
+#   MADOLI_PERFIL_ARRANQUE=1 streamlit run madoli360_streamlit.py   (reporte en logs_arranque.log)
+#   python modulo_arranque.py [--script madoli360_streamlit.py] [--top 25]
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+
+ACTIVO = os.environ.get("MADOLI_PERFIL_ARRANQUE", "") not in ("", "0")
+# Marcas que cierran el reporte de arranque: al registrarse todas se escribe una sola vez
+MARCAS_REPORTE = ("primer_pintado", "script_completo")
+
+_import_original = builtins.__import__
+_local = threading.local()
+_lock = threading.Lock()
+_importaciones = {}
+_marcas = {}
+_estado = {"instalado": False, "reportado": False}
+
+
+def _inicio_proceso() -> float:
+    """Instante (time.time) en que arrancó el proceso; sin /proc, el de este import."""
+    try:
+        with open("/proc/self/stat") as f:
+            # El nombre del ejecutable puede tener espacios: los campos se cuentan tras ')'
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        arranque_s = int(campos[19]) / os.sysconf("SC_CLK_TCK")
+        return time.time() - (uptime - arranque_s)
+    except (OSError, IndexError, ValueError):
+        return time.time()
+
+
+INICIO_PROCESO = _inicio_proceso()
+
+
+def _ms_desde_inicio() -> float:
+    return (time.time() - INICIO_PROCESO) * 1000
+
+
+def _import_medido(name, globals=None, locals=None, fromlist=(), level=0):
+    # Misma firma que builtins.__import__ (hay llamadas con palabras clave, p. ej. en 'encodings').
+    # Sólo se mide la primera carga: las recargas del script encuentran el módulo en sys.modules
+    if level or name in sys.modules:
+        return _import_original(name, globals, locals, fromlist, level)
+
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    pila.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        return _import_original(name, globals, locals, fromlist, level)
+    finally:
+        total = (time.perf_counter() - inicio) * 1000
+        hijos = pila.pop()
+        if pila:
+            pila[-1] += total
+        with _lock:
+            if name not in _importaciones:
+                _importaciones[name] = {"modulo": name, "propio_ms": round(total - hijos, 3),
+                                        "acumulado_ms": round(total, 3), "nivel": len(pila),
+                                        "desde_inicio_ms": round(_ms_desde_inicio(), 1)}
+
+
+def iniciar(forzar: bool = False):
+    """Instala la medición de imports (idempotente). Sin MADOLI_PERFIL_ARRANQUE no hace nada."""
+    if not (ACTIVO or forzar) or _estado["instalado"]:
+        return
+    builtins.__import__ = _import_medido
+    _estado["instalado"] = True
+    marcar("perfil_iniciado")
+
+
+def detener():
+    if _estado["instalado"]:
+        builtins.__import__ = _import_original
+        _estado["instalado"] = False
+
+
+def activo() -> bool:
+    return _estado["instalado"]
+
+
+def marcar(nombre: str):
+    """ms desde el arranque del proceso en que ocurre 'nombre' (sólo la primera vez)."""
+    if not _estado["instalado"] or nombre in _marcas:
+        return
+    _marcas[nombre] = round(_ms_desde_inicio(), 1)
+    if not _estado["reportado"] and all(m in _marcas for m in MARCAS_REPORTE):
+        _estado["reportado"] = True
+        from modulo_logs import logger_estructurado
+
+        log = logger_estructurado("madoli.arranque", "logs_arranque.log")
+        log.info("perfil_arranque", **reporte(top=40))
+
+
+def importaciones(top: int = None) -> list:
+    """Módulos cargados desde que se inició el perfil, de mayor a menor tiempo acumulado."""
+    with _lock:
+        filas = sorted(_importaciones.values(), key=lambda f: f["acumulado_ms"], reverse=True)
+    return filas[:top] if top else filas
+
+
+def reporte(top: int = None) -> dict:
+    directas = [f for f in importaciones() if f["nivel"] == 0]
+    return {
+        "marcas_ms": dict(_marcas),
+        "modulos_cargados": len(_importaciones),
+        "importacion_total_ms": round(sum(f["acumulado_ms"] for f in directas), 1),
+        "importaciones": importaciones(top),
+    }
+
+
+def _medir_script(script: str, top: int) -> dict:
+    """
+    Ejecuta el script una vez con AppTest en este proceso. Streamlit se
+    importa antes de activar el perfil, como en 'streamlit run'.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    iniciar(forzar=True)
+    inicio = time.perf_counter()
+    app = AppTest.from_file(script, default_timeout=600).run()
+    resultado = reporte(top)
+    resultado["primera_corrida_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    resultado["excepciones"] = [e.message for e in app.exception]
+    return resultado
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Perfil de arranque en frío de Madoli360")
+    parser.add_argument("--script", default="madoli360_streamlit.py")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="imprime el reporte completo como JSON")
+    args = parser.parse_args()
+
+    # El script importa 'modulo_arranque': las marcas deben quedar en ese módulo, no en __main__
+    import modulo_arranque
+
+    resultado = modulo_arranque._medir_script(args.script, args.top)
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        for marca, ms in resultado["marcas_ms"].items():
+            print(f"{marca:<22} {ms:>10.1f} ms")
+        print(f"{'primera corrida':<22} {resultado['primera_corrida_ms']:>10.1f} ms")
+        print(f"\n{'módulo':<48} {'nivel':>5} {'propio':>9} {'acumulado':>10}")
+        for fila in resultado["importaciones"]:
+            print(f"{fila['modulo'][:48]:<48} {fila['nivel']:>5} {fila['propio_ms']:>9.1f} {fila['acumulado_ms']:>10.1f}")
+        for mensaje in resultado["excepciones"]:
+            print(f"❌ {mensaje}", file=sys.stderr)
@@ -0,0 +1,182 @@
+# modulo_bitacora.py
+# ░ Bitácora técnica: eventos tipados en buffer circular y latencia por etapa del pipeline ░
+
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import pandas as pd
+
+# Eventos conservados por sesión (todas las recargas): al llenarse se descartan los más antiguos
+MAX_EVENTOS = int(os.environ.get("MADOLI_MAX_EVENTOS_BITACORA", 2_000))
+# Recargas visibles en el historial de latencias
+MAX_CORRIDAS = 20
+ETAPAS = ["carga", "normalizacion", "filtro", "grafico", "cluster", "exportacion"]
+ETAPA_GENERAL = "general"
+
+
+class Evento(NamedTuple):
+    ts: float
+    corrida: int
+    etapa: str
+    nivel: str
+    mensaje: str
+    filas: int = None
+    duracion_ms: float = None
+    bytes: int = None
+    # "evento" para mensajes; "etapa" para la medición de una etapa completa
+    tipo: str = "evento"
+
+
+def nivel_de(mensaje: str) -> str:
+    """Nivel inferido de los textos históricos de la bitácora (emoji o 'ERROR')."""
+    if "ERROR" in mensaje or "❌" in mensaje:
+        return "error"
+    if "⚠️" in mensaje or "⛔" in mensaje:
+        return "warning"
+    return "info"
+
+
+def _tamano(resultado):
+    if isinstance(resultado, (bytes, str)):
+        return len(resultado)
+    try:
+        return os.fstat(resultado.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class Bitacora:
+    """
+    Bitácora de una sesión: eventos (etapa, nivel, filas, duración, bytes)
+    en un deque acotado y numerados por recarga del script.
+
+    Conserva 'append(texto)' de la lista original, así que cargar_base y
+    compañía la reciben sin cambios: el evento toma la etapa en curso y el
+    nivel del propio texto. 'etapa(nombre)' mide un bloque y registra su
+    duración; 'desglose()' las suma por etapa para una recarga.
+    """
+
+    def __init__(self, max_eventos: int = MAX_EVENTOS):
+        self.eventos = deque(maxlen=max_eventos)
+        self.corrida = 0
+        self.descartados = 0
+        self.inicio_corrida = time.perf_counter()
+        self._etapa = ETAPA_GENERAL
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def __iter__(self):
+        return (e.mensaje for e in self.eventos)
+
+    def nueva_corrida(self):
+        """Marca el inicio de una recarga del script."""
+        self.corrida += 1
+        self.inicio_corrida = time.perf_counter()
+        self._etapa = ETAPA_GENERAL
+
+    def ms_corrida(self) -> float:
+        return (time.perf_counter() - self.inicio_corrida) * 1000
+
+    def registrar(self, mensaje: str, etapa: str = None, nivel: str = None, filas: int = None,
+                  duracion_ms: float = None, bytes: int = None, tipo: str = "evento", corrida: int = None):
+        if len(self.eventos) == self.eventos.maxlen:
+            self.descartados += 1
+        self.eventos.append(Evento(time.time(), self.corrida if corrida is None else corrida, etapa or self._etapa,
+                                   nivel or nivel_de(mensaje), mensaje, filas, duracion_ms, bytes, tipo))
+
+    def append(self, mensaje):
+        self.registrar(str(mensaje))
+
+    @contextmanager
+    def etapa(self, nombre: str, filas: int = None, bytes: int = None):
+        """
+        Mide el bloque como etapa 'nombre'. Se entrega un dict en el que el
+        bloque puede anotar 'filas' y 'bytes' antes de cerrar la medición.
+        """
+        anterior, self._etapa = self._etapa, nombre
+        medicion = {"filas": filas, "bytes": bytes}
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self._etapa = anterior
+            self.registrar(f"⏱️ Etapa '{nombre}' en {ms:.1f} ms", etapa=nombre, nivel="info",
+                           filas=medicion["filas"], duracion_ms=round(ms, 3), bytes=medicion["bytes"], tipo="etapa")
+
+    def diferido(self, nombre: str, funcion):
+        """
+        Envuelve un callable que se ejecuta después del render (p. ej. el
+        'data' de st.download_button) para medirlo como etapa 'nombre'.
+        """
+        corrida = self.corrida
+
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = funcion(*args, **kwargs)
+            ms = (time.perf_counter() - inicio) * 1000
+            self.registrar(f"⏱️ Etapa '{nombre}' en {ms:.1f} ms", etapa=nombre, nivel="info",
+                           duracion_ms=round(ms, 3), bytes=_tamano(resultado), tipo="etapa", corrida=corrida)
+            return resultado
+
+        return medido
+
+    # 🔎 Consultas
+    def de_corrida(self, corrida: int = None) -> list:
+        corrida = self.corrida if corrida is None else corrida
+        return [e for e in self.eventos if e.corrida == corrida]
+
+    def tabla(self, corrida: int = None) -> pd.DataFrame:
+        eventos = list(self.eventos) if corrida is None else self.de_corrida(corrida)
+        tabla = pd.DataFrame(eventos, columns=Evento._fields)
+        tabla["ts"] = pd.to_datetime(tabla["ts"], unit="s", utc=True)
+        return tabla
+
+    def desglose(self, corrida: int = None) -> pd.DataFrame:
+        """Duración, filas y bytes por etapa de una recarga (la actual por omisión)."""
+        tiempos = [e for e in self.de_corrida(corrida) if e.tipo == "etapa"]
+        if not tiempos:
+            return pd.DataFrame(columns=["duracion_ms", "filas", "bytes", "veces"]).rename_axis("etapa")
+        tabla = pd.DataFrame(tiempos, columns=Evento._fields)
+        grupos = tabla.groupby("etapa", sort=False)
+        desglose = pd.DataFrame({
+            "duracion_ms": grupos["duracion_ms"].sum(),
+            # Sin anotación la etapa queda vacía (no 0)
+            "filas": grupos["filas"].sum(min_count=1),
+            "bytes": grupos["bytes"].sum(min_count=1),
+            "veces": grupos.size(),
+        })
+        desglose["pct"] = (desglose["duracion_ms"] / desglose["duracion_ms"].sum()).round(4)
+        return desglose.round({"duracion_ms": 1})
+
+    def historial_latencias(self, corridas: int = MAX_CORRIDAS) -> pd.DataFrame:
+        """ms por etapa (columnas) de las últimas recargas (filas)."""
+        tiempos = [e for e in self.eventos if e.tipo == "etapa" and e.corrida > self.corrida - corridas]
+        if not tiempos:
+            return pd.DataFrame()
+        tabla = pd.DataFrame(tiempos, columns=Evento._fields)
+        pivote = tabla.pivot_table(index="corrida", columns="etapa", values="duracion_ms", aggfunc="sum")
+        orden = [c for c in ETAPAS if c in pivote.columns] + [c for c in pivote.columns if c not in ETAPAS]
+        pivote = pivote[orden]
+        pivote["total"] = pivote.sum(axis=1)
+        return pivote.round(1)
+
+    def exportar_json(self, corrida: int = None) -> str:
+        """Eventos (todos o de una recarga) como documento JSON para monitoreo."""
+        eventos = list(self.eventos) if corrida is None else self.de_corrida(corrida)
+        documento = {
+            "generado": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "corrida_actual": self.corrida,
+            "descartados": self.descartados,
+            "eventos": [
+                {**e._asdict(), "ts": datetime.fromtimestamp(e.ts, timezone.utc).isoformat(timespec="milliseconds")}
+                for e in eventos
+            ],
+        }
+        return json.dumps(documento, ensure_ascii=False, default=str)
@@ -0,0 +1,166 @@
+# modulo_bubble.py
+# ░ Envío de promociones a Bubble: sesión con pool, concurrencia acotada, límite de tasa y reintentos ░
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+URL_BUBBLE_ACTUALIZAR = os.environ.get(
+    "MADOLI_URL_BUBBLE", "https://madoli360.bubbleapps.io/api/1.1/wf/actualizar_cliente")
+# Workflow opcional que recibe {"clientes": [...]}: si existe, se envía por lotes
+URL_BUBBLE_LOTE = os.environ.get("MADOLI_URL_BUBBLE_LOTE", "")
+TOKEN_BUBBLE = os.environ.get("MADOLI_BUBBLE_TOKEN", "")
+
+CONCURRENCIA = int(os.environ.get("MADOLI_BUBBLE_CONCURRENCIA", 8))
+# Peticiones por segundo sostenidas y ráfaga máxima del token bucket
+TASA_POR_SEGUNDO = float(os.environ.get("MADOLI_BUBBLE_TASA", 20))
+RAFAGA = int(os.environ.get("MADOLI_BUBBLE_RAFAGA", 20))
+TAMANO_LOTE = 50
+REINTENTOS = 4
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+# (conexión, lectura) en segundos
+TIMEOUT = (3.05, 10)
+ESTADOS_REINTENTABLES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Límite de tasa compartido por los hilos: 'tasa' fichas por segundo, hasta 'capacidad' acumuladas."""
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = tasa
+        self.capacidad = max(1, capacidad)
+        self._fichas = float(self.capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        if self.tasa <= 0:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.tasa
+            time.sleep(espera)
+
+
+def clave_idempotencia(payload) -> str:
+    """Clave estable por contenido: reenviar el mismo payload no duplica la actualización."""
+    texto = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def crear_sesion(conexiones: int = CONCURRENCIA):
+    """requests.Session con pool de conexiones keep-alive del tamaño de la concurrencia."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexiones, max_retries=0)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.headers["Content-Type"] = "application/json"
+    if TOKEN_BUBBLE:
+        sesion.headers["Authorization"] = f"Bearer {TOKEN_BUBBLE}"
+    return sesion
+
+
+def _espera(intento, respuesta=None):
+    """Backoff exponencial con jitter; respeta Retry-After si el servidor lo envía."""
+    if respuesta is not None:
+        try:
+            return min(ESPERA_MAXIMA, float(respuesta.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento) * random.uniform(0.5, 1.0)
+
+
+def _enviar(sesion, url, payload, limite, reintentos, timeout):
+    """Una petición con reintentos. Devuelve (ok, estado o error, reintentos usados)."""
+    import requests
+
+    cabeceras = {"Idempotency-Key": clave_idempotencia(payload)}
+    cuerpo = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    detalle = None
+    for intento in range(reintentos + 1):
+        limite.tomar()
+        respuesta = None
+        try:
+            respuesta = sesion.post(url, data=cuerpo, headers=cabeceras, timeout=timeout)
+            respuesta.close()
+            if 200 <= respuesta.status_code < 300:
+                return True, respuesta.status_code, intento
+            detalle = respuesta.status_code
+            if respuesta.status_code not in ESTADOS_REINTENTABLES:
+                return False, detalle, intento
+        except requests.RequestException as e:
+            detalle = type(e).__name__
+        if intento < reintentos:
+            time.sleep(_espera(intento, respuesta))
+    return False, detalle, reintentos
+
+
+def payload_promocion(resultado) -> dict:
+    return {"id_cliente": resultado["id_cliente"], "promociones_sugeridas": resultado["promociones_sugeridas"]}
+
+
+def enviar_promociones(resultados, url: str = None, url_lote: str = None, concurrencia: int = CONCURRENCIA,
+                       tasa: float = TASA_POR_SEGUNDO, rafaga: int = RAFAGA, tamano_lote: int = TAMANO_LOTE,
+                       reintentos: int = REINTENTOS, timeout=TIMEOUT, progreso=None, sesion=None) -> dict:
+    """
+    Envía las promociones (dicts con id_cliente y promociones_sugeridas) a Bubble.
+
+    Con 'url_lote' los payloads viajan en grupos de 'tamano_lote' como
+    {"clientes": [...]}; sin él, uno por petición al workflow actualizar_cliente.
+    Las peticiones comparten una sesión con pool, pasan por un token bucket
+    y se reintentan con backoff ante 429/5xx o errores de red, siempre con la
+    misma cabecera Idempotency-Key. 'progreso(hechos, total)' se llama desde
+    el hilo que invoca (apto para st.progress).
+    """
+    url = url or URL_BUBBLE_ACTUALIZAR
+    url_lote = URL_BUBBLE_LOTE if url_lote is None else url_lote
+    payloads = [payload_promocion(r) for r in resultados if "error" not in r]
+    if url_lote and tamano_lote > 1:
+        envios = [(url_lote, {"clientes": payloads[i:i + tamano_lote]}, len(payloads[i:i + tamano_lote]))
+                  for i in range(0, len(payloads), tamano_lote)]
+    else:
+        envios = [(url, p, 1) for p in payloads]
+
+    propia = sesion is None
+    sesion = sesion or crear_sesion(concurrencia)
+    limite = TokenBucket(tasa, rafaga)
+    resumen = {"clientes": len(payloads), "peticiones": len(envios), "enviados": 0, "fallidos": 0,
+               "reintentos": 0, "errores": [], "segundos": 0.0}
+    inicio = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrencia), thread_name_prefix="bubble") as ejecutor:
+            futuros = {ejecutor.submit(_enviar, sesion, destino, payload, limite, reintentos, timeout): (payload, n)
+                       for destino, payload, n in envios}
+            hechos = 0
+            for futuro in as_completed(futuros):
+                payload, n = futuros[futuro]
+                ok, detalle, usados = futuro.result()
+                resumen["reintentos"] += usados
+                if ok:
+                    resumen["enviados"] += n
+                else:
+                    resumen["fallidos"] += n
+                    ids = [p["id_cliente"] for p in payload["clientes"]] if "clientes" in payload else [payload["id_cliente"]]
+                    resumen["errores"].extend((id_cliente, detalle) for id_cliente in ids)
+                hechos += n
+                if progreso is not None:
+                    progreso(hechos, len(payloads))
+    finally:
+        if propia:
+            sesion.close()
+    resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resumen
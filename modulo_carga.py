@@ -0,0 +1,482 @@
+# modulo_carga.py
+# ░ Capa institucional de carga con huella de fuente y caché de proceso ░
+
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from modulo_homologacion import VERSION_HOMOLOGACION, etapa_homologacion
+from modulo_ingesta import firma_ingesta, leer_csv
+
+# ⚙️ Orígenes de datos
+RUTA_DATOS = os.environ.get("MADOLI_RUTA_DATOS", "/Users/robertoibarrasuarez/Desktop/homologación_madoli/")
+RUTA_REPO = os.path.dirname(os.path.abspath(__file__))
+URL_GITHUB_BASE = "https://raw.githubusercontent.com/ibarrasuarez22-ux/madoli360_streamlit/main/"
+RUTA_SNAPSHOTS = os.environ.get("MADOLI_RUTA_SNAPSHOTS", os.path.join(RUTA_REPO, "snapshots"))
+SNAPSHOT_AUTOMATICO = os.environ.get("MADOLI_SNAPSHOT_AUTO", "1") != "0"
+
+# 🔒 Las sesiones reciben copias superficiales de las bases de la caché: con copy-on-write
+# cualquier escritura (conversión, rename, asignación de columna) copia sólo lo que toca y
+# nunca llega a los buffers compartidos. Desde pandas 3.0 está siempre activo.
+if int(pd.__version__.split(".")[0]) < 3:
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except KeyError:
+        pass
+
+# ⏱️ Vigencia de entradas: las fallidas se reintentan antes que las válidas
+TTL_SEGUNDOS = float(os.environ.get("MADOLI_TTL_CACHE", 900))
+TTL_FALLO_SEGUNDOS = 60.0
+TIMEOUT_REMOTO = 10
+
+
+# 🔎 Huellas de fuente
+def huella_local(ruta: str):
+    """Huella barata de un archivo local: mtime en ns y tamaño en bytes."""
+    try:
+        st_archivo = os.stat(ruta)
+    except OSError:
+        return None
+    return f"{st_archivo.st_mtime_ns}-{st_archivo.st_size}"
+
+
+def huella_fuente(ruta: str):
+    """Huella de un CSV fuente más la configuración de ingesta (p. ej. filtros DENUE)."""
+    huella = huella_local(ruta)
+    firma = firma_ingesta(os.path.basename(ruta))
+    return f"{huella}#{firma}" if huella is not None and firma else huella
+
+
+def huella_rutas(rutas):
+    """Huella compuesta de varios archivos locales (snapshot + CSV de origen)."""
+    huellas = [huella_fuente(r) for r in rutas]
+    if any(h is None for h in huellas):
+        return None
+    return "|".join(huellas)
+
+
+def huella_remota(url: str, timeout: float = TIMEOUT_REMOTO):
+    """Huella de un recurso remoto a partir de ETag (o Last-Modified + tamaño) vía HEAD."""
+    import requests
+
+    try:
+        resp = requests.head(url, timeout=timeout, allow_redirects=True)
+    except Exception:
+        return None
+    if resp.status_code != 200:
+        return None
+    return _huella_de_cabeceras(resp.headers)
+
+
+def _huella_de_cabeceras(cabeceras):
+    etag = cabeceras.get("ETag")
+    if etag:
+        return etag
+    modificado = cabeceras.get("Last-Modified")
+    if modificado:
+        return f"{modificado}-{cabeceras.get('Content-Length', '')}"
+    return None
+
+
+# 🗃️ Caché de proceso
+class CacheDatos:
+    """
+    Caché compartida por todas las sesiones del proceso.
+
+    Cada entrada guarda el DataFrame parseado junto con su origen y huella.
+    Las fuentes locales (CSV o snapshot) se validan por huella en cada acceso
+    (un os.stat por archivo); las remotas solo se revalidan al vencer el TTL.
+
+    El lock global sólo protege los diccionarios. La revalidación y la carga
+    (HEAD remoto, parseo, descarga) corren bajo un lock por clave: quien pide
+    la misma fuente espera una sola carga y las demás fuentes siguen sirviendo.
+    """
+
+    def __init__(self, ttl: float = TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._entradas = {}
+        self._stats = {}
+        self._locks_clave = {}
+        self._lock = threading.Lock()
+
+    def _acierto(self, clave, entrada, ahora, renovar=False):
+        with self._lock:
+            if renovar:
+                entrada["expira"] = ahora + self.ttl
+            self._stats[clave]["aciertos"] += 1
+        return entrada["df"], True, entrada
+
+    def obtener(self, clave, revalidar, cargar):
+        """
+        Devuelve (df, acierto, entrada).
+
+        revalidar(entrada) -> bool indica si la entrada sigue vigente;
+        cargar() -> dict con 'df', 'origen', 'rutas', 'remoto', 'huella'.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            self._stats.setdefault(clave, {"aciertos": 0, "fallos": 0})
+            lock_clave = self._locks_clave.setdefault(clave, threading.Lock())
+        # Remota dentro del TTL o fallo previo aún en ventana de espera: sin revalidar ni esperar
+        if entrada is not None and time.time() < entrada["expira"] and \
+                (entrada["huella"] is None or entrada.get("remoto")):
+            return self._acierto(clave, entrada, time.time())
+
+        with lock_clave:
+            ahora = time.time()
+            with self._lock:
+                # Otra llamada pudo recargarla mientras se esperaba el lock de la clave
+                entrada = self._entradas.get(clave)
+
+            if entrada is not None:
+                vencida = ahora >= entrada["expira"]
+                vigente = False
+                if entrada["huella"] is not None:
+                    if not entrada.get("remoto") or vencida:
+                        vigente = revalidar(entrada)
+                    else:
+                        vigente = True
+                elif not vencida:
+                    vigente = True
+
+                if vigente:
+                    return self._acierto(clave, entrada, ahora, renovar=vencida)
+
+            inicio = time.perf_counter()
+            entrada = cargar()
+            entrada["ms_carga"] = (time.perf_counter() - inicio) * 1000
+            entrada["cargado_en"] = datetime.now()
+            if entrada["huella"] is not None:
+                # Los índices derivados (filtros, clientes…) se indexan por esta huella
+                entrada["df"].attrs["madoli_huella"] = f"{clave}@{entrada['huella']}"
+            ttl = self.ttl if entrada["huella"] is not None else TTL_FALLO_SEGUNDOS
+            entrada["expira"] = time.time() + ttl
+            with self._lock:
+                self._entradas[clave] = entrada
+                self._stats[clave]["fallos"] += 1
+            return entrada["df"], False, entrada
+
+    def invalidar(self, clave=None):
+        """Descarta una entrada (o todas si clave es None)."""
+        with self._lock:
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            filas = []
+            for clave, stats in self._stats.items():
+                entrada = self._entradas.get(clave, {})
+                filas.append({
+                    "fuente": clave,
+                    "origen": entrada.get("origen", "—"),
+                    "registros": len(entrada["df"]) if "df" in entrada else 0,
+                    "huella": entrada.get("huella"),
+                    "aciertos": stats["aciertos"],
+                    "fallos": stats["fallos"],
+                    "ms_ultima_carga": round(entrada.get("ms_carga", 0.0), 1),
+                    "cargado_en": entrada.get("cargado_en"),
+                })
+            return filas
+
+
+CACHE_DATOS = CacheDatos()
+
+
+# 📦 Snapshots columnares (Parquet) ya tipados y homologados
+def ruta_snapshot(nombre_archivo: str) -> str:
+    return os.path.join(RUTA_SNAPSHOTS, os.path.splitext(nombre_archivo)[0] + ".parquet")
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    return pq
+
+
+def metadatos_snapshot(ruta: str):
+    pq = _parquet()
+    if pq is None or not os.path.isfile(ruta):
+        return None
+    try:
+        meta = pq.read_schema(ruta, memory_map=True).metadata or {}
+    except Exception:
+        return None
+    return {k.decode(): v.decode() for k, v in meta.items() if k.startswith(b"madoli_")}
+
+
+def snapshot_vigente(ruta: str, ruta_fuente=None, huella_origen=None) -> bool:
+    """
+    Un snapshot es vigente si fue generado con la versión actual de
+    homologación y, cuando el CSV de origen existe en local, con su huella
+    (o con 'huella_origen', p. ej. el ETag de una fuente remota).
+    """
+    meta = metadatos_snapshot(ruta)
+    if not meta or meta.get("madoli_version") != VERSION_HOMOLOGACION:
+        return False
+    if ruta_fuente is not None:
+        return meta.get("madoli_huella_fuente") == huella_fuente(ruta_fuente)
+    if huella_origen is not None:
+        return meta.get("madoli_huella_fuente") == huella_origen
+    return True
+
+
+def leer_snapshot(ruta: str, columnas=None) -> pd.DataFrame:
+    """Lee un snapshot con memory-map, proyectando solo las columnas pedidas."""
+    pq = _parquet()
+    if columnas is not None:
+        disponibles = set(pq.read_schema(ruta, memory_map=True).names)
+        columnas = [c for c in columnas if c in disponibles]
+    tabla = pq.read_table(ruta, columns=columnas, memory_map=True)
+    return tabla.to_pandas()
+
+
+def escribir_snapshot(nombre_archivo: str, df: pd.DataFrame, ruta_fuente=None, huella_origen=None) -> str:
+    """
+    Escribe el snapshot de una base ya homologada (escritura atómica). Sin CSV
+    local, 'huella_origen' (ETag de la descarga) queda como huella de la fuente.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    ruta = ruta_snapshot(nombre_archivo)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    try:
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columnas de texto con tipos mezclados (p. ej. números y cadenas)
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+    meta = dict(tabla.schema.metadata or {})
+    meta.update({
+        b"madoli_version": VERSION_HOMOLOGACION.encode(),
+        b"madoli_fuente": os.path.basename(ruta_fuente or nombre_archivo).encode(),
+        b"madoli_huella_fuente": (huella_fuente(ruta_fuente) if ruta_fuente else huella_origen or "").encode(),
+        b"madoli_generado": datetime.now().isoformat().encode(),
+    })
+    tabla = tabla.replace_schema_metadata(meta)
+
+    temporal = ruta + ".tmp"
+    pq.write_table(tabla, temporal, compression="zstd")
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar_snapshot(nombre_archivo: str, columnas=None):
+    """Snapshot vigente de una base que no tiene CSV local (p. ej. el censo), o None."""
+    ruta = ruta_snapshot(nombre_archivo)
+    if _parquet() is None or not snapshot_vigente(ruta):
+        return None
+    return leer_snapshot(ruta, columnas)
+
+
+# 📄 Resolución de fuentes
+def _resolver_local(nombres):
+    for nombre in nombres:
+        for carpeta in (RUTA_DATOS, RUTA_REPO):
+            ruta = os.path.join(carpeta, nombre)
+            if os.path.isfile(ruta):
+                return ruta
+    return None
+
+
+def _leer_remoto(url):
+    import requests
+
+    resp = requests.get(url, timeout=TIMEOUT_REMOTO)
+    resp.raise_for_status()
+    df = pd.read_csv(io.BytesIO(resp.content), encoding="utf-8-sig")
+    return df, _huella_de_cabeceras(resp.headers) or f"len-{len(resp.content)}"
+
+
+def _proyectar(df, columnas):
+    if columnas is None:
+        return df
+    return df[[c for c in columnas if c in df.columns]]
+
+
+def _homologar_medido(nombre, huella, leer):
+    """
+    (df, normalizacion) de etapa_homologacion: normalizacion es (origen, ms)
+    con sólo el tiempo de homologar, sin el parseo; 'memo' si la huella ya
+    estaba homologada en memoria.
+    """
+    lectura = {}
+
+    def leer_medido():
+        inicio = time.perf_counter()
+        crudo = leer()
+        lectura["ms"] = (time.perf_counter() - inicio) * 1000
+        return crudo
+
+    inicio = time.perf_counter()
+    df = etapa_homologacion(nombre, huella, leer_medido)
+    ms = (time.perf_counter() - inicio) * 1000 - lectura.get("ms", 0.0)
+    return df, ("homologación" if lectura else "memo", ms)
+
+
+def _cargar_fuente(nombres, columnas, errores):
+    ruta_csv = _resolver_local(nombres)
+    ruta_snap = ruta_snapshot(nombres[0])
+
+    # 1️⃣ Snapshot vigente: sin parseo de CSV ni homologación
+    if _parquet() is not None and snapshot_vigente(ruta_snap, ruta_csv):
+        rutas = (ruta_snap, ruta_csv) if ruta_csv else (ruta_snap,)
+        df = leer_snapshot(ruta_snap, columnas)
+        # El snapshot se escribió ya homologado: no hay normalización que medir
+        return {"df": df, "origen": "snapshot", "rutas": rutas, "remoto": False,
+                "huella": huella_rutas(rutas), "normalizacion": ("snapshot", 0.0)}
+
+    # 2️⃣ CSV local: se homologa y se regenera el snapshot para la próxima carga
+    if ruta_csv:
+        huella = huella_fuente(ruta_csv)
+        try:
+            df, normalizacion = _homologar_medido(os.path.basename(ruta_csv), huella, lambda: leer_csv(ruta_csv))
+        except MemoryError as e:
+            # Presupuesto de ingesta excedido: no tiene sentido reintentar desde GitHub
+            errores.append(str(e))
+            return {"df": pd.DataFrame(), "origen": "error", "rutas": (), "remoto": False, "huella": None}
+        if SNAPSHOT_AUTOMATICO and _parquet() is not None:
+            try:
+                escribir_snapshot(nombres[0], df, ruta_csv)
+            except Exception as e:
+                errores.append(f"snapshot {nombres[0]}: {e}")
+        return {"df": _proyectar(df, columnas), "origen": "local", "rutas": (ruta_csv,),
+                "remoto": False, "huella": huella, "normalizacion": normalizacion}
+
+    # 3️⃣ GitHub como último recurso
+    for nombre in nombres:
+        url = URL_GITHUB_BASE + nombre
+        try:
+            crudo, huella = _leer_remoto(url)
+            df, normalizacion = _homologar_medido(nombre, huella, lambda: crudo)
+            return {"df": _proyectar(df, columnas), "origen": "github", "rutas": (url,),
+                    "remoto": True, "huella": huella, "normalizacion": normalizacion}
+        except Exception as e:
+            errores.append(f"{nombre}: {e}")
+
+    return {"df": pd.DataFrame(), "origen": "error", "rutas": (), "remoto": False, "huella": None}
+
+
+def _revalidar(entrada):
+    if entrada.get("remoto"):
+        return huella_remota(entrada["rutas"][0]) == entrada["huella"]
+    return huella_rutas(entrada["rutas"]) == entrada["huella"]
+
+
+# === FUNCIÓN GENERAL PARA CARGA DE BASES ===
+def cargar_base(nombre_archivo, bitacora=None, alternativas=(), columnas=None):
+    """
+    Carga una base institucional ya homologada pasando por la caché de proceso.
+
+    Orden de fuentes: snapshot Parquet vigente, CSV local (RUTA_DATOS y carpeta
+    del repositorio) y GitHub. 'alternativas' son nombres de archivo
+    equivalentes que se prueban en orden si el principal no existe (p. ej.
+    empresa.csv para DENUE); 'columnas' limita la lectura a esas columnas.
+    """
+    nombres = (nombre_archivo, *alternativas)
+    clave = nombre_archivo if columnas is None else f"{nombre_archivo}[{','.join(columnas)}]"
+    errores = []
+    inicio = time.perf_counter()
+    df, acierto, entrada = CACHE_DATOS.obtener(
+        clave,
+        _revalidar,
+        lambda: _cargar_fuente(nombres, columnas, errores),
+    )
+    ms = (time.perf_counter() - inicio) * 1000
+    _anotar_carga(bitacora, nombre_archivo, df, acierto, entrada, ms, errores)
+
+    # Copia superficial: las columnas reasignadas por la sesión no tocan la caché
+    return df.copy(deep=False)
+
+
+def base_compartida(clave, huella: str, cargar, origen: str, bitacora=None):
+    """
+    Registra en la caché de proceso una base que no se resuelve con cargar_base
+    (p. ej. el censo de modulo_remoto). Mientras 'huella' no cambie, todas las
+    sesiones reciben la misma base sin volver a leerla; si cargar() falla el
+    error se propaga y no queda nada en la caché.
+    """
+    inicio = time.perf_counter()
+    df, acierto, entrada = CACHE_DATOS.obtener(
+        clave,
+        lambda entrada: entrada["huella"] == huella,
+        lambda: {"df": cargar(), "origen": origen, "rutas": (), "remoto": False, "huella": huella},
+    )
+    _anotar_carga(bitacora, clave, df, acierto, entrada, (time.perf_counter() - inicio) * 1000, [])
+    return df.copy(deep=False)
+
+
+def _anotar_carga(bitacora, nombre_archivo, df, acierto, entrada, ms, errores):
+    if bitacora is None:
+        return
+    estado = "caché HIT" if acierto else "caché MISS"
+    if entrada["origen"] == "error":
+        detalle = "; ".join(errores) or "sin fuente disponible"
+        bitacora.append(f"[{datetime.now()}] ERROR carga {nombre_archivo} ({estado}): {detalle}")
+    else:
+        for error in errores:
+            bitacora.append(f"[{datetime.now()}] ⚠️ {error}")
+        bitacora.append(
+            f"[{datetime.now()}] {nombre_archivo} · {estado} · {ms:.1f} ms · "
+            f"origen {entrada['origen']} ({len(df):,} registros)"
+        )
+    # La normalización sólo ocurre en la carga que llenó la caché: se mide ahí, una vez por huella
+    if not acierto and entrada.get("normalizacion") and hasattr(bitacora, "registrar"):
+        origen, ms_normalizacion = entrada["normalizacion"]
+        bitacora.registrar(f"⏱️ Etapa 'normalizacion' en {ms_normalizacion:.1f} ms ({nombre_archivo}, {origen})",
+                           etapa="normalizacion", nivel="info", filas=len(df),
+                           duracion_ms=round(ms_normalizacion, 3), tipo="etapa")
+
+
+def invalidar_cache(nombre_archivo=None):
+    CACHE_DATOS.invalidar(nombre_archivo)
+
+
+def estadisticas_cache():
+    return pd.DataFrame(CACHE_DATOS.estadisticas())
+
+
+# 🧮 Estructuras derivadas (índices, resúmenes) compartidas por huella de datos
+MAX_DERIVADOS = 16
+_derivados = OrderedDict()
+_derivados_lock = threading.Lock()
+
+
+def derivado(df: pd.DataFrame, clave, construir):
+    """
+    Devuelve construir(df) memorizado por (huella del DataFrame, clave).
+
+    Las bases sin huella (p. ej. vacías tras un error de carga) se construyen
+    sin memorizar. Devuelve (objeto, ms de construcción; 0.0 si ya existía).
+    """
+    huella = df.attrs.get("madoli_huella")
+    clave = (huella, len(df), clave)
+    if huella is not None:
+        with _derivados_lock:
+            if clave in _derivados:
+                _derivados.move_to_end(clave)
+                return _derivados[clave], 0.0
+
+    inicio = time.perf_counter()
+    objeto = construir(df)
+    ms = (time.perf_counter() - inicio) * 1000
+    if huella is not None:
+        with _derivados_lock:
+            _derivados[clave] = objeto
+            while len(_derivados) > MAX_DERIVADOS:
+                _derivados.popitem(last=False)
+    return objeto, ms
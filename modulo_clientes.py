@@ -0,0 +1,118 @@
+# modulo_clientes.py
+# ░ Índice por cliente y resumen materializado para "Perfil por Cliente" ░
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import derivado
+
+
+class IndiceClientes:
+    """
+    Índice id_cliente → posiciones de fila, construido una vez por huella.
+
+    Las filas se ordenan por cliente (orden estable) y cada cliente ocupa un
+    tramo contiguo [inicio, fin) del arreglo de posiciones, así que un perfil
+    se obtiene con un lookup de diccionario y un slice.
+
+    'resumen' es la tabla materializada por cliente (misma lógica que el
+    perfil: sólo pólizas con prima positiva cuando la columna existe).
+    """
+
+    def __init__(self, df: pd.DataFrame, col_id: str = "id_cliente", col_prima: str = "premium_mxn",
+                 col_aseguradora: str = "source", col_producto: str = "product",
+                 col_nombre: str = "contractor_name", col_fin: str = "end_date"):
+        self.df = df
+        self.col_id = col_id
+
+        codigos, ids = pd.factorize(df[col_id], sort=True)
+        self.ids = ids.to_numpy(dtype=object).tolist()
+        self._codigo = {valor: k for k, valor in enumerate(self.ids)}
+        # Los IDs de Bubble llegan como texto: se indexa también su forma str
+        for valor, k in list(self._codigo.items()):
+            self._codigo.setdefault(str(valor), k)
+
+        con_id = codigos >= 0
+        self._orden = np.flatnonzero(con_id)[np.argsort(codigos[con_id], kind="stable")]
+        conteos = np.bincount(codigos[con_id], minlength=len(self.ids))
+        self._limites = np.concatenate([[0], np.cumsum(conteos)])
+
+        self.resumen = self._construir_resumen(df, codigos, col_prima, col_aseguradora,
+                                               col_producto, col_nombre, col_fin)
+
+    def _construir_resumen(self, df, codigos, col_prima, col_aseguradora, col_producto, col_nombre, col_fin):
+        total = len(self.ids)
+        con_id = codigos >= 0
+
+        if col_prima in df.columns:
+            prima = pd.to_numeric(df[col_prima], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            validas = con_id & (prima > 0)
+        else:
+            prima = None
+            validas = con_id
+
+        cod_validos = codigos[validas]
+        resumen = pd.DataFrame({self.col_id: pd.Series(self.ids, dtype=object)})
+        resumen["contratante"] = self._primer_no_nulo(df, codigos, col_nombre, total)
+        resumen["registros"] = np.bincount(codigos[con_id], minlength=total)
+        resumen["polizas"] = np.bincount(cod_validos, minlength=total)
+        resumen["aseguradoras"] = self._distintos(df, col_aseguradora, cod_validos, validas, total)
+        resumen["productos"] = self._distintos(df, col_producto, cod_validos, validas, total)
+        resumen["prima_total"] = (np.bincount(cod_validos, weights=prima[validas], minlength=total)
+                                  if prima is not None else 0.0)
+        if col_fin in df.columns:
+            con_fin = df[col_fin].notna().to_numpy()
+            resumen["vencimientos"] = np.bincount(codigos[validas & con_fin], minlength=total)
+        else:
+            resumen["vencimientos"] = 0
+        return resumen
+
+    @staticmethod
+    def _distintos(df, col, cod_validos, validas, total):
+        if col not in df.columns:
+            return 0
+        valores, unicos = pd.factorize(df[col])
+        valores = valores[validas]
+        con_valor = valores >= 0
+        base = max(len(unicos), 1)
+        pares = np.unique(cod_validos[con_valor].astype(np.int64) * base + valores[con_valor])
+        return np.bincount(pares // base, minlength=total)
+
+    @staticmethod
+    def _primer_no_nulo(df, codigos, col, total):
+        if col not in df.columns:
+            return "Sin nombre"
+        serie = df[col]
+        con_valor = (codigos >= 0) & serie.notna().to_numpy()
+        primeros = pd.Series(serie.to_numpy()[con_valor]).groupby(codigos[con_valor], sort=True).first()
+        return primeros.reindex(range(total)).fillna("Sin nombre").to_numpy(dtype=object)
+
+    def __contains__(self, id_cliente):
+        return id_cliente in self._codigo
+
+    def codigo(self, id_cliente):
+        """Posición del cliente en 'ids' y en 'resumen', o None si el ID no existe."""
+        return self._codigo.get(id_cliente)
+
+    def posiciones(self, id_cliente) -> np.ndarray:
+        k = self._codigo.get(id_cliente)
+        if k is None:
+            return np.empty(0, dtype=np.int64)
+        return self._orden[self._limites[k]:self._limites[k + 1]]
+
+    def perfil(self, id_cliente) -> pd.DataFrame:
+        """Pólizas del cliente (todas, sin filtrar por prima), en el orden de la base."""
+        return self.df.take(self.posiciones(id_cliente))
+
+    def resumen_de(self, id_cliente):
+        """Fila del resumen materializado como dict, o None si el ID no existe."""
+        k = self._codigo.get(id_cliente)
+        if k is None:
+            return None
+        return self.resumen.iloc[k].to_dict()
+
+
+def indice_clientes(df: pd.DataFrame, **columnas):
+    """Índice de clientes compartido por sesiones; se reconstruye sólo si cambia la huella."""
+    clave = ("clientes", tuple(sorted(columnas.items())))
+    return derivado(df, clave, lambda d: IndiceClientes(d, **columnas))
@@ -0,0 +1,529 @@
+# modulo_consultas.py
+# ░ Acceso a datos por SQL: filtros KPI, perfil por cliente y rollup trimestral empujados al motor ░
+#
+# MADOLI_MOTOR_CONSULTAS elige el motor:
+#   pandas   (por omisión) índices en memoria de modulo_filtros / modulo_clientes / modulo_sectorial
+#   duckdb   SQL embebido directo sobre los snapshots Parquet (o el DataFrame ya cargado)
+#   sqlite   SQL embebido sobre una copia .sqlite del snapshot, regenerada cuando cambia la huella
+#   bigquery mismas consultas contra MADOLI_BQ_PROYECTO.MADOLI_BQ_DATASET
+# Sólo el resultado agregado vuelve a Python.
+
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import RUTA_SNAPSHOTS, _resolver_local, derivado, huella_rutas, ruta_snapshot, snapshot_vigente
+
+# Cambia cuando cambia la forma de copiar las bases a SQLite (invalida las copias guardadas)
+VERSION_COPIA_SQLITE = "2"
+MOTOR_CONSULTAS = os.environ.get("MADOLI_MOTOR_CONSULTAS", "pandas").strip().lower()
+BQ_PROYECTO = os.environ.get("MADOLI_BQ_PROYECTO", "")
+BQ_DATASET = os.environ.get("MADOLI_BQ_DATASET", "madoli360")
+BQ_CREDENCIALES = os.environ.get("MADOLI_BQ_CREDENCIALES",
+                                 "/Users/robertoibarrasuarez/Desktop/credenciales_gcp.json")
+MAX_CONSULTAS_MEMO = 256
+SIN_RAMO = "SIN RAMO"
+
+
+def _nombre_tabla(nombre_archivo: str) -> str:
+    return re.sub(r"\W", "_", os.path.splitext(os.path.basename(nombre_archivo))[0])
+
+
+class Motor:
+    """
+    Dialecto y ejecución de un motor SQL. Las consultas de este módulo se
+    escriben una sola vez con estos métodos; cada motor sólo cambia comillas,
+    casts, parámetros y cómo se resuelve una base a una tabla.
+    """
+
+    nombre = "sql"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def ident(self, columna: str) -> str:
+        return '"' + columna.replace('"', '""') + '"'
+
+    def texto(self, expr: str) -> str:
+        return f"CAST({expr} AS VARCHAR)"
+
+    def numero(self, expr: str) -> str:
+        return f"TRY_CAST({expr} AS DOUBLE)"
+
+    def param(self, nombre: str, valor, parametros: dict) -> str:
+        parametros[nombre] = valor
+        return f"${nombre}"
+
+    def en_lista(self, expr: str, nombre: str, valores, parametros: dict) -> str:
+        """expr IN (valores), comparando como texto; lista vacía = ninguna fila."""
+        parametros[nombre] = [str(v) for v in valores]
+        return f"list_contains(CAST(${nombre} AS VARCHAR[]), {self.texto(expr)})"
+
+    def tabla(self, nombre_archivo: str, df: pd.DataFrame = None, indices=()) -> str:
+        """Expresión FROM de una base; 'indices' son columnas de búsqueda puntual (p. ej. id_cliente)."""
+        raise NotImplementedError
+
+    def consultar(self, sql: str, parametros: dict = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class MotorDuckDB(Motor):
+    """DuckDB en memoria: lee el snapshot Parquet con proyección y filtros empujados al escaneo."""
+
+    nombre = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        super().__init__()
+        self._con = duckdb.connect(database=":memory:")
+        self._vigentes = {}
+
+    def tabla(self, nombre_archivo, df=None, indices=()):
+        ruta = ruta_snapshot(nombre_archivo)
+        fuente = _resolver_local((nombre_archivo,))
+        # La vigencia (metadatos del Parquet) se revisa sólo cuando cambia la huella de los archivos
+        huella = huella_rutas((ruta, fuente) if fuente else (ruta,))
+        if huella is not None:
+            if self._vigentes.get(ruta, (None,))[0] != huella:
+                self._vigentes[ruta] = (huella, snapshot_vigente(ruta, fuente))
+            if self._vigentes[ruta][1]:
+                return "read_parquet('" + ruta.replace("'", "''") + "')"
+        if df is None:
+            raise LookupError(f"Sin snapshot vigente para {nombre_archivo}")
+        # Sin snapshot (p. ej. base descargada de GitHub): DuckDB escanea el DataFrame sin copiarlo
+        vista = f"df_{_nombre_tabla(nombre_archivo)}"
+        with self._lock:
+            self._con.register(vista, df)
+        return vista
+
+    def consultar(self, sql, parametros=None):
+        with self._lock:
+            return self._con.execute(sql, parametros or {}).df()
+
+
+class MotorSQLite(Motor):
+    """
+    SQLite de la biblioteca estándar. No lee Parquet: cada base se copia una
+    vez a una tabla de snapshots/consultas.sqlite (con índice por columna de
+    búsqueda) y se regenera cuando cambia la huella del DataFrame.
+    """
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta: str = os.path.join(RUTA_SNAPSHOTS, "consultas.sqlite")):
+        super().__init__()
+        self.ruta = ruta
+        self._con = None
+        self._huellas = {}
+        self._indices = set()
+        # {nombre en SQLite: nombre original} de las columnas renombradas al copiar
+        self._originales = {}
+
+    def texto(self, expr):
+        return f"CAST({expr} AS TEXT)"
+
+    def numero(self, expr):
+        return f"CAST({expr} AS REAL)"
+
+    def param(self, nombre, valor, parametros):
+        parametros[nombre] = valor
+        return f":{nombre}"
+
+    def en_lista(self, expr, nombre, valores, parametros):
+        if not len(valores):
+            return "0"
+        marcadores = []
+        for k, valor in enumerate(valores):
+            parametros[f"{nombre}_{k}"] = str(valor)
+            marcadores.append(f":{nombre}_{k}")
+        return f"{self.texto(expr)} IN ({', '.join(marcadores)})"
+
+    def _conexion(self):
+        if self._con is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._con = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._con.execute("CREATE TABLE IF NOT EXISTS _madoli (base TEXT PRIMARY KEY, huella TEXT)")
+        return self._con
+
+    def tabla(self, nombre_archivo, df=None, indices=()):
+        base = _nombre_tabla(nombre_archivo)
+        huella = None if df is None else f"{df.attrs.get('madoli_huella')}|{len(df)}|{VERSION_COPIA_SQLITE}"
+        with self._lock:
+            con = self._conexion()
+            if huella is not None and self._huellas.get(base) != huella:
+                nombres = _columnas_sqlite(df.columns)
+                self._originales.update({nuevo: original for original, nuevo in nombres.items() if nuevo != original})
+                guardada = con.execute("SELECT huella FROM _madoli WHERE base = ?", (base,)).fetchone()
+                if guardada is None or guardada[0] != huella:
+                    _copiar_a_sqlite(con, base, df, nombres)
+                    con.execute("INSERT OR REPLACE INTO _madoli VALUES (?, ?)", (base, huella))
+                    con.commit()
+                self._huellas[base] = huella
+                self._indices = {(b, c) for b, c in self._indices if b != base}
+            for col in indices:
+                if (base, col) not in self._indices:
+                    # Índice sobre la misma expresión que usan las búsquedas (comparación como texto)
+                    con.execute(f'CREATE INDEX IF NOT EXISTS "ix_{base}_{col}" '
+                                f'ON {self.ident(base)} ({self.texto(self.ident(col))})')
+                    self._indices.add((base, col))
+        return self.ident(base)
+
+    def consultar(self, sql, parametros=None):
+        with self._lock:
+            resultado = pd.read_sql_query(sql, self._conexion(), params=parametros or {})
+            renombradas = {c: self._originales[c] for c in resultado.columns if c in self._originales}
+        return resultado.rename(columns=renombradas) if renombradas else resultado
+
+
+def _columnas_sqlite(columnas) -> dict:
+    """
+    {original: nombre en SQLite}. SQLite no distingue mayúsculas en nombres de
+    columna: la primera de cada grupo conserva su nombre y las demás reciben
+    un sufijo '__n' libre ('TelEfono' junto a 'telefono' → 'TelEfono__2').
+    """
+    usados = {str(c).lower() for c in columnas}
+    vistas, nombres = set(), {}
+    for col in columnas:
+        nombre = str(col)
+        if nombre.lower() in vistas:
+            k = 2
+            while f"{nombre}__{k}".lower() in usados:
+                k += 1
+            nombre = f"{nombre}__{k}"
+            usados.add(nombre.lower())
+        vistas.add(nombre.lower())
+        nombres[col] = nombre
+    return nombres
+
+
+def _copiar_a_sqlite(con, base, df, nombres):
+    copia = df.copy(deep=False)
+    copia.columns = [nombres[c] for c in df.columns]
+    for col in copia.columns:
+        # Categóricas, fechas y tipos de Arrow como texto/número nativo de SQLite
+        if isinstance(copia[col].dtype, pd.CategoricalDtype) or str(copia[col].dtype).startswith(("string", "large_string")):
+            copia[col] = copia[col].astype(object).where(copia[col].notna(), None)
+        elif pd.api.types.is_datetime64_any_dtype(copia[col]):
+            copia[col] = copia[col].dt.strftime("%Y-%m-%d")
+    copia.to_sql(base, con, if_exists="replace", index=False, chunksize=50_000)
+
+
+class MotorBigQuery(Motor):
+    """BigQuery: las bases son tablas <proyecto>.<dataset>.<base> cargadas desde los snapshots."""
+
+    nombre = "bigquery"
+
+    def __init__(self, proyecto: str = BQ_PROYECTO, dataset: str = BQ_DATASET, credenciales: str = BQ_CREDENCIALES):
+        from google.cloud import bigquery
+
+        super().__init__()
+        self._bigquery = bigquery
+        if credenciales and os.path.isfile(credenciales):
+            self._cliente = bigquery.Client.from_service_account_json(credenciales, project=proyecto or None)
+        else:
+            self._cliente = bigquery.Client(project=proyecto or None)
+        self.proyecto = proyecto or self._cliente.project
+        self.dataset = dataset
+
+    def ident(self, columna):
+        return "`" + columna.replace("`", "\\`") + "`"
+
+    def texto(self, expr):
+        return f"CAST({expr} AS STRING)"
+
+    def numero(self, expr):
+        return f"SAFE_CAST({expr} AS FLOAT64)"
+
+    def param(self, nombre, valor, parametros):
+        parametros[nombre] = valor
+        return f"@{nombre}"
+
+    def en_lista(self, expr, nombre, valores, parametros):
+        parametros[nombre] = [str(v) for v in valores]
+        return f"{self.texto(expr)} IN UNNEST(@{nombre})"
+
+    def tabla(self, nombre_archivo, df=None, indices=()):
+        return f"`{self.proyecto}.{self.dataset}.{_nombre_tabla(nombre_archivo)}`"
+
+    def consultar(self, sql, parametros=None):
+        bigquery = self._bigquery
+        tipos = {bool: "BOOL", int: "INT64", float: "FLOAT64"}
+        config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter(nombre, "STRING", valor) if isinstance(valor, list)
+            else bigquery.ScalarQueryParameter(nombre, tipos.get(type(valor), "STRING"), valor)
+            for nombre, valor in (parametros or {}).items()
+        ])
+        return self._cliente.query(sql, job_config=config).to_dataframe()
+
+
+# 🔌 Motor del proceso (compartido por sesiones)
+_motores = {}
+# {motor pedido: motivo} cuando se sirve otro motor en su lugar
+_sustituciones = {}
+_motores_lock = threading.Lock()
+MOTORES = {"duckdb": MotorDuckDB, "sqlite": MotorSQLite, "bigquery": MotorBigQuery}
+
+
+def motor_consultas(tipo: str = MOTOR_CONSULTAS):
+    """
+    Motor SQL configurado, o None para el camino pandas. Sin duckdb instalado
+    se usa SQLite y el motivo queda en aviso_motor (para la Bitácora).
+    """
+    if tipo in ("", "pandas"):
+        return None
+    if tipo not in MOTORES:
+        raise ValueError(f"Motor de consultas desconocido: {tipo}")
+    with _motores_lock:
+        if tipo not in _motores:
+            try:
+                _motores[tipo] = MOTORES[tipo]()
+            except ImportError as e:
+                if tipo != "duckdb":
+                    raise
+                _sustituciones[tipo] = f"{type(e).__name__}: {e}"
+                _motores[tipo] = _motores.setdefault("sqlite", MotorSQLite())
+        return _motores[tipo]
+
+
+def aviso_motor(tipo: str = MOTOR_CONSULTAS):
+    """Texto para la Bitácora si el motor pedido se sustituyó por otro (None si no)."""
+    with _motores_lock:
+        motivo = _sustituciones.get(tipo)
+    if motivo is None:
+        return None
+    return (f"Motor de consultas '{tipo}' no disponible ({motivo}); se usa '{_motores[tipo].nombre}', "
+            f"que copia cada base a SQLite al cambiar su huella.")
+
+
+def _orden_pandas(valores: list, serie: pd.Series) -> list:
+    """
+    Valores distintos devueltos por el motor, en el orden de
+    pd.factorize(serie, sort=True) que usan los índices pandas: las
+    categorías en su orden declarado y el resto ordenado por valor.
+    """
+    if not valores:
+        return []
+    try:
+        distintos = pd.Series(valores, dtype=object).astype(serie.dtype)
+    except (TypeError, ValueError):
+        return valores
+    return list(pd.factorize(distintos, sort=True)[1])
+
+
+# 📊 KPIs: misma interfaz que modulo_filtros.IndiceFiltros (valores, columnas_filtro, kpis, conteos)
+class FiltrosSQL:
+    def __init__(self, motor: Motor, nombre_archivo: str, df: pd.DataFrame, columnas_filtro: dict,
+                 col_prima: str = "premium_mxn", columnas_metricas: dict = None):
+        self.motor = motor
+        self.nombre_archivo = nombre_archivo
+        self.df = df
+        self.columnas_filtro = {k: v for k, v in columnas_filtro.items() if v and v in df.columns}
+        self.columnas_metricas = {k: v for k, v in (columnas_metricas or {}).items() if v and v in df.columns}
+        self.col_prima = col_prima if col_prima in df.columns else None
+        self._lock = threading.Lock()
+        self._kpis = OrderedDict()
+
+        # Opciones de cada multiselect: DISTINCT en el motor, en el mismo orden que IndiceFiltros
+        self.valores = {}
+        self._posicion = {}
+        for etiqueta, col in self.columnas_filtro.items():
+            c = motor.ident(col)
+            valores = motor.consultar(
+                f"SELECT DISTINCT {c} AS valor FROM {self._desde()} WHERE {c} IS NOT NULL")
+            self.valores[etiqueta] = _orden_pandas(valores["valor"].tolist(), df[col])
+            self._posicion[etiqueta] = {valor: k for k, valor in enumerate(self.valores[etiqueta])}
+
+    def _desde(self):
+        # Se resuelve en cada consulta: un snapshot regenerado se lee sin reconstruir el objeto
+        return self.motor.tabla(self.nombre_archivo, self.df)
+
+    def _where(self, seleccion: dict, parametros: dict) -> str:
+        condiciones = []
+        if self.col_prima:
+            condiciones.append(f"{self.motor.numero(self.motor.ident(self.col_prima))} > 0")
+        for k, (etiqueta, col) in enumerate(self.columnas_filtro.items()):
+            condiciones.append(self.motor.en_lista(self.motor.ident(col), f"f{k}", seleccion.get(etiqueta, ()),
+                                                   parametros))
+        return " AND ".join(condiciones) or "TRUE"
+
+    def clave(self, seleccion: dict):
+        return tuple((etiqueta, frozenset(seleccion.get(etiqueta, ()))) for etiqueta in self.columnas_filtro)
+
+    def kpis(self, seleccion: dict):
+        """(métricas, acierto): filas, prima total y conteos de distintos con un solo SELECT agregado."""
+        clave = self.clave(seleccion)
+        with self._lock:
+            if clave in self._kpis:
+                self._kpis.move_to_end(clave)
+                return self._kpis[clave], True
+
+        motor = self.motor
+        parametros = {}
+        columnas = ["COUNT(*) AS filas"]
+        columnas += [f"COUNT(DISTINCT {motor.ident(col)}) AS {metrica}"
+                     for metrica, col in self.columnas_metricas.items()]
+        if self.col_prima:
+            columnas.append(f"SUM({motor.numero(motor.ident(self.col_prima))}) AS prima_total")
+        fila = motor.consultar(
+            f"SELECT {', '.join(columnas)} FROM {self._desde()} WHERE {self._where(seleccion, parametros)}",
+            parametros,
+        ).iloc[0]
+
+        metricas = {"filas": int(fila["filas"])}
+        for metrica in self.columnas_metricas:
+            metricas[metrica] = int(fila[metrica])
+        metricas["prima_total"] = (float(fila["prima_total"]) if pd.notna(fila["prima_total"]) else 0.0) \
+            if self.col_prima else None
+
+        with self._lock:
+            self._kpis[clave] = metricas
+            while len(self._kpis) > MAX_CONSULTAS_MEMO:
+                self._kpis.popitem(last=False)
+        return metricas, False
+
+    def conteos(self, seleccion: dict, etiqueta: str, nombre_conteo: str = "conteo") -> pd.DataFrame:
+        col = self.columnas_filtro[etiqueta]
+        c = self.motor.ident(col)
+        parametros = {}
+        agregado = self.motor.consultar(
+            f"SELECT {c} AS {c}, COUNT(*) AS {nombre_conteo} FROM {self._desde()} "
+            f"WHERE {self._where(seleccion, parametros)} AND {c} IS NOT NULL GROUP BY {c}",
+            parametros,
+        )
+        orden = agregado[col].map(self._posicion[etiqueta]).to_numpy()
+        return agregado.take(np.argsort(orden, kind="stable")).reset_index(drop=True)
+
+
+# 🗂️ Perfil por cliente: misma interfaz que modulo_clientes.IndiceClientes (ids, perfil, resumen_de)
+class ClientesSQL:
+    def __init__(self, motor: Motor, nombre_archivo: str, df: pd.DataFrame, col_id: str = "id_cliente",
+                 col_prima: str = "premium_mxn", col_aseguradora: str = "source", col_producto: str = "product",
+                 col_nombre: str = "contractor_name", col_fin: str = "end_date"):
+        self.motor = motor
+        self.nombre_archivo = nombre_archivo
+        self.df = df
+        self.col_id = col_id
+        self.columnas = {"prima": col_prima, "aseguradora": col_aseguradora, "producto": col_producto,
+                         "nombre": col_nombre, "fin": col_fin}
+        self.columnas = {k: v for k, v in self.columnas.items() if v in df.columns}
+        c = motor.ident(col_id)
+        self.ids = _orden_pandas(motor.consultar(
+            f"SELECT DISTINCT {c} AS id FROM {self._desde()} WHERE {c} IS NOT NULL")["id"].tolist(), df[col_id])
+        self._ids_texto = {str(i) for i in self.ids}
+
+    def _desde(self):
+        return self.motor.tabla(self.nombre_archivo, self.df, indices=(self.col_id,))
+
+    def __contains__(self, id_cliente):
+        return str(id_cliente) in self._ids_texto
+
+    def _por_id(self, id_cliente, parametros):
+        return f"{self.motor.texto(self.motor.ident(self.col_id))} = {self.motor.param('id', str(id_cliente), parametros)}"
+
+    def perfil(self, id_cliente) -> pd.DataFrame:
+        """Pólizas del cliente (todas, sin filtrar por prima)."""
+        parametros = {}
+        return self.motor.consultar(f"SELECT * FROM {self._desde()} WHERE {self._por_id(id_cliente, parametros)}",
+                                    parametros)
+
+    def resumen_de(self, id_cliente):
+        """Resumen agregado por el motor (mismas llaves que IndiceClientes.resumen_de), o None."""
+        motor, col = self.motor, self.columnas
+        valida = f"{motor.numero(motor.ident(col['prima']))} > 0" if "prima" in col else "1 = 1"
+        columnas = [
+            "COUNT(*) AS registros",
+            f"SUM(CASE WHEN {valida} THEN 1 ELSE 0 END) AS polizas",
+            # SQL no conserva el orden de la base: el contratante es el menor nombre no nulo
+            f"MIN({motor.ident(col['nombre'])}) AS contratante" if "nombre" in col else "NULL AS contratante",
+        ]
+        for metrica, llave in (("aseguradoras", "aseguradora"), ("productos", "producto")):
+            columnas.append(f"COUNT(DISTINCT CASE WHEN {valida} THEN {motor.ident(col[llave])} END) AS {metrica}"
+                            if llave in col else f"0 AS {metrica}")
+        columnas.append(f"SUM(CASE WHEN {valida} THEN {motor.numero(motor.ident(col['prima']))} ELSE 0 END) "
+                        f"AS prima_total" if "prima" in col else "0.0 AS prima_total")
+        columnas.append(f"SUM(CASE WHEN {valida} AND {motor.ident(col['fin'])} IS NOT NULL THEN 1 ELSE 0 END) "
+                        f"AS vencimientos" if "fin" in col else "0 AS vencimientos")
+
+        parametros = {}
+        fila = motor.consultar(f"SELECT {', '.join(columnas)} FROM {self._desde()} "
+                               f"WHERE {self._por_id(id_cliente, parametros)}", parametros).iloc[0]
+        if not fila["registros"]:
+            return None
+        return {
+            self.col_id: id_cliente,
+            "contratante": fila["contratante"] if pd.notna(fila["contratante"]) else "Sin nombre",
+            "registros": int(fila["registros"]),
+            "polizas": int(fila["polizas"] or 0),
+            "aseguradoras": int(fila["aseguradoras"] or 0),
+            "productos": int(fila["productos"] or 0),
+            "prima_total": float(fila["prima_total"] or 0.0),
+            "vencimientos": int(fila["vencimientos"] or 0),
+        }
+
+
+# 🏢 Rollup trimestral de ventas por ramo (la rebanada que grafica la pestaña Sectorial)
+class VentasSQL:
+    def __init__(self, motor: Motor, nombre_archivo: str, df: pd.DataFrame):
+        self.motor = motor
+        self.nombre_archivo = nombre_archivo
+        self.df = df
+        self._ramo = motor.texto(motor.ident("Ramo")) if "Ramo" in df.columns else f"'{SIN_RAMO}'"
+        self._ramos = motor.consultar(f"SELECT DISTINCT {self._ramo} AS ramo FROM {self._desde()} "
+                                      f"WHERE {self._ramo} IS NOT NULL ORDER BY 1")["ramo"].tolist()
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _desde(self):
+        return self.motor.tabla(self.nombre_archivo, self.df)
+
+    def ramos(self):
+        return list(self._ramos)
+
+    def trimestral(self, ramo) -> pd.DataFrame:
+        """Ventas por nombre × trimestre del ramo (columnas nombre, trimestre, Ventas)."""
+        with self._lock:
+            if ramo in self._memo:
+                self._memo.move_to_end(ramo)
+                return self._memo[ramo]
+
+        motor = self.motor
+        parametros = {}
+        nombre, trimestre = motor.texto(motor.ident("nombre")), motor.texto(motor.ident("trimestre"))
+        tabla = motor.consultar(
+            f"SELECT {nombre} AS nombre, {trimestre} AS trimestre, "
+            f"SUM({motor.numero(motor.ident('Ventas'))}) AS {motor.ident('Ventas')} FROM {self._desde()} "
+            f"WHERE {self._ramo} = {motor.param('ramo', str(ramo), parametros)} "
+            f"GROUP BY {nombre}, {trimestre} ORDER BY 1, 2",
+            parametros,
+        )
+        tabla["Ventas"] = tabla["Ventas"].fillna(0.0)
+
+        with self._lock:
+            self._memo[ramo] = tabla
+            while len(self._memo) > MAX_CONSULTAS_MEMO:
+                self._memo.popitem(last=False)
+        return tabla
+
+
+# 🧮 Objetos de consulta compartidos por huella de datos, como los índices pandas
+def filtros_sql(df: pd.DataFrame, nombre_archivo: str, motor: Motor, columnas_filtro: dict,
+                columnas_metricas: dict = None, col_prima: str = "premium_mxn"):
+    clave = ("filtros_sql", motor.nombre, tuple(columnas_filtro.items()),
+             tuple((columnas_metricas or {}).items()), col_prima)
+    return derivado(df, clave, lambda d: FiltrosSQL(motor, nombre_archivo, d, columnas_filtro, col_prima,
+                                                    columnas_metricas))
+
+
+def clientes_sql(df: pd.DataFrame, nombre_archivo: str, motor: Motor, **columnas):
+    clave = ("clientes_sql", motor.nombre, tuple(sorted(columnas.items())))
+    return derivado(df, clave, lambda d: ClientesSQL(motor, nombre_archivo, d, **columnas))
+
+
+def ventas_sql(df: pd.DataFrame, nombre_archivo: str, motor: Motor):
+    return derivado(df, ("ventas_sql", motor.nombre), lambda d: VentasSQL(motor, nombre_archivo, d))
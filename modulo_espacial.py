@@ -0,0 +1,138 @@
+# modulo_espacial.py
+# ░ Índice espacial (rejilla uniforme) para coordenadas DENUE ░
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import derivado
+
+RADIO_TIERRA_KM = 6371.0088
+# ~1.1 km de lado en latitud: a escala nacional deja pocas decenas de puntos por celda
+TAMANO_CELDA_GRADOS = 0.01
+MAX_RESULTADOS = 5_000
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia haversine en km (escalares o arreglos)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class IndiceEspacial:
+    """
+    Rejilla uniforme sobre (latitud, longitud).
+
+    Cada punto recibe la clave de celda fila * columnas + columna y los puntos
+    se ordenan por esa clave. Las celdas de una misma fila de la rejilla son
+    contiguas en el arreglo ordenado, así que un recuadro se resuelve con un
+    searchsorted por fila: el costo depende de las filas que cubre la
+    consulta y del número de resultados, no del tamaño de la base.
+    """
+
+    def __init__(self, df: pd.DataFrame, col_lat: str = "latitude", col_lon: str = "longitude",
+                 tamano_celda: float = TAMANO_CELDA_GRADOS):
+        self.df = df
+        self.tamano_celda = tamano_celda
+        lat = pd.to_numeric(df[col_lat], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        lon = pd.to_numeric(df[col_lon], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        validas = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+        self.total = int(validas.sum())
+        posiciones = np.flatnonzero(validas)
+        self.lat_min = lat[validas].min() if self.total else 0.0
+        self.lon_min = lon[validas].min() if self.total else 0.0
+        fila = self._fila(lat[validas])
+        columna = self._columna(lon[validas])
+        self.columnas = int(columna.max()) + 1 if self.total else 1
+        self.filas = int(fila.max()) + 1 if self.total else 1
+
+        claves = fila * self.columnas + columna
+        orden = np.argsort(claves, kind="stable")
+        self._claves = claves[orden]
+        self._posiciones = posiciones[orden]
+        self._lat = lat[validas][orden]
+        self._lon = lon[validas][orden]
+
+    def _fila(self, lat):
+        return np.floor((np.asarray(lat) - self.lat_min) / self.tamano_celda).astype(np.int64)
+
+    def _columna(self, lon):
+        return np.floor((np.asarray(lon) - self.lon_min) / self.tamano_celda).astype(np.int64)
+
+    def __len__(self):
+        return self.total
+
+    def extension(self):
+        """(lat_min, lat_max, lon_min, lon_max) de los puntos indexados."""
+        if not self.total:
+            return None
+        return (float(self._lat.min()), float(self._lat.max()),
+                float(self._lon.min()), float(self._lon.max()))
+
+    def _candidatos(self, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+        """Índices (en el orden interno) de los puntos en las celdas que tocan el recuadro."""
+        if not self.total:
+            return np.empty(0, dtype=np.int64)
+        fila_ini, fila_fin = np.clip(self._fila([lat_min, lat_max]), 0, self.filas - 1)
+        col_ini, col_fin = np.clip(self._columna([lon_min, lon_max]), 0, self.columnas - 1)
+        if fila_ini > fila_fin or col_ini > col_fin:
+            return np.empty(0, dtype=np.int64)
+
+        filas = np.arange(fila_ini, fila_fin + 1, dtype=np.int64) * self.columnas
+        inicios = np.searchsorted(self._claves, filas + col_ini, side="left")
+        fines = np.searchsorted(self._claves, filas + col_fin, side="right")
+        largos = fines - inicios
+        if not largos.sum():
+            return np.empty(0, dtype=np.int64)
+        # Concatenación vectorizada de los tramos [inicio, fin) de cada fila
+        desplazamientos = np.repeat(inicios - np.concatenate([[0], np.cumsum(largos)[:-1]]), largos)
+        return np.arange(largos.sum(), dtype=np.int64) + desplazamientos
+
+    def recuadro(self, lat_min, lat_max, lon_min, lon_max, limite: int = MAX_RESULTADOS) -> pd.DataFrame:
+        """Puntos dentro del recuadro (viewport), hasta 'limite' filas."""
+        k = self._candidatos(lat_min, lat_max, lon_min, lon_max)
+        dentro = ((self._lat[k] >= lat_min) & (self._lat[k] <= lat_max)
+                  & (self._lon[k] >= lon_min) & (self._lon[k] <= lon_max))
+        k = k[dentro]
+        if limite is not None and len(k) > limite:
+            # Muestra determinista y repartida por toda la extensión del recuadro
+            k = k[np.linspace(0, len(k) - 1, limite).astype(np.int64)]
+        return self.df.take(self._posiciones[k])
+
+    def radio(self, lat: float, lon: float, km: float, limite: int = MAX_RESULTADOS) -> pd.DataFrame:
+        """Puntos a no más de 'km' del punto dado, ordenados por distancia (columna distancia_km)."""
+        delta_lat = np.degrees(km / RADIO_TIERRA_KM)
+        coseno = max(np.cos(np.radians(lat)), 1e-6)
+        delta_lon = min(180.0, delta_lat / coseno)
+        k = self._candidatos(lat - delta_lat, lat + delta_lat, lon - delta_lon, lon + delta_lon)
+        distancias = distancia_km(lat, lon, self._lat[k], self._lon[k])
+        cerca = distancias <= km
+        k, distancias = k[cerca], distancias[cerca]
+        orden = np.argsort(distancias, kind="stable")[:limite]
+        resultado = self.df.take(self._posiciones[k[orden]])
+        return resultado.assign(distancia_km=distancias[orden].round(3))
+
+
+def indice_espacial(df: pd.DataFrame, col_lat: str = "latitude", col_lon: str = "longitude"):
+    """Índice espacial compartido por sesiones; se reconstruye sólo si cambia la huella."""
+    return derivado(df, ("espacial", col_lat, col_lon), lambda d: IndiceEspacial(d, col_lat, col_lon))
+
+
+def coordenadas_clientes(df_base: pd.DataFrame, col_lat: str = "latitud", col_lon: str = "longitud",
+                         col_id: str = "id_cliente") -> pd.DataFrame:
+    """Primera coordenada válida de cada cliente; compartida por sesiones mientras no cambie la huella."""
+    return derivado(df_base, ("coordenadas_clientes", col_lat, col_lon, col_id),
+                    lambda d: _coordenadas_clientes(d, col_lat, col_lon, col_id))[0]
+
+
+def _coordenadas_clientes(df_base, col_lat, col_lon, col_id):
+    if not {col_lat, col_lon, col_id} <= set(df_base.columns):
+        return pd.DataFrame(columns=[col_id, "latitude", "longitude"])
+    coords = pd.DataFrame({
+        col_id: df_base[col_id],
+        "latitude": pd.to_numeric(df_base[col_lat], errors="coerce"),
+        "longitude": pd.to_numeric(df_base[col_lon], errors="coerce"),
+    }).dropna()
+    return coords.drop_duplicates(col_id).reset_index(drop=True)
@@ -0,0 +1,153 @@
+# modulo_esquemas.py
+# ░ Registro declarativo de esquemas: nombres canónicos, alias, tipos y reparación de texto por base ░
+#
+# Cada base fuente declara sus columnas una sola vez. La homologación (modulo_homologacion) aplica
+# el esquema en la ingesta: repara encabezados, renombra alias al nombre canónico en un solo paso
+# y convierte tipos. El resultado queda memorizado por huella y en el snapshot, así que las
+# pestañas y módulos consultan siempre los nombres canónicos, sin sondear alternativas.
+
+from typing import NamedTuple
+
+# 🏷️ Tipos de columna
+#   texto         se conserva tal cual (con 'reparar', se corrige mojibake por valor distinto)
+#   categoria     'category' si tiene pocos valores distintos (UMBRAL_CARDINALIDAD)
+#   etiqueta      'category' normalizada: sin mojibake, sin espacios extremos, mayúsculas y 'mapa'
+#   fecha         día-primero con formatos explícitos; 'fecha_pasada' corrige años de dos dígitos
+#   numero        float; 'entero' Int16 en la lectura por bloques
+TIPOS = ("texto", "categoria", "etiqueta", "fecha", "fecha_pasada", "numero", "entero")
+# dtype con que la ingesta por bloques lee cada tipo
+DTYPE_LECTURA = {"texto": "str", "categoria": "category", "etiqueta": "category", "fecha": "str",
+                 "fecha_pasada": "str", "numero": "float64", "entero": "Int16"}
+UMBRAL_CARDINALIDAD = 0.5
+
+mapa_ramos = {
+    'AUTO': 'AUTOS', 'AUTOS PARTICULAR': 'AUTOS', 'CAMIONES': 'AUTOS',
+    'BENEFICIOS': 'BENEFICIOS', 'DAÑOS': 'DAÑOS', 'GMM': 'GMM', 'HOGAR': 'HOGAR',
+    'PMM': 'PMM', 'SALUD': 'SALUD', 'VDA': 'VIDA', 'VIDA': 'VIDA'
+}
+mapa_subramos = {
+    'ACCIDENTES': 'ACCIDENTES', 'AUTOS PARTICULAR': 'AUTOS', 'CAMIONES': 'AUTOS',
+    'GMM INDIVIDUAL / FAMILIA': 'GMM', 'GERENTE GENERAL': 'GERENCIA',
+    'RC': 'RESPONSABILIDAD CIVIL', 'RESPONSABILIDAD CIVIL': 'RESPONSABILIDAD CIVIL',
+    'HOGAR': 'HOGAR', 'YAYA': 'YAYA', 'EDUCATIVO': 'EDUCATIVO',
+    'EMPRESARIAL': 'EMPRESARIAL', 'SALUD': 'SALUD', 'VIDA': 'VIDA'
+}
+
+
+class Columna(NamedTuple):
+    nombre: str
+    # Nombres alternativos (ya sin mojibake), en orden de preferencia
+    alias: tuple = ()
+    tipo: str = "texto"
+    reparar: bool = False
+    mapa: dict = None
+
+
+class Esquema:
+    """Columnas declaradas de una base; las no declaradas pasan sin cambios."""
+
+    def __init__(self, columnas):
+        desconocidos = {c.tipo for c in columnas} - set(TIPOS)
+        if desconocidos:
+            raise ValueError(f"Tipos de columna desconocidos: {sorted(desconocidos)}")
+        self.columnas = {c.nombre: c for c in columnas}
+
+    def __getitem__(self, nombre) -> Columna:
+        return self.columnas[nombre]
+
+    def __iter__(self):
+        return iter(self.columnas.values())
+
+    def resolver(self, encabezados) -> dict:
+        """
+        {nombre en la fuente: nombre canónico} para los alias presentes. Si la
+        columna canónica ya existe sus alias no se tocan; si no, gana el primer
+        alias presente.
+        """
+        presentes = set(encabezados)
+        renombres = {}
+        for columna in self:
+            if columna.nombre in presentes:
+                continue
+            alias = next((a for a in columna.alias if a in presentes and a not in renombres), None)
+            if alias is not None:
+                renombres[alias] = columna.nombre
+        return renombres
+
+    def dtypes_lectura(self) -> dict:
+        """dtype de lectura por nombre aceptado (canónico y alias), para leer sólo lo declarado."""
+        dtypes = {}
+        for columna in self:
+            for nombre in (columna.nombre, *columna.alias):
+                dtypes.setdefault(nombre, DTYPE_LECTURA[columna.tipo])
+        return dtypes
+
+    def nombres(self, nombre) -> tuple:
+        """Nombre canónico y alias aceptados para una columna."""
+        columna = self.columnas[nombre]
+        return (columna.nombre, *columna.alias)
+
+
+# === BASE DE PÓLIZAS ===
+ESQUEMA_BASE = Esquema([
+    Columna("start_date", tipo="fecha"),
+    Columna("end_date", tipo="fecha"),
+    Columna("birth_date", tipo="fecha_pasada"),
+    Columna("Ramo", tipo="etiqueta", mapa=mapa_ramos),
+    Columna("Subramo", tipo="etiqueta", mapa=mapa_subramos),
+    Columna("product", ("producto", "nombre_producto", "tipo_producto"), tipo="etiqueta"),
+    Columna("source", ("aseguradora",), tipo="categoria"),
+    Columna("premium_mxn", tipo="numero"),
+    Columna("policy_status", tipo="categoria"),
+    Columna("currency", tipo="categoria"),
+    Columna("Metodo de pago", tipo="categoria"),
+    Columna("payment_form", tipo="categoria"),
+    Columna("receipt_status", tipo="categoria"),
+    Columna("AGENCIA", tipo="categoria"),
+    Columna("id_prefix", tipo="categoria"),
+    Columna("municipio", tipo="categoria"),
+    Columna("estado", tipo="categoria"),
+])
+
+# === DENUE === (también define las únicas columnas que lee la ingesta por bloques)
+ESQUEMA_DENUE = Esquema([
+    Columna("id_institucional"),
+    Columna("nombre", ("nombre_empresa", "Nombre de la Unidad Económica")),
+    Columna("giro", ("actividad", "rama", "Código de la clase de actividad SCIAN"), tipo="etiqueta"),
+    Columna("actividad_economica", tipo="categoria", reparar=True),
+    Columna("tamaño_empresa", tipo="categoria"),
+    Columna("direccion", ("domicilio", "direccion_empresa")),
+    Columna("Código Postal"),
+    Columna("Clave entidad", tipo="entero"),
+    Columna("Entidad federativa", tipo="categoria", reparar=True),
+    Columna("id_municipio", tipo="entero"),
+    Columna("municipio", ("nombre_municipio",), tipo="etiqueta"),
+    Columna("correo_electronico", ("correo", "email")),
+    Columna("Numero_telefonico"),
+    Columna("latitude", ("latitud",), tipo="numero"),
+    Columna("longitude", ("longitud",), tipo="numero"),
+    Columna("sector", tipo="categoria"),
+])
+
+# === VENTAS SECTORIALES ===
+ESQUEMA_VENTAS = Esquema([
+    Columna("Ramo", ("ramo", "tipo_ramo", "segmento_ramo"), tipo="etiqueta"),
+    Columna("Entidad", reparar=True),
+    # Extractos dd/mm/yy ('31/01/25'): formato explícito, sin inferencia por fila
+    Columna("fecha", tipo="fecha"),
+    Columna("fecha_corte", tipo="fecha"),
+])
+
+# === CENSO INEGI ===
+ESQUEMA_CENSO = Esquema([
+    Columna("municipio", ("nombre_municipio", "nom_mun", "localidad"), tipo="etiqueta"),
+])
+
+# 📚 Esquema por archivo fuente
+ESQUEMAS = {
+    "madoli_base.csv": ESQUEMA_BASE,
+    "denue.csv": ESQUEMA_DENUE,
+    "empresa.csv": ESQUEMA_DENUE,
+    "ventas_sectoriales.csv": ESQUEMA_VENTAS,
+    "censo_inegi.csv": ESQUEMA_CENSO,
+}
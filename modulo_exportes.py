@@ -0,0 +1,136 @@
+# modulo_exportes.py
+# ░ Exportaciones bajo demanda: caché en disco por huella + filtro, CSV / CSV.gz / Parquet ░
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+RUTA_EXPORTES = os.environ.get("MADOLI_RUTA_EXPORTES", os.path.join(tempfile.gettempdir(), "madoli_exportes"))
+MAX_MB_EXPORTES = float(os.environ.get("MADOLI_MAX_MB_EXPORTES", 512))
+# Filas por bloque al escribir: la serialización no arma el archivo completo en memoria
+FILAS_BLOQUE = 50_000
+
+FORMATOS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV comprimido (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+_lock = threading.Lock()
+_estadisticas = {"generados": 0, "reutilizados": 0}
+
+
+def _huella_contenido(df: pd.DataFrame) -> str:
+    """Huella por contenido, sólo para tablas sin huella de origen (se calcula al descargar)."""
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def clave_exportacion(df: pd.DataFrame, filtro, formato: str) -> str:
+    origen = df.attrs.get("madoli_huella") or _huella_contenido(df)
+    texto = repr((origen, len(df), tuple(df.columns), filtro, formato))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:20]
+
+
+def _escribir_csv(df, archivo):
+    for inicio in range(0, max(len(df), 1), FILAS_BLOQUE):
+        df.iloc[inicio:inicio + FILAS_BLOQUE].to_csv(archivo, index=False, header=inicio == 0)
+
+
+def _escribir_parquet(df, ruta):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+    with pq.ParquetWriter(ruta, esquema, compression="zstd") as escritor:
+        for inicio in range(0, len(df), FILAS_BLOQUE):
+            bloque = pa.Table.from_pandas(df.iloc[inicio:inicio + FILAS_BLOQUE], schema=esquema,
+                                          preserve_index=False)
+            escritor.write_table(bloque)
+
+
+def _normalizar_texto(df):
+    """Columnas object (tipos mezclados o sólo nulos) pasan a texto: Parquet exige un tipo por columna."""
+    mixtas = list(df.columns[df.dtypes == object])
+    if not mixtas:
+        return df
+    return df.astype({col: "string" for col in mixtas})
+
+
+def _recortar_cache():
+    """Elimina las exportaciones más antiguas si la carpeta supera MAX_MB_EXPORTES."""
+    archivos = []
+    for nombre in os.listdir(RUTA_EXPORTES):
+        ruta = os.path.join(RUTA_EXPORTES, nombre)
+        if nombre.endswith(".tmp") or not os.path.isfile(ruta):
+            continue
+        st_archivo = os.stat(ruta)
+        archivos.append((st_archivo.st_mtime, st_archivo.st_size, ruta))
+    total = sum(a[1] for a in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= MAX_MB_EXPORTES * 1e6:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError:
+            pass
+
+
+def exportar(df: pd.DataFrame, formato: str = "CSV", filtro=None) -> str:
+    """
+    Devuelve la ruta del archivo exportado, generándolo sólo si no existe
+    ya uno para (huella de la tabla, filtro, formato).
+    """
+    extension, _ = FORMATOS[formato]
+    os.makedirs(RUTA_EXPORTES, exist_ok=True)
+    ruta = os.path.join(RUTA_EXPORTES, clave_exportacion(df, filtro, formato) + extension)
+    if os.path.isfile(ruta):
+        os.utime(ruta)
+        with _lock:
+            _estadisticas["reutilizados"] += 1
+        return ruta
+
+    temporal = f"{ruta}.{threading.get_ident()}.tmp"
+    if formato == "Parquet":
+        _escribir_parquet(_normalizar_texto(df), temporal)
+    elif extension == ".csv.gz":
+        with gzip.open(temporal, "wt", encoding="utf-8", newline="", compresslevel=6) as archivo:
+            _escribir_csv(df, archivo)
+    else:
+        with open(temporal, "w", encoding="utf-8", newline="") as archivo:
+            _escribir_csv(df, archivo)
+    os.replace(temporal, ruta)
+
+    with _lock:
+        _estadisticas["generados"] += 1
+        _recortar_cache()
+    return ruta
+
+
+def descarga_diferida(obtener_df, nombre_base: str, formato: str = "CSV", filtro=None):
+    """
+    Argumentos para st.download_button: (data, file_name, mime).
+
+    'data' es un callable que Streamlit invoca sólo al hacer clic; 'obtener_df'
+    puede ser la tabla o un callable que la construye, para diferir también
+    el filtrado. Streamlit necesita el contenido completo: se devuelven los
+    bytes del archivo en caché (una copia por clic, sólo durante la descarga)
+    y el archivo se cierra de inmediato.
+    """
+    extension, mime = FORMATOS[formato]
+
+    def generar():
+        df = obtener_df() if callable(obtener_df) else obtener_df
+        with open(exportar(df, formato, filtro), "rb") as archivo:
+            return archivo.read()
+
+    return generar, nombre_base + extension, mime
+
+
+def estadisticas_exportes() -> dict:
+    with _lock:
+        return dict(_estadisticas)
@@ -0,0 +1,180 @@
+# modulo_filtros.py
+# ░ Índice de celdas para los filtros del panel de KPIs: códigos por columna y tabla de búsqueda por selección ░
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import derivado
+
+MAX_KPIS_MEMO = 256
+
+
+class IndiceFiltros:
+    """
+    Índice de la base para los multiselect del panel de KPIs.
+
+    Las filas se agrupan en celdas: cada combinación distinta de valores de
+    los filtros (más la validez de la prima). Por columna de filtro se guarda
+    el código de cada celda; una selección se resuelve con una tabla de
+    búsqueda por código (OR dentro de la columna) y AND entre columnas, sobre
+    las celdas y no sobre las filas. La memoria y el costo por consulta no
+    dependen del número de valores distintos de cada filtro.
+
+    Las métricas se precalculan por celda: conteo de filas y prima, y para
+    los conteos de distintos (pólizas, clientes…) el número de valores
+    exclusivos de cada celda más los pares (celda, valor) compartidos.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas_filtro: dict, col_prima: str = "premium_mxn",
+                 columnas_metricas: dict = None):
+        self.df = df
+        self.n = len(df)
+        self.columnas_filtro = {k: v for k, v in columnas_filtro.items() if v and v in df.columns}
+        self.valores = {}
+        self._lock = threading.Lock()
+        self._kpis = OrderedDict()
+
+        # 💰 Filas válidas para KPIs: prima numérica y positiva
+        if col_prima in df.columns:
+            prima = pd.to_numeric(df[col_prima], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            validas = prima > 0
+            prima = np.where(validas, prima, 0.0)
+        else:
+            prima = None
+            validas = np.ones(self.n, dtype=bool)
+
+        # 🧱 Celda de cada fila: combinación de códigos de filtro + validez
+        clave = validas.astype(np.int64)
+        radio = 2
+        codigos_filtro = {}
+        for etiqueta, col in self.columnas_filtro.items():
+            codigos, unicos = pd.factorize(df[col], sort=True)
+            self.valores[etiqueta] = list(unicos)
+            codigos_filtro[etiqueta] = codigos
+            clave = clave + (codigos.astype(np.int64) + 1) * radio
+            radio *= len(unicos) + 1
+        self.celda_fila, primeras = _factorizar_con_primeras(clave)
+        self.total_celdas = len(primeras)
+
+        self.celda_valida = validas[primeras]
+        self.filas_celda = np.bincount(self.celda_fila, minlength=self.total_celdas)
+        self.prima_celda = (np.bincount(self.celda_fila, weights=prima, minlength=self.total_celdas)
+                            if prima is not None else None)
+
+        # 🔦 Código de cada celda por columna de filtro (-1 = sin valor)
+        self.codigos_celda = {}
+        self._posicion = {}
+        for etiqueta, codigos in codigos_filtro.items():
+            self.codigos_celda[etiqueta] = codigos[primeras].astype(np.int32)
+            self._posicion[etiqueta] = {valor: k for k, valor in enumerate(self.valores[etiqueta])}
+
+        # 🔢 Conteos de distintos por celda
+        self._distintos = {}
+        for metrica, col in (columnas_metricas or {}).items():
+            if col and col in df.columns:
+                self._distintos[metrica] = self._preparar_distintos(df[col])
+
+    def _preparar_distintos(self, serie):
+        codigos, unicos = pd.factorize(serie)
+        base = max(len(unicos), 1)
+        con_valor = codigos >= 0
+        pares = np.unique(self.celda_fila[con_valor].astype(np.int64) * base + codigos[con_valor])
+        par_celda = pares // base
+        par_valor = pares % base
+
+        # Un valor presente en una sola celda cuenta directo para esa celda
+        celdas_por_valor = np.bincount(par_valor, minlength=len(unicos))
+        exclusivo = celdas_por_valor[par_valor] == 1
+        exclusivos_celda = np.bincount(par_celda[exclusivo], minlength=self.total_celdas)
+
+        # Los valores compartidos se renumeran en un rango denso para contarlos por bincount
+        par_valor_compartido, compartidos = pd.factorize(par_valor[~exclusivo])
+        return (exclusivos_celda, par_celda[~exclusivo].astype(np.int32),
+                par_valor_compartido.astype(np.int32), len(compartidos))
+
+    # 🔑 Clave canónica de una selección (el orden en el multiselect no importa)
+    def clave(self, seleccion: dict):
+        return tuple(
+            (etiqueta, frozenset(seleccion.get(etiqueta, ())))
+            for etiqueta in self.columnas_filtro
+        )
+
+    def mascara_celdas(self, seleccion: dict) -> np.ndarray:
+        """Celdas que cumplen la selección: OR por columna, AND entre columnas."""
+        mascara = self.celda_valida.copy()
+        for etiqueta, codigo_celda in self.codigos_celda.items():
+            posicion = self._posicion[etiqueta]
+            # Tabla por código con un lugar extra al final: el código -1 (sin valor) nunca se elige
+            elegidos = np.zeros(len(posicion) + 1, dtype=bool)
+            codigos = [posicion[v] for v in seleccion.get(etiqueta, ()) if v in posicion]
+            if not codigos:
+                return np.zeros(self.total_celdas, dtype=bool)
+            elegidos[codigos] = True
+            mascara &= elegidos[codigo_celda]
+        return mascara
+
+    def mascara(self, seleccion: dict) -> np.ndarray:
+        """Máscara booleana por fila (equivalente a los isin() encadenados + prima > 0)."""
+        return self.mascara_celdas(seleccion)[self.celda_fila]
+
+    def kpis(self, seleccion: dict):
+        """
+        Devuelve (métricas, acierto). Métricas: filas, prima total y un
+        conteo de distintos por cada columna de 'columnas_metricas'.
+        """
+        clave = self.clave(seleccion)
+        with self._lock:
+            if clave in self._kpis:
+                self._kpis.move_to_end(clave)
+                return self._kpis[clave], True
+
+        celdas = self.mascara_celdas(seleccion)
+        metricas = {"filas": int(self.filas_celda[celdas].sum())}
+        for metrica, (exclusivos, par_celda, par_valor, total_compartidos) in self._distintos.items():
+            presentes = np.bincount(par_valor[celdas[par_celda]], minlength=total_compartidos)
+            metricas[metrica] = int(exclusivos[celdas].sum()) + int(np.count_nonzero(presentes))
+        metricas["prima_total"] = float(self.prima_celda[celdas].sum()) if self.prima_celda is not None else None
+
+        with self._lock:
+            self._kpis[clave] = metricas
+            while len(self._kpis) > MAX_KPIS_MEMO:
+                self._kpis.popitem(last=False)
+        return metricas, False
+
+    def conteos(self, seleccion: dict, etiqueta: str, nombre_conteo: str = "conteo") -> pd.DataFrame:
+        """Filas seleccionadas por valor de un filtro, sumadas desde las celdas (sin tocar filas)."""
+        col = self.columnas_filtro[etiqueta]
+        celdas = self.mascara_celdas(seleccion)
+        codigos = self.codigos_celda[etiqueta][celdas]
+        con_valor = codigos >= 0
+        totales = np.bincount(codigos[con_valor], weights=self.filas_celda[celdas][con_valor],
+                              minlength=len(self.valores[etiqueta])).astype(np.int64)
+        agregado = pd.DataFrame({col: pd.Series(self.valores[etiqueta], dtype=object),
+                                 nombre_conteo: totales})
+        return agregado[agregado[nombre_conteo] > 0].reset_index(drop=True)
+
+    def vista(self, seleccion: dict, columnas) -> pd.DataFrame:
+        """Sólo las columnas pedidas de las filas seleccionadas (sin copiar la base)."""
+        columnas = [c for c in columnas if c and c in self.df.columns]
+        posiciones = np.flatnonzero(self.mascara(seleccion))
+        return self.df[columnas].take(posiciones)
+
+
+def _factorizar_con_primeras(clave):
+    """Códigos densos de 'clave' y la posición de la primera fila de cada código."""
+    codigos, _ = pd.factorize(clave)
+    _, primeras = np.unique(codigos, return_index=True)
+    return codigos.astype(np.int32), primeras
+
+
+def indice_filtros(df: pd.DataFrame, columnas_filtro: dict, columnas_metricas: dict = None,
+                   col_prima: str = "premium_mxn"):
+    """
+    Devuelve el índice de la base, compartido por todas las sesiones y
+    reconstruido sólo si cambia su huella, junto con los ms de construcción.
+    """
+    clave = ("filtros", tuple(columnas_filtro.items()), tuple((columnas_metricas or {}).items()), col_prima)
+    return derivado(df, clave, lambda d: IndiceFiltros(d, columnas_filtro, col_prima, columnas_metricas))
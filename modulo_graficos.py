@@ -0,0 +1,124 @@
+# modulo_graficos.py
+# ░ Capa de datos para gráficos: agregación en servidor y tope de payload ░
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# 📦 Tope de bytes por especificación enviada al navegador
+MAX_BYTES_GRAFICO = int(os.environ.get("MADOLI_MAX_BYTES_GRAFICO", 250_000))
+MAX_CATEGORIAS = 40
+ETIQUETA_RESTO = "OTROS"
+MAX_FIGURAS = 32
+
+
+def agregar_conteo(df: pd.DataFrame, columna: str, nombre_conteo: str = "conteo") -> pd.DataFrame:
+    """Equivalente en pandas a x='count()' de Vega-Lite: una fila por categoría."""
+    conteos = df[columna].value_counts(dropna=True, sort=False)
+    conteos = conteos[conteos > 0]
+    return pd.DataFrame({columna: conteos.index.astype(object), nombre_conteo: conteos.to_numpy()})
+
+
+def limitar_categorias(agregado: pd.DataFrame, columna: str, valor: str,
+                       max_categorias: int = MAX_CATEGORIAS, agrupar=None) -> pd.DataFrame:
+    """
+    Conserva las 'max_categorias' con mayor total y suma el resto en OTROS.
+
+    'agrupar' son columnas adicionales (p. ej. trimestre) que se mantienen al
+    colapsar las categorías menores.
+    """
+    totales = agregado.groupby(columna, observed=True)[valor].sum()
+    if len(totales) <= max_categorias:
+        return agregado
+
+    principales = set(totales.nlargest(max_categorias - 1).index)
+    resultado = agregado.copy()
+    resultado[columna] = resultado[columna].astype(object).where(
+        resultado[columna].isin(principales), ETIQUETA_RESTO
+    )
+    claves = [columna, *(agrupar or [])]
+    return resultado.groupby(claves, as_index=False, observed=True)[valor].sum()
+
+
+def bytes_spec(spec: dict) -> int:
+    return len(json.dumps(spec, default=str).encode("utf-8"))
+
+
+def grafico_barras(agregado: pd.DataFrame, columna: str, valor: str = "conteo",
+                   titulo_valor: str = "Count of Records", altura: int = 300,
+                   max_bytes: int = MAX_BYTES_GRAFICO):
+    """
+    Barras horizontales sobre datos ya agregados.
+
+    Si la especificación supera 'max_bytes' se reduce el número de
+    categorías a la mitad (agrupando el resto en OTROS) hasta que quepa.
+    Devuelve (chart, bytes_enviados, filas_enviadas).
+    """
+    import altair as alt
+
+    max_categorias = min(MAX_CATEGORIAS, max(len(agregado), 1))
+    while True:
+        datos = limitar_categorias(agregado, columna, valor, max_categorias)
+        chart = alt.Chart(datos).mark_bar().encode(
+            x=alt.X(f"{valor}:Q", title=titulo_valor),
+            y=alt.Y(f"{columna}:N"),
+            color=alt.Color(f"{columna}:N"),
+        ).properties(height=altura)
+        tamano = bytes_spec(chart.to_dict())
+        if tamano <= max_bytes or max_categorias <= 2:
+            return chart, tamano, len(datos)
+        max_categorias = max(2, max_categorias // 2)
+
+
+def bytes_plotly(fig) -> int:
+    return len(fig.to_json().encode("utf-8"))
+
+
+def grafico_plotly(agregado: pd.DataFrame, columna: str, valor: str, construir, agrupar=None,
+                   max_bytes: int = MAX_BYTES_GRAFICO):
+    """
+    Figura Plotly sobre datos ya agregados, con el mismo tope que grafico_barras:
+    si la figura de construir(datos) supera 'max_bytes' se reduce el número de
+    categorías de 'columna' a la mitad (el resto en OTROS) hasta que quepa.
+    Devuelve (figura, bytes_enviados, filas_enviadas).
+    """
+    max_categorias = min(MAX_CATEGORIAS, max(agregado[columna].nunique(), 1))
+    while True:
+        datos = limitar_categorias(agregado, columna, valor, max_categorias, agrupar=agrupar)
+        fig = construir(datos)
+        tamano = bytes_plotly(fig)
+        if tamano <= max_bytes or max_categorias <= 2:
+            return fig, tamano, len(datos)
+        max_categorias = max(2, max_categorias // 2)
+
+
+# 🗃️ Figuras memorizadas: una recarga de la pestaña reutiliza la especificación ya construida
+_figuras = OrderedDict()
+_figuras_lock = threading.Lock()
+
+
+def figura_memorizada(huella, clave, construir):
+    """
+    construir() memorizado por (huella de los datos, clave); sin huella no se
+    memoriza. Devuelve (resultado, ms de construcción; 0.0 si ya existía).
+    """
+    llave = (huella, clave)
+    if huella is not None:
+        with _figuras_lock:
+            if llave in _figuras:
+                _figuras.move_to_end(llave)
+                return _figuras[llave], 0.0
+
+    inicio = time.perf_counter()
+    resultado = construir()
+    ms = (time.perf_counter() - inicio) * 1000
+    if huella is not None:
+        with _figuras_lock:
+            _figuras[llave] = resultado
+            while len(_figuras) > MAX_FIGURAS:
+                _figuras.popitem(last=False)
+    return resultado, ms
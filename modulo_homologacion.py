@@ -0,0 +1,215 @@
+# modulo_homologacion.py
+# ░ Normalización y homologación institucional de bases ░
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from modulo_esquemas import ESQUEMAS, UMBRAL_CARDINALIDAD, Esquema
+
+# 🔖 Versión de reglas: cambia cuando cambia la homologación o un esquema (invalida snapshots)
+VERSION_HOMOLOGACION = "5"
+
+# 📅 Formatos explícitos día-primero, en orden de prioridad
+FORMATOS_FECHA = ("%d/%m/%y", "%d/%m/%Y", "%d/%m/%y %H:%M", "%d/%m/%Y %H:%M", "%Y-%m-%d")
+
+# 🧩 Marcas típicas de UTF-8 leído como Mac Roman ('√≥' → 'ó', '√ë' → 'Ñ')
+MARCAS_MOJIBAKE = ("√", "¬", "≈")
+
+
+def reparar_mojibake(texto):
+    """Revierte textos UTF-8 que fueron decodificados como Mac Roman."""
+    if not isinstance(texto, str) or not any(m in texto for m in MARCAS_MOJIBAKE):
+        return texto
+    try:
+        return texto.encode("mac_roman").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return texto
+
+
+def reparar_columna(serie: pd.Series) -> pd.Series:
+    """Repara una columna de texto evaluando cada valor distinto una sola vez."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        nuevas = [reparar_mojibake(c) for c in serie.cat.categories]
+        if len(set(nuevas)) == len(nuevas):
+            return serie.cat.rename_categories(nuevas)
+        serie = serie.astype(object)
+    unicos = serie.dropna().unique()
+    mapa = {v: reparar_mojibake(v) for v in unicos}
+    mapa = {k: v for k, v in mapa.items() if k != v}
+    return serie.replace(mapa) if mapa else serie
+
+
+def reparar_encabezados(df: pd.DataFrame) -> pd.DataFrame:
+    nuevos = {c: reparar_mojibake(c).strip() for c in df.columns}
+    nuevos = {k: v for k, v in nuevos.items() if k != v and v not in df.columns}
+    return df.rename(columns=nuevos) if nuevos else df
+
+
+# 📅 Fechas con formato explícito
+def parsear_fecha(serie: pd.Series, formatos=FORMATOS_FECHA, pasada: bool = False) -> pd.Series:
+    """
+    Convierte una columna de fechas día-primero probando cada formato sólo
+    sobre los valores que los formatos anteriores no lograron interpretar.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    if pd.api.types.is_numeric_dtype(serie):
+        # Columna vacía o numérica: no hay fechas que interpretar
+        return pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]", name=serie.name)
+
+    texto = serie.astype("string").str.strip()
+    resultado = pd.to_datetime(texto, format=formatos[0], errors='coerce')
+    for formato in formatos[1:]:
+        pendientes = resultado.isna() & texto.notna()
+        if not pendientes.any():
+            break
+        resultado = resultado.fillna(pd.to_datetime(texto[pendientes], format=formato, errors='coerce'))
+
+    if pasada:
+        futuras = resultado > pd.Timestamp.now()
+        resultado = resultado.where(~futuras, resultado - pd.DateOffset(years=100))
+    return resultado
+
+
+# 🏷️ Remapeo categórico: la normalización corre sobre categorías, no filas
+def remapear_categoria(serie: pd.Series, mapa=None) -> pd.Series:
+    """
+    Equivale a serie.astype(str).str.strip().str.upper().replace(mapa)
+    pero evaluado una vez por valor distinto; devuelve dtype 'category'.
+    """
+    categorica = serie.astype("category")
+    codigos = categorica.cat.codes.to_numpy()
+    etiquetas = pd.Index(categorica.cat.categories.astype(str))
+    etiquetas = pd.Index([reparar_mojibake(e) for e in etiquetas]).str.strip().str.upper()
+    if mapa:
+        etiquetas = pd.Index([mapa.get(e, e) for e in etiquetas])
+
+    # Los nulos se conservan como 'NAN', igual que astype(str).str.upper()
+    etiquetas = etiquetas.append(pd.Index(["NAN"]))
+    codigos = np.where(codigos < 0, len(etiquetas) - 1, codigos)
+
+    nuevos_codigos, unicas = pd.factorize(etiquetas)
+    return pd.Series(
+        pd.Categorical.from_codes(nuevos_codigos[codigos], categories=unicas),
+        index=serie.index,
+        name=serie.name,
+    ).cat.remove_unused_categories()
+
+
+def categorizar(df: pd.DataFrame, columnas, umbral: float = UMBRAL_CARDINALIDAD) -> pd.DataFrame:
+    """Convierte a 'category' las columnas de texto con pocos valores distintos."""
+    for col in columnas:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            if df[col].nunique(dropna=True) <= max(1, umbral * len(df)):
+                df[col] = df[col].astype("category")
+    return df
+
+
+# 📐 Esquema declarado (modulo_esquemas): un solo rename y tipos canónicos
+def aplicar_esquema(df: pd.DataFrame, esquema: Esquema) -> pd.DataFrame:
+    """
+    Repara encabezados, renombra los alias presentes a su nombre canónico en
+    un solo paso y convierte cada columna declarada a su tipo. Los renombres
+    quedan en df.attrs['madoli_esquema'] ({canónico: nombre en la fuente}),
+    que viaja con el snapshot.
+    """
+    df = reparar_encabezados(df)
+    renombres = esquema.resolver(df.columns)
+    if renombres:
+        df = df.rename(columns=renombres)
+
+    categorias = []
+    for columna in esquema:
+        if columna.nombre not in df.columns:
+            continue
+        serie = df[columna.nombre]
+        if columna.reparar:
+            serie = reparar_columna(serie)
+        if columna.tipo in ("fecha", "fecha_pasada"):
+            serie = parsear_fecha(serie, pasada=columna.tipo == "fecha_pasada")
+        elif columna.tipo in ("numero", "entero") and not pd.api.types.is_numeric_dtype(serie):
+            serie = pd.to_numeric(serie, errors='coerce')
+        elif columna.tipo == "etiqueta":
+            serie = remapear_categoria(serie, columna.mapa)
+        elif columna.tipo == "categoria":
+            categorias.append(columna.nombre)
+        if serie is not df[columna.nombre]:
+            df[columna.nombre] = serie
+
+    df = categorizar(df, categorias)
+    df.attrs["madoli_esquema"] = {canonico: fuente for fuente, canonico in renombres.items()}
+    return df
+
+
+# === BASE DE PÓLIZAS ===
+def homologar_base(df: pd.DataFrame) -> pd.DataFrame:
+    return aplicar_esquema(df, ESQUEMAS["madoli_base.csv"])
+
+
+# === DENUE ===
+def homologar_denue(df: pd.DataFrame) -> pd.DataFrame:
+    return aplicar_esquema(df, ESQUEMAS["denue.csv"])
+
+
+# === VENTAS SECTORIALES ===
+def homologar_ventas(df: pd.DataFrame) -> pd.DataFrame:
+    df = aplicar_esquema(df, ESQUEMAS["ventas_sectoriales.csv"])
+    if 'fecha' in df.columns:
+        df = df.dropna(subset=['fecha'])
+        df['trimestre'] = df['fecha'].dt.to_period('Q').astype(str)
+    return df
+
+
+# === CENSO INEGI ===
+def homologar_censo(df: pd.DataFrame) -> pd.DataFrame:
+    return aplicar_esquema(df, ESQUEMAS["censo_inegi.csv"])
+
+
+# 📚 Homologador por archivo fuente
+HOMOLOGADORES = {
+    "madoli_base.csv": homologar_base,
+    "denue.csv": homologar_denue,
+    "empresa.csv": homologar_denue,
+    "ventas_sectoriales.csv": homologar_ventas,
+    "censo_inegi.csv": homologar_censo,
+}
+
+
+def homologar(nombre_archivo: str, df: pd.DataFrame) -> pd.DataFrame:
+    funcion = HOMOLOGADORES.get(nombre_archivo)
+    if funcion is None or df.empty:
+        return df
+    return funcion(df)
+
+
+# 🗃️ Etapa de homologación memorizada por huella de datos
+_ETAPA_MAX = 8
+_etapa_cache = OrderedDict()
+_etapa_lock = threading.Lock()
+
+
+def etapa_homologacion(nombre_archivo: str, huella, leer):
+    """
+    Ejecuta la homologación una sola vez por (archivo, huella, versión).
+
+    'leer' es un callable que devuelve el DataFrame crudo; sólo se invoca en
+    un fallo de caché, de modo que una huella ya vista no vuelve a parsearse.
+    """
+    if huella is None:
+        return homologar(nombre_archivo, leer())
+
+    clave = (nombre_archivo, huella, VERSION_HOMOLOGACION)
+    with _etapa_lock:
+        if clave in _etapa_cache:
+            _etapa_cache.move_to_end(clave)
+            return _etapa_cache[clave]
+
+    df = homologar(nombre_archivo, leer())
+    with _etapa_lock:
+        _etapa_cache[clave] = df
+        while len(_etapa_cache) > _ETAPA_MAX:
+            _etapa_cache.popitem(last=False)
+    return df
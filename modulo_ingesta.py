@@ -0,0 +1,181 @@
+# modulo_ingesta.py
+# ░ Ingesta por bloques con poda de columnas y presupuesto de memoria (DENUE nacional) ░
+
+import os
+import time
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from modulo_esquemas import ESQUEMAS
+from modulo_homologacion import reparar_mojibake
+
+# 💾 Presupuesto de memoria para la base resultante y el bloque en lectura
+PRESUPUESTO_MB = float(os.environ.get("MADOLI_PRESUPUESTO_MB", 512))
+# Fracción del presupuesto que puede ocupar un solo bloque en lectura
+FRACCION_BLOQUE = 0.1
+FILAS_MUESTRA = 2_000
+
+# 🧭 Filtros territoriales aplicados durante la lectura (vacío = todo el país)
+ENTIDADES_DENUE = os.environ.get("MADOLI_DENUE_ENTIDADES", "")
+MUNICIPIOS_DENUE = os.environ.get("MADOLI_DENUE_MUNICIPIOS", "")
+
+# 📋 Columnas DENUE que usa la app (nombre ya reparado, canónico o alias) y su dtype explícito,
+# tomados del esquema declarado. Las demás (vialidades, entre-calles, edificio, local…) no se leen.
+DTYPES_DENUE = ESQUEMAS["denue.csv"].dtypes_lectura()
+
+
+class PresupuestoMemoriaExcedido(MemoryError):
+    """La base filtrada no cabe en el presupuesto de memoria configurado."""
+
+
+def _lista(texto):
+    return [v.strip() for v in texto.split(",") if v.strip()]
+
+
+def firma_filtros(entidades=None, municipios=None) -> str:
+    """Firma estable de los filtros territoriales (forma parte de la huella de la fuente)."""
+    entidades = sorted(int(e) for e in (_lista(ENTIDADES_DENUE) if entidades is None else entidades))
+    municipios = sorted(str(m).upper() for m in (_lista(MUNICIPIOS_DENUE) if municipios is None else municipios))
+    if not entidades and not municipios:
+        return ""
+    return f"ent={','.join(map(str, entidades))};mun={','.join(municipios)}"
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def _concatenar(bloques):
+    """Concatena bloques unificando categorías (pd.concat degradaría a texto)."""
+    if not bloques:
+        return pd.DataFrame()
+    categoricas = {}
+    for col in bloques[0].columns:
+        if isinstance(bloques[0][col].dtype, pd.CategoricalDtype):
+            categoricas[col] = union_categoricals([b[col] for b in bloques], ignore_order=True)
+    df = pd.concat([b.drop(columns=list(categoricas)) for b in bloques], ignore_index=True)
+    for col, valores in categoricas.items():
+        df[col] = valores
+    return df[list(bloques[0].columns)]
+
+
+def leer_denue(ruta: str, entidades=None, municipios=None, presupuesto_mb: float = None,
+               reporte: dict = None) -> pd.DataFrame:
+    """
+    Lee un DENUE (nacional o muestra) por bloques, sólo con las columnas de
+    DTYPES_DENUE y filtrando por 'Clave entidad' / municipio en cada bloque.
+
+    Los bloques se dimensionan con una muestra para que cada uno ocupe como
+    máximo FRACCION_BLOQUE del presupuesto; si lo acumulado lo excede se
+    lanza PresupuestoMemoriaExcedido. 'reporte' (dict) recibe filas leídas,
+    conservadas, bloques, pico de memoria contabilizado y de RSS.
+    """
+    entidades = [int(e) for e in (_lista(ENTIDADES_DENUE) if entidades is None else entidades)]
+    municipios = {str(m).upper() for m in (_lista(MUNICIPIOS_DENUE) if municipios is None else municipios)}
+    presupuesto = (presupuesto_mb or PRESUPUESTO_MB) * 1e6
+
+    # 🔎 Encabezado crudo → columnas a leer y dtypes (acepta encabezados con mojibake)
+    encabezado = pd.read_csv(ruta, encoding="utf-8-sig", nrows=0).columns
+    reparados = {c: reparar_mojibake(c).strip() for c in encabezado}
+    usecols = [c for c in encabezado if reparados[c] in DTYPES_DENUE]
+    dtypes = {c: DTYPES_DENUE[reparados[c]] for c in usecols}
+    col_entidad = next((c for c in usecols if reparados[c] == "Clave entidad"), None)
+    cols_municipio = [c for c in usecols if reparados[c] in ESQUEMAS["denue.csv"].nombres("municipio")]
+
+    muestra = pd.read_csv(ruta, encoding="utf-8-sig", usecols=usecols, dtype=dtypes, nrows=FILAS_MUESTRA)
+    bytes_fila = max(_bytes(muestra) / max(len(muestra), 1), 1.0)
+    filas_bloque = max(1_000, int(presupuesto * FRACCION_BLOQUE / bytes_fila))
+
+    inicio = time.perf_counter()
+    rss_inicial = _rss_mb()
+    rss_pico = rss_inicial
+    bloques, acumulado, pico, leidas = [], 0, 0, 0
+
+    with pd.read_csv(ruta, encoding="utf-8-sig", usecols=usecols, dtype=dtypes,
+                     chunksize=filas_bloque) as lector:
+        for bloque in lector:
+            leidas += len(bloque)
+            pico = max(pico, acumulado + _bytes(bloque))
+            if entidades and col_entidad:
+                bloque = bloque[bloque[col_entidad].isin(entidades)]
+            if municipios and cols_municipio:
+                coincide = False
+                for col in cols_municipio:
+                    # Comparación en el espacio de categorías, no por fila
+                    nombres = bloque[col].cat.categories.astype(str)
+                    validas = [c for c, n in zip(bloque[col].cat.categories, nombres)
+                               if reparar_mojibake(n).strip().upper() in municipios]
+                    coincide = coincide | bloque[col].isin(validas)
+                bloque = bloque[coincide]
+            if not bloque.empty:
+                bloques.append(bloque)
+                acumulado += _bytes(bloque)
+            rss = _rss_mb()
+            if rss is not None:
+                rss_pico = max(rss_pico, rss)
+            if acumulado > presupuesto:
+                raise PresupuestoMemoriaExcedido(
+                    f"{os.path.basename(ruta)}: {acumulado / 1e6:.1f} MB tras {leidas:,} filas excede el "
+                    f"presupuesto de {presupuesto / 1e6:.1f} MB; filtre por entidad/municipio "
+                    f"(MADOLI_DENUE_ENTIDADES / MADOLI_DENUE_MUNICIPIOS) o suba MADOLI_PRESUPUESTO_MB"
+                )
+
+    df = _concatenar(bloques) if bloques else muestra.iloc[0:0]
+    if reporte is not None:
+        reporte.update({
+            "archivo": os.path.basename(ruta),
+            "columnas": len(usecols),
+            "columnas_omitidas": len(encabezado) - len(usecols),
+            "filas_leidas": leidas,
+            "filas": len(df),
+            "bloques": -(-leidas // filas_bloque) if leidas else 0,
+            "filas_por_bloque": filas_bloque,
+            "pico_mb": round(max(pico, _bytes(df)) / 1e6, 1),
+            "rss_pico_mb": round(rss_pico - rss_inicial, 1) if rss_inicial is not None else None,
+            "mb_final": round(_bytes(df) / 1e6, 1),
+            "segundos": round(time.perf_counter() - inicio, 3),
+        })
+    return df
+
+
+# 📚 Lectores por archivo fuente: los no listados se leen completos
+LECTORES = {
+    "denue.csv": leer_denue,
+    "empresa.csv": leer_denue,
+}
+
+# Último reporte de ingesta por archivo (bitácora / pestaña técnica)
+REPORTES_INGESTA = {}
+
+
+def leer_csv(ruta: str) -> pd.DataFrame:
+    """Lee un CSV fuente con su lector especializado si lo tiene."""
+    nombre = os.path.basename(ruta)
+    lector = LECTORES.get(nombre)
+    if lector is None:
+        return pd.read_csv(ruta, encoding="utf-8-sig")
+    reporte = {}
+    df = lector(ruta, reporte=reporte)
+    REPORTES_INGESTA[nombre] = reporte
+    return df
+
+
+def reportes_ingesta_df() -> pd.DataFrame:
+    return pd.DataFrame(list(REPORTES_INGESTA.values()))
+
+
+def firma_ingesta(nombre_archivo: str) -> str:
+    """Parte de la huella que depende de la configuración de ingesta del archivo."""
+    return firma_filtros() if nombre_archivo in LECTORES else ""
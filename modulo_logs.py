@@ -0,0 +1,122 @@
+# modulo_logs.py
+# ░ Logging estructurado no bloqueante: QueueHandler → QueueListener → RotatingFileHandler en JSON lines ░
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+RUTA_LOGS = os.environ.get("MADOLI_RUTA_LOGS", ".")
+MAX_BYTES_LOG = int(float(os.environ.get("MADOLI_MAX_MB_LOG", 20)) * 1e6)
+RESPALDOS_LOG = int(os.environ.get("MADOLI_RESPALDOS_LOG", 5))
+MAX_COLA = 100_000
+
+# Atributos propios de LogRecord: lo demás que llegue por 'extra' son campos del evento
+_ATRIBUTOS_REGISTRO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+# Argumentos que Logger._log acepta; los demás kwargs de una llamada son campos del evento
+_ARGUMENTOS_LOG = {"exc_info", "extra", "stack_info", "stacklevel"}
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro (ts UTC, nivel, logger, mensaje) más los campos del evento, planos."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        linea.update({k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_REGISTRO})
+        if record.exc_info:
+            linea["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+class ColaSinFormato(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el LogRecord tal cual: el mensaje y los campos se
+    formatean en el hilo del QueueListener, no en el que registra. Con la cola
+    llena el registro se cuenta y se descarta (nunca bloquea la petición).
+    """
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class AdaptadorCampos(logging.LoggerAdapter):
+    """
+    Acepta campos como kwargs (log.info("mensaje", id_cliente=...)) y los pasa
+    como 'extra' del LogRecord; el resto de la interfaz es la de Logger.
+    """
+
+    def process(self, msg, kwargs):
+        campos = {k: kwargs.pop(k) for k in list(kwargs) if k not in _ARGUMENTOS_LOG}
+        if campos:
+            kwargs["extra"] = {**kwargs.get("extra", {}), **campos}
+        return msg, kwargs
+
+
+_colas = {}
+_oyentes = {}
+
+
+def logger_estructurado(nombre: str, archivo: str, nivel=logging.INFO) -> AdaptadorCampos:
+    """
+    Logger 'nombre' de la librería estándar, sin propagar al raíz: un
+    QueueHandler entrega los registros a un QueueListener que los escribe en
+    JSON lines con RotatingFileHandler (archivo.1 … archivo.N). Idempotente
+    por nombre.
+    """
+    logger = logging.getLogger(nombre)
+    if nombre not in _oyentes:
+        os.makedirs(RUTA_LOGS, exist_ok=True)
+        archivo = logging.handlers.RotatingFileHandler(os.path.join(RUTA_LOGS, archivo), maxBytes=MAX_BYTES_LOG,
+                                                       backupCount=RESPALDOS_LOG, encoding="utf-8", delay=True)
+        archivo.setFormatter(FormatoJSON())
+        cola = queue.Queue(MAX_COLA)
+        logger.addHandler(ColaSinFormato(cola))
+        logger.propagate = False
+        oyente = logging.handlers.QueueListener(cola, archivo, respect_handler_level=True)
+        oyente.start()
+        _colas[nombre] = cola
+        _oyentes[nombre] = oyente
+    logger.setLevel(nivel)
+    return AdaptadorCampos(logger, {})
+
+
+def esperar_logs():
+    """Bloquea hasta que los registros encolados hasta ahora estén escritos."""
+    for cola in _colas.values():
+        cola.join()
+
+
+def estadisticas_logs() -> dict:
+    estadisticas = {}
+    for nombre, oyente in _oyentes.items():
+        manejador = next(h for h in logging.getLogger(nombre).handlers if isinstance(h, ColaSinFormato))
+        estadisticas[nombre] = {"archivo": oyente.handlers[0].baseFilename, "en_cola": _colas[nombre].qsize(),
+                                "descartados": manejador.descartados}
+    return estadisticas
+
+
+@atexit.register
+def cerrar_logs():
+    """Vacía las colas pendientes y cierra los archivos al terminar el proceso."""
+    for oyente in _oyentes.values():
+        oyente.stop()
+        for manejador in oyente.handlers:
+            manejador.close()
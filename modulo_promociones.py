@@ -1,13 +1,16 @@
 # modulo_promociones.py
 import datetime
 import logging
+import os
 
-# ⚙️ Configuración de logging institucional
-logging.basicConfig(
-    filename='logs_promociones.log',
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s'
-)
+import numpy as np
+import pandas as pd
+
+from modulo_logs import logger_estructurado
+
+# ⚙️ Logging institucional: JSON lines vía cola, sin tocar el logger raíz
+log = logger_estructurado("madoli.promociones", "logs_promociones.log",
+                          os.environ.get("MADOLI_NIVEL_LOG", "INFO").upper())
 
 # 🧠 Función principal trazable
 def bloque_promociones_predictivas(cliente_dict):
@@ -23,7 +26,7 @@ def bloque_promociones_predictivas(cliente_dict):
 
     # 🛡️ Validaciones básicas
     if not isinstance(cliente_dict, dict):
-        logging.warning("Entrada no válida: cliente_dict no es tipo dict.")
+        log.warning("Entrada no válida: cliente_dict no es tipo dict.")
         return {"error": "Formato de entrada no válido"}
 
     id_cliente = cliente_dict.get('id_cliente')
@@ -31,7 +34,7 @@ def bloque_promociones_predictivas(cliente_dict):
     historial = cliente_dict.get('historial', [])
 
     if not id_cliente or not segmento:
-        logging.warning(f"Cliente inválido | Datos faltantes: {cliente_dict}")
+        log.warning("Cliente inválido | Datos faltantes", cliente=cliente_dict)
         return {"error": "Faltan campos obligatorios"}
 
     # 📊 Lógica institucional ficticia para demostración
@@ -54,30 +57,160 @@ def bloque_promociones_predictivas(cliente_dict):
         "timestamp": datetime.datetime.utcnow().isoformat()
     }
 
-    logging.info(f"Promociones generadas para ID {id_cliente} | {resultado}")
+    # Los campos se serializan en el hilo escritor, y sólo si el nivel está activo
+    log.info("Promociones generadas", id_cliente=id_cliente, resultado=resultado)
     return resultado
 
-def generar_promociones_consolidadas(fuentes, bitacora):
-    resultados = []
-    for fuente in fuentes:
-        id_cliente = fuente.get("id_cliente", "sin_id")
-        segmento = fuente.get("segmento", "N/A")
-        historial = fuente.get("historial", [])
-        
-        entrada = {
-            "id_cliente": id_cliente,
-            "segmento": segmento,
-            "historial": historial
-        }
-        
-        resultado = bloque_promociones_predictivas(entrada)
-        
-        if "error" not in resultado:
-            resultados.append(resultado)
-            bitacora.append(f"✔️ Promociones generadas para cliente {id_cliente}")
-        else:
-            bitacora.append(f"⚠️ Error con cliente {id_cliente}: {resultado['error']}")
-    
+# 📋 Reglas declarativas, evaluadas en orden sobre columnas del lote de clientes.
+# Dentro de un mismo 'grupo' sólo aplica la primera regla que coincide (if / elif / else);
+# los grupos distintos se suman. Operadores: ==, !=, >, >=, <, <=, en, contiene, siempre.
+REGLAS_PROMOCIONES = [
+    {"grupo": "segmento", "columna": "segmento", "operador": "==", "valor": "A",
+     "promocion": "Descuento 20% en seguro de auto"},
+    {"grupo": "segmento", "columna": "segmento", "operador": "==", "valor": "B",
+     "promocion": "Membresía gratuita por 3 meses"},
+    {"grupo": "segmento", "columna": None, "operador": "siempre", "valor": None,
+     "promocion": "Asesoría personalizada sin costo"},
+    {"grupo": "historial", "columna": "historial", "operador": "contiene", "valor": "reclamación reciente",
+     "promocion": "Bonificación por fidelidad"},
+]
+MAX_ERRORES_BITACORA = 20
+
+
+def _verdadero(serie: pd.Series) -> np.ndarray:
+    """
+    bool(valor) por fila para los campos obligatorios, igual que 'not id_cliente'
+    en la versión por dict: None, '', 0 y listas vacías faltan, pero NaN cuenta
+    como presente (bool(nan) es True). pd.NA cuenta como faltante; la versión
+    por dict lanza TypeError con él.
+    """
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.fillna(False).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(serie):
+        # NaN != 0 es True, como bool(nan); sólo los NA de tipos con nulos quedan en False
+        return serie.ne(0).fillna(False).to_numpy(dtype=bool)
+    if isinstance(serie.dtype, pd.StringDtype):
+        # Texto: sólo '' es falso (NaN != '' es True; con pd.NA la comparación queda NA → False)
+        return serie.ne("").fillna(False).to_numpy(dtype=bool)
+    return np.fromiter((valor is not pd.NA and bool(valor) for valor in serie.to_numpy(dtype=object)),
+                       dtype=bool, count=len(serie))
+
+
+def _contiene(serie: pd.Series, valor) -> np.ndarray:
+    """'valor in celda': subcadena en textos y pertenencia en listas (sobre la serie aplanada)."""
+    en_texto = serie.str.contains(valor, regex=False)
+    resultado = np.array(en_texto.fillna(False), dtype=bool)
+    if pd.api.types.is_object_dtype(serie):
+        aplanada = serie.reset_index(drop=True).explode()
+        coincide = np.array(aplanada.eq(valor), dtype=bool)
+        resultado |= np.bincount(aplanada.index.to_numpy()[coincide], minlength=len(serie)) > 0
+    return resultado
+
+
+OPERADORES = {
+    "==": lambda s, v: s.eq(v), "!=": lambda s, v: s.ne(v),
+    ">": lambda s, v: s.gt(v), ">=": lambda s, v: s.ge(v),
+    "<": lambda s, v: s.lt(v), "<=": lambda s, v: s.le(v),
+    "en": lambda s, v: s.isin(v),
+}
+
+
+def _mascara(df: pd.DataFrame, regla) -> np.ndarray:
+    operador, columna, valor = regla["operador"], regla.get("columna"), regla.get("valor")
+    if operador == "siempre":
+        return np.ones(len(df), dtype=bool)
+    if columna not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    if operador == "contiene":
+        return _contiene(df[columna], valor)
+    return OPERADORES[operador](df[columna], valor).fillna(False).to_numpy(dtype=bool)
+
+
+def promociones_lote(clientes: pd.DataFrame, reglas=None) -> pd.DataFrame:
+    """
+    Aplica la tabla de reglas a un DataFrame de clientes (id_cliente, segmento,
+    historial y cualquier columna de cartera que usen las reglas).
+
+    Devuelve una fila por cliente con id_cliente, promociones_sugeridas
+    (lista, en el orden de la tabla), timestamp del lote y 'error' para los
+    clientes sin id_cliente o segmento (mismo criterio que la versión por dict).
+    Las máscaras se evalúan por regla sobre columnas completas; cada
+    combinación distinta de reglas se arma una sola vez.
+    """
+    reglas = pd.DataFrame(REGLAS_PROMOCIONES if reglas is None else reglas)
+    if len(reglas) > 62:
+        raise ValueError("La tabla de promociones admite hasta 62 reglas")
+    df = clientes.reset_index(drop=True)
+    n = len(df)
+
+    validos = np.ones(n, dtype=bool)
+    for campo in ("id_cliente", "segmento"):
+        validos &= _verdadero(df[campo]) if campo in df.columns else False
+
+    # 🎭 Máscaras por regla; en cada grupo la regla anula a las siguientes del mismo grupo
+    patron = np.zeros(n, dtype=np.int64)
+    ya_aplico = {}
+    for i, regla in enumerate(reglas.to_dict("records")):
+        mascara = _mascara(df, regla) & validos
+        grupo = regla.get("grupo")
+        if pd.notna(grupo):
+            previas = ya_aplico.get(grupo, np.zeros(n, dtype=bool))
+            mascara &= ~previas
+            ya_aplico[grupo] = previas | mascara
+        patron |= mascara.astype(np.int64) << i
+
+    combinaciones, inversa = np.unique(patron, return_inverse=True)
+    promociones = reglas["promocion"].tolist()
+    listas = np.empty(len(combinaciones), dtype=object)
+    listas[:] = [tuple(p for i, p in enumerate(promociones) if c >> i & 1) for c in combinaciones]
+
+    resultado = pd.DataFrame({
+        "id_cliente": df["id_cliente"] if "id_cliente" in df.columns else None,
+        "promociones_sugeridas": list(map(list, listas[inversa])),
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "error": np.where(validos, None, "Faltan campos obligatorios"),
+    })
+    log.info("Promociones por lote", clientes=n, validos=int(validos.sum()),
+             combinaciones=len(combinaciones), timestamp_lote=resultado["timestamp"].iat[0] if n else None)
+    if log.isEnabledFor(logging.DEBUG):
+        for id_cliente, promociones in zip(resultado["id_cliente"].to_numpy(dtype=object)[validos],
+                                           resultado["promociones_sugeridas"].to_numpy(dtype=object)[validos]):
+            log.debug("Promociones generadas", id_cliente=id_cliente, promociones=promociones)
+    return resultado
+
+
+def generar_promociones_consolidadas(fuentes, bitacora, reglas=None):
+    """
+    Promociones para una lista de dicts o un DataFrame de clientes; devuelve
+    los resultados válidos como dicts (id_cliente, promociones_sugeridas, timestamp).
+    """
+    if isinstance(fuentes, pd.DataFrame):
+        clientes = fuentes.copy(deep=False)
+        for campo, omision in (("id_cliente", "sin_id"), ("segmento", "N/A")):
+            if campo not in clientes.columns:
+                clientes[campo] = omision
+    else:
+        fuentes = list(fuentes)
+        clientes = pd.DataFrame(fuentes)
+        # Mismos valores por omisión que la versión por dict (clave ausente ≠ valor nulo)
+        clientes["id_cliente"] = pd.Series([f.get("id_cliente", "sin_id") for f in fuentes], dtype=object)
+        clientes["segmento"] = pd.Series([f.get("segmento", "N/A") for f in fuentes], dtype=object)
+
+    lote = promociones_lote(clientes, reglas)
+    con_error = lote["error"].notna()
+    validos = lote[~con_error]
+    resultados = [
+        {"id_cliente": id_cliente, "promociones_sugeridas": promociones, "timestamp": marca}
+        for id_cliente, promociones, marca in zip(validos["id_cliente"].to_numpy(dtype=object),
+                                                  validos["promociones_sugeridas"].to_numpy(dtype=object),
+                                                  validos["timestamp"].to_numpy(dtype=object))
+    ]
+
+    bitacora.append(f"✔️ Promociones generadas para {len(resultados):,} clientes")
+    for id_cliente, error in lote.loc[con_error, ["id_cliente", "error"]].head(MAX_ERRORES_BITACORA).itertuples(index=False):
+        bitacora.append(f"⚠️ Error con cliente {id_cliente}: {error}")
+    if con_error.sum() > MAX_ERRORES_BITACORA:
+        bitacora.append(f"⚠️ {int(con_error.sum()) - MAX_ERRORES_BITACORA:,} clientes más con error omitidos")
     return resultados
 
 
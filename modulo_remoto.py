@@ -0,0 +1,206 @@
+# modulo_remoto.py
+# ░ Descargas remotas con caché en disco: GET condicional (ETag / Last-Modified), gzip y stale-while-revalidate ░
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+RUTA_CACHE_REMOTA = os.environ.get("MADOLI_RUTA_CACHE_REMOTA",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_remota"))
+# Copia fresca: se sirve sin preguntar al servidor
+MAX_EDAD_REMOTA = float(os.environ.get("MADOLI_MAX_EDAD_REMOTA", 900))
+# Copia vencida hasta esta edad adicional: se sirve de inmediato y se revalida en segundo plano
+VENTANA_OBSOLETA = float(os.environ.get("MADOLI_VENTANA_OBSOLETA", 86_400))
+# (conexión, lectura) en segundos
+TIMEOUT_REMOTO = (3.05, 60)
+# Sin copia local, tras un error no se vuelve a intentar antes de esto (no se guarda nada en disco)
+ESPERA_TRAS_FALLO = 30.0
+BLOQUE_BYTES = 1 << 16
+
+_lock = threading.Lock()
+_en_curso = {}
+_estadisticas = {}
+_fallos = {}
+
+
+class Descarga(NamedTuple):
+    ruta: str
+    url: str
+    # "fresca" (sin red), "revalidada" (304), "red" (200), "obsoleta" (copia vencida o servidor caído)
+    origen: str
+    huella: str
+    bytes_red: int
+    error: str = None
+
+
+def _archivos(url: str):
+    clave = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+    base = os.path.join(RUTA_CACHE_REMOTA, clave)
+    return base + ".cuerpo", base + ".json"
+
+
+def _leer_meta(ruta_meta: str):
+    try:
+        with open(ruta_meta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_atomico(ruta: str, escribir):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            escribir(archivo)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _guardar_meta(ruta_meta: str, meta: dict):
+    _escribir_atomico(ruta_meta, lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+
+
+def _huella(meta: dict) -> str:
+    return meta.get("etag") or f"{meta.get('last_modified')}-{meta.get('tamano')}"
+
+
+def _contar(url: str, campo: str, cantidad: int = 1):
+    with _lock:
+        fila = _estadisticas.setdefault(url, {"url": url, "peticiones": 0, "bytes_red": 0, "bytes_cuerpo": 0,
+                                              "frescas": 0, "revalidadas": 0, "descargas": 0, "obsoletas": 0,
+                                              "errores": 0})
+        fila[campo] += cantidad
+
+
+def _descargar(url: str, meta, ruta_cuerpo: str, ruta_meta: str, timeout):
+    """
+    GET condicional. Devuelve ("revalidada" | "red", meta). El cuerpo llega
+    comprimido (gzip/deflate) y se cuenta tal cual viaja; se descomprime al
+    escribirlo en disco. Un error nunca reemplaza la copia buena.
+    """
+    import requests
+
+    cabeceras = {"Accept-Encoding": "gzip, deflate"}
+    if meta and os.path.isfile(ruta_cuerpo):
+        if meta.get("etag"):
+            cabeceras["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabeceras["If-Modified-Since"] = meta["last_modified"]
+
+    _contar(url, "peticiones")
+    with requests.get(url, headers=cabeceras, timeout=timeout, stream=True) as resp:
+        if resp.status_code == 304 and meta:
+            meta = dict(meta, obtenido=time.time())
+            _guardar_meta(ruta_meta, meta)
+            _contar(url, "revalidadas")
+            return "revalidada", meta
+        resp.raise_for_status()
+
+        codificacion = resp.headers.get("Content-Encoding", "").lower()
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS if "gzip" in codificacion else zlib.MAX_WBITS) \
+            if codificacion in ("gzip", "x-gzip", "deflate") else None
+        tamano = {"red": 0, "cuerpo": 0}
+
+        def escribir(archivo):
+            for bloque in resp.raw.stream(BLOQUE_BYTES, decode_content=False):
+                tamano["red"] += len(bloque)
+                datos = descompresor.decompress(bloque) if descompresor else bloque
+                tamano["cuerpo"] += len(datos)
+                archivo.write(datos)
+            if descompresor:
+                resto = descompresor.flush()
+                tamano["cuerpo"] += len(resto)
+                archivo.write(resto)
+
+        _escribir_atomico(ruta_cuerpo, escribir)
+        meta = {"url": url, "etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified"),
+                "obtenido": time.time(), "tamano": tamano["cuerpo"], "bytes_red": tamano["red"]}
+        _guardar_meta(ruta_meta, meta)
+    _contar(url, "descargas")
+    _contar(url, "bytes_red", tamano["red"])
+    _contar(url, "bytes_cuerpo", tamano["cuerpo"])
+    return "red", meta
+
+
+def _revalidar_en_segundo_plano(url, meta, ruta_cuerpo, ruta_meta, timeout):
+    with _lock:
+        if url in _en_curso:
+            return
+        _en_curso[url] = True
+
+    def revalidar():
+        try:
+            _descargar(url, meta, ruta_cuerpo, ruta_meta, timeout)
+        except Exception:
+            _contar(url, "errores")
+        finally:
+            with _lock:
+                _en_curso.pop(url, None)
+
+    threading.Thread(target=revalidar, name="revalidar-remoto", daemon=True).start()
+
+
+def obtener(url: str, max_edad: float = MAX_EDAD_REMOTA, ventana_obsoleta: float = VENTANA_OBSOLETA,
+            timeout=TIMEOUT_REMOTO) -> Descarga:
+    """
+    Copia local de 'url' en la caché de disco (sobrevive reinicios del proceso).
+
+    - Más nueva que 'max_edad': se sirve sin red.
+    - Vencida pero dentro de 'ventana_obsoleta': se sirve y se revalida en
+      segundo plano (stale-while-revalidate).
+    - Más vieja o inexistente: GET condicional; si el servidor falla se sirve
+      la última copia buena (stale-if-error).
+    Sin copia previa un error se propaga: las fallas nunca quedan en caché.
+    """
+    ruta_cuerpo, ruta_meta = _archivos(url)
+    meta = _leer_meta(ruta_meta)
+    if meta and not os.path.isfile(ruta_cuerpo):
+        meta = None
+    edad = time.time() - meta["obtenido"] if meta else None
+
+    if meta and edad <= max_edad:
+        _contar(url, "frescas")
+        return Descarga(ruta_cuerpo, url, "fresca", _huella(meta), 0)
+
+    if meta and edad <= max_edad + ventana_obsoleta:
+        _revalidar_en_segundo_plano(url, meta, ruta_cuerpo, ruta_meta, timeout)
+        _contar(url, "obsoletas")
+        return Descarga(ruta_cuerpo, url, "obsoleta", _huella(meta), 0)
+
+    if not meta and url in _fallos and time.time() - _fallos[url][0] < ESPERA_TRAS_FALLO:
+        raise _fallos[url][1]
+    try:
+        origen, meta = _descargar(url, meta, ruta_cuerpo, ruta_meta, timeout)
+    except Exception as e:
+        _contar(url, "errores")
+        if not meta:
+            _fallos[url] = (time.time(), e)
+            raise
+        _contar(url, "obsoletas")
+        return Descarga(ruta_cuerpo, url, "obsoleta", _huella(meta), 0, f"{type(e).__name__}: {e}")
+    _fallos.pop(url, None)
+    return Descarga(ruta_cuerpo, url, origen, _huella(meta), meta.get("bytes_red", 0) if origen == "red" else 0)
+
+
+def estadisticas_remoto() -> list:
+    """Contadores por URL desde el arranque del proceso (bytes por red vs. bytes del cuerpo)."""
+    with _lock:
+        return [dict(fila) for fila in _estadisticas.values()]
+
+
+def invalidar_remoto(url: str = None):
+    """Borra la copia en disco de una URL (o de todas)."""
+    rutas = _archivos(url) if url else [os.path.join(RUTA_CACHE_REMOTA, n) for n in
+                                         (os.listdir(RUTA_CACHE_REMOTA) if os.path.isdir(RUTA_CACHE_REMOTA) else [])]
+    for ruta in rutas:
+        if os.path.isfile(ruta):
+            os.remove(ruta)
@@ -0,0 +1,105 @@
+# modulo_retencion.py
+# ░ Score institucional de retención para toda la cartera ░
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import derivado
+from modulo_clientes import indice_clientes
+
+# ⚖️ Pesos del score y umbrales de clasificación
+PESO_POLIZAS = 0.5
+PESO_DIVERSIDAD = 0.3
+PESO_VENCIMIENTOS = 0.2
+ESCALA_SCORE = 10
+UMBRAL_PRIORITARIO = 7
+UMBRAL_PROMOTOR = 4
+CLASES = ("Prioritario", "Promotor", "En riesgo")
+
+COLUMNAS_RANKING = [
+    "posicion", "id_cliente", "contratante", "score", "clasificacion",
+    "polizas", "productos", "aseguradoras", "vencimientos", "prima_total",
+]
+
+
+def score_retencion(polizas, productos, vencimientos):
+    """Score de retención; acepta escalares o arreglos (misma fórmula en ambos casos)."""
+    return (polizas * PESO_POLIZAS + productos * PESO_DIVERSIDAD
+            + vencimientos * PESO_VENCIMIENTOS) / ESCALA_SCORE
+
+
+def clasificar(score):
+    """Prioritario (≥ 7), Promotor (≥ 4) o En riesgo; escalar o arreglo."""
+    if np.ndim(score) == 0:
+        if score >= UMBRAL_PRIORITARIO:
+            return CLASES[0]
+        return CLASES[1] if score >= UMBRAL_PROMOTOR else CLASES[2]
+    score = np.asarray(score)
+    return np.select([score >= UMBRAL_PRIORITARIO, score >= UMBRAL_PROMOTOR], CLASES[:2], CLASES[2])
+
+
+class RankingRetencion:
+    """
+    Score y clasificación de todos los clientes, calculados en una sola
+    pasada vectorizada sobre el resumen materializado de IndiceClientes.
+
+    Los órdenes por columna se calculan una vez y se reutilizan al paginar.
+    """
+
+    def __init__(self, resumen: pd.DataFrame, col_id: str = "id_cliente"):
+        score = score_retencion(resumen["polizas"].to_numpy(), resumen["productos"].to_numpy(),
+                                resumen["vencimientos"].to_numpy())
+        tabla = resumen.rename(columns={col_id: "id_cliente"}).assign(
+            score=score.round(4),
+            clasificacion=pd.Categorical(clasificar(score), categories=CLASES),
+        )
+        tabla = tabla.sort_values(["score", "prima_total"], ascending=False, kind="stable").reset_index(drop=True)
+        tabla.insert(0, "posicion", np.arange(1, len(tabla) + 1))
+        self.tabla = tabla[[c for c in COLUMNAS_RANKING if c in tabla.columns]]
+        self.conteo_clases = self.tabla["clasificacion"].value_counts(sort=False).to_dict()
+        self._ordenes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tabla)
+
+    def orden(self, columna: str = "posicion", ascendente: bool = True) -> np.ndarray:
+        clave = (columna, ascendente)
+        with self._lock:
+            if clave in self._ordenes:
+                return self._ordenes[clave]
+        valores = self.tabla[columna]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            valores = valores.cat.codes
+        orden = valores.sort_values(ascending=ascendente, kind="stable", na_position="last").index.to_numpy()
+        with self._lock:
+            self._ordenes[clave] = orden
+        return orden
+
+    def filtrar(self, clases=None) -> pd.DataFrame:
+        if not clases:
+            return self.tabla
+        return self.tabla[self.tabla["clasificacion"].isin(clases)]
+
+    def pagina(self, numero: int = 1, tamano: int = 50, columna: str = "posicion",
+               ascendente: bool = True, clases=None):
+        """Devuelve (filas de la página, total de páginas) sin reordenar la tabla completa."""
+        orden = self.orden(columna, ascendente)
+        if clases:
+            clase_fila = self.tabla["clasificacion"].to_numpy(dtype=object)
+            orden = orden[np.isin(clase_fila[orden], list(clases))]
+        paginas = max(1, -(-len(orden) // tamano))
+        numero = min(max(1, numero), paginas)
+        return self.tabla.take(orden[(numero - 1) * tamano:numero * tamano]), paginas
+
+
+def ranking_retencion(df: pd.DataFrame, **columnas):
+    """Ranking de retención compartido por sesiones; se recalcula sólo si cambia la huella."""
+    def construir(d):
+        indice, _ = indice_clientes(d, **columnas)
+        return RankingRetencion(indice.resumen, indice.col_id)
+
+    clave = ("retencion", tuple(sorted(columnas.items())))
+    return derivado(df, clave, construir)
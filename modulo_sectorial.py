@@ -0,0 +1,256 @@
+# modulo_sectorial.py
+# ░ Cubo materializado de ventas sectoriales con anexado incremental por fecha de corte ░
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import RUTA_SNAPSHOTS, derivado
+from modulo_homologacion import VERSION_HOMOLOGACION
+
+# 🧊 Dimensiones y medidas del cubo (las dimensiones ausentes en el extracto se omiten)
+DIMENSIONES = ["nombre", "trimestre", "Ramo", "Giro", "Entidad"]
+MEDIDAS = ["Ventas", "PRIMA_EMI", "SUMA_ASEG", "NUM_SIN_O_RECLAMACION"]
+# Nivel de las rebanadas por ramo y de las tasas de crecimiento
+NIVEL_SERIE = ["Ramo", "nombre", "trimestre"]
+REZAGOS = {"qoq": 1, "yoy": 4}
+SIN_CORTE = "sin corte"
+SIN_RAMO = "SIN RAMO"
+
+RUTA_CUBO = os.path.join(RUTA_SNAPSHOTS, "cubo_ventas.parquet")
+VERSION_CUBO = f"2-{VERSION_HOMOLOGACION}"
+
+
+def _dimensiones(columnas) -> list:
+    """Dimensiones del cubo presentes en el extracto ('Ramo' siempre, con SIN_RAMO si falta)."""
+    return [c for c in DIMENSIONES if c in columnas or c == "Ramo"]
+
+
+def _cortes(df: pd.DataFrame):
+    """
+    (códigos, etiquetas): la fecha de corte de cada fila como código sobre las
+    etiquetas ISO. Sólo se parsean los valores únicos, no la columna completa.
+    """
+    if "fecha_corte" not in df.columns:
+        return np.zeros(len(df), dtype=np.intp), [SIN_CORTE]
+    codigos, unicos = pd.factorize(df["fecha_corte"])
+    iso = pd.to_datetime(pd.Series(unicos, dtype=object), errors="coerce").dt.strftime("%Y-%m-%d")
+    etiquetas = np.append(iso.fillna(SIN_CORTE).to_numpy(dtype=object), SIN_CORTE)
+    # Valores distintos con la misma fecha ('30/06/25' y Timestamp) comparten etiqueta
+    unificados, etiquetas = pd.factorize(etiquetas)
+    return unificados[np.where(codigos < 0, len(unicos), codigos)], list(etiquetas)
+
+
+def _firmas(df: pd.DataFrame, codigos, etiquetas) -> dict:
+    """Firma por fecha de corte (filas y suma de medidas) para detectar extractos corregidos."""
+    filas = np.bincount(codigos, minlength=len(etiquetas))
+    sumas = []
+    for medida in MEDIDAS:
+        if medida in df.columns:
+            valores = pd.to_numeric(df[medida], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            sumas.append(np.bincount(codigos, weights=np.nan_to_num(valores), minlength=len(etiquetas)))
+        else:
+            sumas.append(np.zeros(len(etiquetas)))
+    return {corte: [int(filas[k]), *(round(float(s[k]), 2) for s in sumas)]
+            for k, corte in enumerate(etiquetas) if filas[k]}
+
+
+def _preparar(df: pd.DataFrame, corte) -> pd.DataFrame:
+    """Columnas del cubo con nombres canónicos: 'Ramo' y la fecha de corte ISO ya resuelta por _cortes."""
+    columnas = {c: df[c] for c in DIMENSIONES if c in df.columns}
+    if "Ramo" not in columnas:
+        columnas["Ramo"] = pd.Series(SIN_RAMO, index=df.index)
+    for medida in MEDIDAS:
+        columnas[medida] = pd.to_numeric(df[medida], errors="coerce") if medida in df.columns else 0.0
+    columnas["fecha_corte"] = corte
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def _agregar(preparado: pd.DataFrame, dimensiones) -> pd.DataFrame:
+    celdas = preparado.groupby(list(dimensiones), observed=True, sort=False, dropna=False)[MEDIDAS].sum()
+    celdas = celdas.reset_index()
+    # Dimensiones como texto: las celdas de distintos extractos se combinan sin unificar categorías
+    return celdas.astype({d: str for d in dimensiones})
+
+
+def _crecimiento(serie: pd.DataFrame) -> pd.DataFrame:
+    """Añade <medida>_qoq y <medida>_yoy comparando contra el mismo grupo 1 y 4 trimestres atrás."""
+    ordinal = pd.PeriodIndex(serie["trimestre"], freq="Q").asi8
+    grupos = [c for c in NIVEL_SERIE if c != "trimestre"]
+    claves = pd.MultiIndex.from_frame(serie[grupos]).to_flat_index()
+    posicion = pd.Series(np.arange(len(serie)), index=pd.MultiIndex.from_arrays([claves, ordinal]))
+
+    resultado = serie.copy()
+    for sufijo, rezago in REZAGOS.items():
+        previo = posicion.reindex(pd.MultiIndex.from_arrays([claves, ordinal - rezago])).to_numpy()
+        existe = ~np.isnan(previo)
+        indice = np.where(existe, previo, 0).astype(np.int64)
+        for medida in MEDIDAS:
+            actual = serie[medida].to_numpy(dtype="float64")
+            base = np.where(existe, actual[indice], np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tasa = np.where(base > 0, actual / base - 1, np.nan)
+            resultado[f"{medida}_{sufijo}"] = np.round(tasa, 4)
+    return resultado
+
+
+class CuboVentas:
+    """
+    Ventas sectoriales agregadas por nombre × trimestre × Ramo × Giro × Entidad.
+
+    Las celdas conservan la fecha_corte de origen: al llegar un corte nuevo
+    sólo sus filas se preparan y se agregan; si un corte ya incorporado llega
+    con otra firma sólo se reemplazan sus celdas. Un corte ausente del
+    extracto se conserva tal cual. Las rebanadas por ramo y el crecimiento
+    QoQ/YoY se precalculan al materializar.
+    """
+
+    def __init__(self, celdas: pd.DataFrame, cortes: dict, historial=None):
+        self.celdas = celdas
+        self.cortes = cortes
+        self.historial = list(historial or [])
+        self.dimensiones = [c for c in DIMENSIONES if c in celdas.columns]
+        self._materializar()
+
+    @classmethod
+    def vacio(cls):
+        return cls(pd.DataFrame(columns=["nombre", "trimestre", "Ramo", "fecha_corte", *MEDIDAS]), {})
+
+    @classmethod
+    def desde_ventas(cls, df: pd.DataFrame):
+        return cls.vacio().actualizar(df)
+
+    def _materializar(self):
+        if self.celdas.empty or "trimestre" not in self.celdas.columns:
+            self.serie = pd.DataFrame(columns=NIVEL_SERIE + MEDIDAS)
+            self._rebanadas = {}
+            return
+        serie = self.celdas.groupby(NIVEL_SERIE, sort=True)[MEDIDAS].sum().reset_index()
+        self.serie = _crecimiento(serie)
+        self._rebanadas = {ramo: grupo.drop(columns="Ramo").reset_index(drop=True)
+                           for ramo, grupo in self.serie.groupby("Ramo", sort=True)}
+
+    def actualizar(self, df: pd.DataFrame):
+        """
+        Devuelve el cubo al día con el extracto 'df': el mismo objeto si sus
+        cortes ya están incorporados con la misma firma; si no, uno con los
+        cortes nuevos anexados y los corregidos reemplazados. Los cortes que
+        no vienen en 'df' se conservan. Sólo se reconstruye desde 'df' si
+        cambian las dimensiones del extracto.
+        """
+        codigos, etiquetas = _cortes(df)
+        firmas = _firmas(df, codigos, etiquetas)
+        dimensiones = _dimensiones(df.columns)
+
+        if self.cortes and dimensiones != self.dimensiones:
+            cubo = CuboVentas.desde_ventas(df)
+            for evento in cubo.historial:
+                evento["accion"] = "reconstruido"
+            cubo.historial = self.historial + cubo.historial
+            return cubo
+
+        nuevos = [c for c in firmas if c not in self.cortes]
+        corregidos = [c for c in firmas if c in self.cortes and self.cortes[c] != firmas[c]]
+        if not nuevos and not corregidos:
+            return self
+
+        # Sólo las filas de los cortes pendientes se preparan y agregan
+        pendientes = np.isin(codigos, [etiquetas.index(c) for c in nuevos + corregidos])
+        corte = np.asarray(etiquetas, dtype=object)[codigos[pendientes]]
+        anexo = _agregar(_preparar(df[pendientes], corte), dimensiones + ["fecha_corte"])
+        celdas = self.celdas
+        if corregidos:
+            celdas = celdas[~celdas["fecha_corte"].isin(corregidos)]
+        # La fecha_corte es parte de la clave: las celdas de cortes distintos nunca se solapan
+        celdas = anexo if celdas.empty else pd.concat([celdas, anexo], ignore_index=True)
+
+        accion = "anexado" if self.cortes else "inicial"
+        ahora = datetime.now().isoformat()
+        historial = self.historial + [
+            {"corte": c, "filas": firmas[c][0], "accion": "corregido" if c in self.cortes else accion, "en": ahora}
+            for c in nuevos + corregidos
+        ]
+        return CuboVentas(celdas, {**self.cortes, **{c: firmas[c] for c in nuevos + corregidos}}, historial)
+
+    # 🔪 Consultas
+    def ramos(self):
+        return list(self._rebanadas)
+
+    def rebanada(self, ramo) -> pd.DataFrame:
+        """Serie nombre × trimestre del ramo con medidas y tasas QoQ/YoY."""
+        return self._rebanadas.get(ramo, self.serie.iloc[0:0].drop(columns="Ramo"))
+
+    def ultimo_trimestre(self, ramo) -> pd.DataFrame:
+        """Última fila de cada nombre en el ramo (para la tabla de crecimiento)."""
+        rebanada = self.rebanada(ramo)
+        if rebanada.empty:
+            return rebanada
+        return rebanada[rebanada["trimestre"] == rebanada["trimestre"].max()].reset_index(drop=True)
+
+    def historial_df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.historial)
+
+    # 💾 Persistencia junto a los snapshots
+    def guardar(self, ruta: str = RUTA_CUBO):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tabla = pa.Table.from_pandas(self.celdas, preserve_index=False)
+        meta = dict(tabla.schema.metadata or {})
+        meta.update({
+            b"madoli_version": VERSION_CUBO.encode(),
+            b"madoli_cortes": json.dumps(self.cortes).encode(),
+            b"madoli_historial": json.dumps(self.historial).encode(),
+        })
+        temporal = ruta + ".tmp"
+        pq.write_table(tabla.replace_schema_metadata(meta), temporal, compression="zstd")
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str = RUTA_CUBO):
+        """Cubo persistido con la versión vigente, o None."""
+        try:
+            import pyarrow.parquet as pq
+
+            tabla = pq.read_table(ruta)
+        except Exception:
+            return None
+        meta = {k.decode(): v.decode() for k, v in (tabla.schema.metadata or {}).items()
+                if k.startswith(b"madoli_")}
+        if meta.get("madoli_version") != VERSION_CUBO:
+            return None
+        return cls(tabla.to_pandas(), json.loads(meta.get("madoli_cortes", "{}")),
+                   json.loads(meta.get("madoli_historial", "[]")))
+
+
+# 🗃️ Último cubo del proceso: cada huella nueva de ventas parte de él
+_cubo = None
+_cubo_lock = threading.Lock()
+
+
+def _cubo_al_dia(df: pd.DataFrame, ruta: str):
+    global _cubo
+    with _cubo_lock:
+        anterior = _cubo or CuboVentas.cargar(ruta) or CuboVentas.vacio()
+        cubo = anterior.actualizar(df)
+        _cubo = cubo
+    if cubo is not anterior:
+        try:
+            cubo.guardar(ruta)
+        except Exception:
+            # Sin pyarrow o sin permisos: el cubo sigue vigente en memoria
+            pass
+    return cubo
+
+
+def cubo_ventas(df: pd.DataFrame, ruta: str = RUTA_CUBO):
+    """
+    Cubo compartido por sesiones; sólo se actualiza (anexando cortes nuevos)
+    cuando cambia la huella de ventas_sectoriales. Devuelve (cubo, ms).
+    """
+    return derivado(df, ("cubo_ventas", ruta), lambda d: _cubo_al_dia(d, ruta))
@@ -0,0 +1,289 @@
+# modulo_segmentacion.py
+# ░ Segmentación de clientes: rasgos de comportamiento, MiniBatchKMeans persistido por huella ░
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import RUTA_SNAPSHOTS, derivado
+from modulo_clientes import indice_clientes
+
+K_CLUSTERS = 3
+VERSION_MODELO = "1"
+RUTA_MODELOS = os.environ.get("MADOLI_RUTA_MODELOS", os.path.join(RUTA_SNAPSHOTS, "modelos"))
+# Tras un ajuste fallido no se reintenta la misma huella antes de esto (segundos)
+ESPERA_REINTENTO = float(os.environ.get("MADOLI_ESPERA_REINTENTO_MODELO", 300))
+# Filas por lote de partial_fit: la memoria del ajuste no crece con la cartera
+FILAS_LOTE = 10_000
+EPOCAS = 3
+MAX_MODELOS = 8
+
+RASGOS_BASE = ["log_prima_total", "prima_media", "polizas", "aseguradoras", "productos",
+               "antiguedad_anios", "tasa_vencimientos"]
+PREFIJO_MIX = "mix_"
+
+
+# 🧬 Rasgos por cliente
+def _indice(df, col_id):
+    # Con la columna por omisión se comparte el índice que ya usa el perfil de cliente
+    return indice_clientes(df) if col_id == "id_cliente" else indice_clientes(df, col_id=col_id)
+
+
+def _construir_rasgos(df, col_id, col_ramo, col_inicio):
+    indice, _ = _indice(df, col_id)
+    resumen = indice.resumen
+    polizas = resumen["polizas"].to_numpy(dtype="float64")
+    prima = resumen["prima_total"].to_numpy(dtype="float64")
+    rasgos = pd.DataFrame({
+        "log_prima_total": np.log1p(np.clip(prima, 0, None)),
+        "prima_media": np.log1p(np.divide(prima, polizas, out=np.zeros_like(prima), where=polizas > 0)),
+        "polizas": polizas,
+        "aseguradoras": resumen["aseguradoras"].to_numpy(dtype="float64"),
+        "productos": resumen["productos"].to_numpy(dtype="float64"),
+        "tasa_vencimientos": np.divide(resumen["vencimientos"].to_numpy(dtype="float64"),
+                                       polizas, out=np.zeros_like(prima), where=polizas > 0),
+    }, index=pd.Index(indice.ids, name=col_id))
+
+    codigos, _ = pd.factorize(df[col_id], sort=True)
+    con_id = codigos >= 0
+    total = len(indice.ids)
+
+    # Antigüedad: primera vigencia del cliente contra la más reciente de la cartera
+    if col_inicio in df.columns:
+        inicio = pd.to_datetime(df[col_inicio], errors="coerce")
+        dias = (inicio.max() - inicio).dt.days.to_numpy(dtype="float64", na_value=np.nan)
+        validos = con_id & ~np.isnan(dias)
+        antiguedad = np.zeros(total)
+        np.maximum.at(antiguedad, codigos[validos], dias[validos])
+        rasgos["antiguedad_anios"] = antiguedad / 365.25
+    else:
+        rasgos["antiguedad_anios"] = 0.0
+
+    # Mezcla de ramos: proporción de registros del cliente en cada ramo
+    if col_ramo in df.columns:
+        cod_ramo, ramos = pd.factorize(df[col_ramo])
+        validos = con_id & (cod_ramo >= 0)
+        conteo = np.bincount(codigos[validos] * len(ramos) + cod_ramo[validos],
+                             minlength=total * max(len(ramos), 1)).reshape(total, max(len(ramos), 1))
+        filas = conteo.sum(axis=1, keepdims=True)
+        mezcla = np.divide(conteo, filas, out=np.zeros(conteo.shape), where=filas > 0)
+        for j, ramo in enumerate(ramos):
+            rasgos[f"{PREFIJO_MIX}{ramo}"] = mezcla[:, j]
+    return rasgos[RASGOS_BASE + [c for c in rasgos.columns if c.startswith(PREFIJO_MIX)]]
+
+
+def rasgos_clientes(df: pd.DataFrame, col_id: str = "id_cliente", col_ramo: str = "Ramo",
+                    col_inicio: str = "start_date"):
+    """Vector de rasgos por cliente (índice = id_cliente), memorizado por huella. Devuelve (rasgos, ms)."""
+    return derivado(df, ("rasgos_segmentacion", col_id, col_ramo, col_inicio),
+                    lambda d: _construir_rasgos(d, col_id, col_ramo, col_inicio))
+
+
+# 🧠 Modelo
+class ModeloSegmentacion:
+    """
+    MiniBatchKMeans sobre rasgos estandarizados.
+
+    El ajuste recorre los rasgos en lotes de FILAS_LOTE con partial_fit, así
+    que la memoria no depende del tamaño de la cartera. 'predecir' sólo
+    estandariza y busca el centro más cercano: sirve para clientes nuevos
+    sin reentrenar (rasgos ausentes, p. ej. un ramo nuevo, cuentan como 0).
+    """
+
+    def __init__(self, rasgos: pd.DataFrame, k: int = K_CLUSTERS, huella=None, semilla: int = 42):
+        from sklearn.cluster import MiniBatchKMeans
+
+        inicio = time.perf_counter()
+        self.k = min(k, max(len(rasgos), 1))
+        self.huella = huella
+        self.columnas = list(rasgos.columns)
+        matriz = rasgos.to_numpy(dtype="float64")
+        self.media = matriz.mean(axis=0) if len(matriz) else np.zeros(len(self.columnas))
+        escala = matriz.std(axis=0) if len(matriz) else np.ones(len(self.columnas))
+        self.escala = np.where(escala > 0, escala, 1.0)
+        matriz = (matriz - self.media) / self.escala
+
+        modelo = MiniBatchKMeans(n_clusters=self.k, random_state=semilla, batch_size=min(FILAS_LOTE, len(matriz)),
+                                 n_init=3)
+        if len(matriz) <= FILAS_LOTE:
+            modelo.fit(matriz)
+        else:
+            orden = np.random.default_rng(semilla).permutation(len(matriz))
+            for _ in range(EPOCAS):
+                for inicio_lote in range(0, len(matriz), FILAS_LOTE):
+                    modelo.partial_fit(matriz[orden[inicio_lote:inicio_lote + FILAS_LOTE]])
+        self.centros = modelo.cluster_centers_
+        self.inercia = float(getattr(modelo, "inertia_", np.nan) or np.nan)
+        self.clientes = len(rasgos)
+        self.segundos = time.perf_counter() - inicio
+        self.entrenado_en = datetime.now().isoformat(timespec="seconds")
+
+    def _matriz(self, rasgos: pd.DataFrame) -> np.ndarray:
+        matriz = rasgos.reindex(columns=self.columnas, fill_value=0.0).to_numpy(dtype="float64")
+        return (np.nan_to_num(matriz) - self.media) / self.escala
+
+    def predecir(self, rasgos: pd.DataFrame, lote: int = FILAS_LOTE) -> np.ndarray:
+        """Cluster del centro más cercano para cada fila de rasgos."""
+        etiquetas = np.empty(len(rasgos), dtype=np.int64)
+        matriz = self._matriz(rasgos)
+        normas = (self.centros ** 2).sum(axis=1)
+        for inicio in range(0, len(matriz), lote):
+            bloque = matriz[inicio:inicio + lote]
+            etiquetas[inicio:inicio + lote] = np.argmin(normas - 2 * bloque @ self.centros.T, axis=1)
+        return etiquetas
+
+    def perfiles(self) -> pd.DataFrame:
+        """Centros en las unidades originales de los rasgos (uno por cluster)."""
+        centros = self.centros * self.escala + self.media
+        return pd.DataFrame(centros, columns=self.columnas).rename_axis("cluster").round(3)
+
+
+# 💾 Persistencia y reentrenamiento en segundo plano
+def clave_modelo(huella, k: int = K_CLUSTERS) -> str:
+    return hashlib.sha1(repr((huella, k, VERSION_MODELO)).encode("utf-8")).hexdigest()[:20]
+
+
+def _ruta_modelo(clave: str) -> str:
+    return os.path.join(RUTA_MODELOS, f"segmentacion-{clave}.joblib")
+
+
+def _guardar(modelo, clave):
+    import joblib
+
+    os.makedirs(RUTA_MODELOS, exist_ok=True)
+    temporal = _ruta_modelo(clave) + f".{threading.get_ident()}.tmp"
+    joblib.dump(modelo, temporal)
+    os.replace(temporal, _ruta_modelo(clave))
+
+
+def _cargar(clave):
+    ruta = _ruta_modelo(clave)
+    if not os.path.isfile(ruta):
+        return None
+    try:
+        import joblib
+
+        return joblib.load(ruta)
+    except Exception:
+        return None
+
+
+_modelos = {}
+_ultimo = {}
+_en_curso = {}
+_errores = {}
+_fallos = {}
+_lock = threading.Lock()
+
+
+def _registrar(clave, k, modelo):
+    with _lock:
+        _modelos[clave] = modelo
+        _ultimo[k] = modelo
+        while len(_modelos) > MAX_MODELOS:
+            _modelos.pop(next(iter(_modelos)))
+
+
+def _entrenar(clave, rasgos, k, huella):
+    try:
+        modelo = ModeloSegmentacion(rasgos, k, huella)
+        if huella is not None:
+            try:
+                _guardar(modelo, clave)
+            except Exception as e:
+                _errores[clave] = f"persistencia: {e}"
+        _registrar(clave, k, modelo)
+        with _lock:
+            _fallos.pop(clave, None)
+        return modelo
+    except Exception as e:
+        mensaje = f"{type(e).__name__}: {e}"
+        with _lock:
+            _errores[clave] = mensaje
+            _fallos[clave] = (time.time(), mensaje)
+        return None
+    finally:
+        with _lock:
+            _en_curso.pop(clave, None)
+
+
+def modelo_segmentacion(df: pd.DataFrame, k: int = K_CLUSTERS, col_id: str = "id_cliente"):
+    """
+    Modelo para la huella de 'df' sin bloquear el render.
+
+    Devuelve (modelo, estado): 'vigente' si ya existe para esta huella (en
+    memoria o en disco); 'anterior' si se sirve el último modelo mientras el
+    de la huella nueva se entrena en segundo plano; 'entrenando' (modelo
+    None) si aún no hay ninguno; 'error' si el último ajuste de esta huella
+    falló hace menos de ESPERA_REINTENTO (con el modelo anterior, si lo hay;
+    el mensaje en error_segmentacion). Las tablas sin huella no se pueden
+    memorizar y se ajustan en línea.
+    """
+    huella = df.attrs.get("madoli_huella")
+    clave = clave_modelo(huella, k)
+    with _lock:
+        modelo = _modelos.get(clave)
+        anterior = _ultimo.get(k)
+        fallo = _fallos.get(clave)
+    if modelo is not None:
+        return modelo, "vigente"
+    if huella is not None:
+        modelo = _cargar(clave)
+        if modelo is not None:
+            _registrar(clave, k, modelo)
+            return modelo, "vigente"
+
+    if huella is not None and fallo is not None and time.time() - fallo[0] < ESPERA_REINTENTO:
+        return anterior, "error"
+
+    rasgos, _ = rasgos_clientes(df, col_id=col_id)
+    if huella is None:
+        modelo = _entrenar(clave, rasgos, k, huella)
+        return modelo, "vigente" if modelo is not None else "error"
+
+    with _lock:
+        if clave not in _en_curso:
+            hilo = threading.Thread(target=_entrenar, args=(clave, rasgos, k, huella),
+                                    name=f"segmentacion-{clave}", daemon=True)
+            _en_curso[clave] = hilo
+            hilo.start()
+    return (anterior, "anterior") if anterior is not None else (None, "entrenando")
+
+
+def segmentar(df: pd.DataFrame, k: int = K_CLUSTERS, col_id: str = "id_cliente", col_nombre: str = "contractor_name"):
+    """
+    Clientes con su cluster: (tabla id_cliente / contratante / cluster, modelo, estado).
+    La asignación se memoriza por (huella de datos, modelo usado).
+    """
+    modelo, estado = modelo_segmentacion(df, k, col_id)
+    if modelo is None:
+        return None, modelo, estado
+
+    def asignar(d):
+        rasgos, _ = rasgos_clientes(d, col_id=col_id)
+        indice, _ = _indice(d, col_id)
+        return pd.DataFrame({
+            col_id: rasgos.index.to_numpy(dtype=object),
+            col_nombre: indice.resumen["contratante"].to_numpy(dtype=object),
+            "cluster": modelo.predecir(rasgos),
+        })
+
+    tabla, _ = derivado(df, ("segmentacion", col_id, col_nombre, modelo.huella, modelo.entrenado_en), asignar)
+    return tabla, modelo, estado
+
+
+def error_segmentacion(df: pd.DataFrame, k: int = K_CLUSTERS):
+    """Mensaje del último ajuste fallido para la huella de 'df' (None si no hay)."""
+    with _lock:
+        fallo = _fallos.get(clave_modelo(df.attrs.get("madoli_huella"), k))
+    return fallo[1] if fallo else None
+
+
+def estado_segmentacion() -> dict:
+    with _lock:
+        return {"modelos_en_memoria": len(_modelos), "entrenando": len(_en_curso), "errores": dict(_errores)}
@@ -0,0 +1,88 @@
+# modulo_snapshots.py
+# ░ Paso de construcción: CSV institucionales → snapshots Parquet homologados ░
+#
+# Uso:
+#   python modulo_snapshots.py            # construye todos los snapshots
+#   python modulo_snapshots.py --forzar   # reconstruye aunque estén vigentes
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from modulo_carga import (
+    _resolver_local, escribir_snapshot, ruta_snapshot, snapshot_vigente,
+)
+from modulo_homologacion import homologar
+from modulo_ingesta import leer_csv
+from modulo_remoto import obtener
+
+URL_CENSO_PUBLICO = os.environ.get("MADOLI_URL_CENSO",
+                                   "https://storage.googleapis.com/madoli360-archivos/censo_inegi.csv")
+
+# 📚 Bases institucionales: nombre lógico del snapshot → archivos fuente (en orden)
+DATASETS = {
+    "madoli_base.csv": ("madoli_base.csv",),
+    "denue.csv": ("denue.csv", "empresa.csv"),
+    "ventas_sectoriales.csv": ("ventas_sectoriales.csv",),
+    "censo_inegi.csv": ("censo_inegi.csv",),
+}
+
+# 🌐 Fuentes que pueden descargarse si no hay copia local
+URLS_REMOTAS = {
+    "censo_inegi.csv": URL_CENSO_PUBLICO,
+}
+
+
+def construir_snapshot(nombre: str, forzar: bool = False) -> dict:
+    """Construye (o confirma vigente) el snapshot de una base y reporta el resultado."""
+    archivos = DATASETS[nombre]
+    ruta_csv = _resolver_local(archivos)
+    destino = ruta_snapshot(nombre)
+
+    if ruta_csv is None and nombre not in URLS_REMOTAS:
+        return {"base": nombre, "estado": "sin fuente", "registros": 0, "segundos": 0.0}
+
+    if not forzar and ruta_csv is not None and snapshot_vigente(destino, ruta_csv):
+        return {"base": nombre, "estado": "vigente", "registros": None, "segundos": 0.0}
+
+    inicio = time.perf_counter()
+    if ruta_csv:
+        df, huella_origen = leer_csv(ruta_csv), None
+    else:
+        # La huella de la descarga (ETag) permite saber si el snapshot sigue al día con la fuente remota
+        descarga = obtener(URLS_REMOTAS[nombre], max_edad=0, ventana_obsoleta=0)
+        df, huella_origen = pd.read_csv(descarga.ruta, encoding="utf-8-sig"), descarga.huella
+    df = homologar(os.path.basename(ruta_csv) if ruta_csv else nombre, df)
+    escribir_snapshot(nombre, df, ruta_csv, huella_origen)
+
+    return {
+        "base": nombre,
+        "estado": "generado",
+        "registros": len(df),
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "bytes": os.path.getsize(destino),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera snapshots Parquet homologados.")
+    parser.add_argument("bases", nargs="*", help="Bases a construir (por defecto todas)")
+    parser.add_argument("--forzar", action="store_true", help="Reconstruir aunque estén vigentes")
+    args = parser.parse_args(argv)
+
+    codigo = 0
+    for nombre in args.bases or DATASETS:
+        try:
+            resultado = construir_snapshot(nombre, args.forzar)
+        except Exception as e:
+            resultado = {"base": nombre, "estado": f"error: {e}"}
+            codigo = 1
+        print(" | ".join(f"{k}={v}" for k, v in resultado.items()))
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# modulo_territorial.py
+# ░ DENUE y Censo particionados por clave de municipio, con cruce territorial precalculado ░
+
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from modulo_carga import derivado
+
+# Nombre canónico en DENUE y censo (los alias se resuelven en la ingesta, ver modulo_esquemas)
+COLUMNA_MUNICIPIO = "municipio"
+# Columna de población del censo INEGI (ITER); habilita empresas por mil habitantes
+COLUMNA_POBLACION = "POBTOT"
+SIN_GIRO = "SIN GIRO"
+
+
+def clave_municipio(texto) -> str:
+    """Clave normalizada: mayúsculas, sin acentos y con espacios simples ('Álvaro  Obregón' → 'ALVARO OBREGON')."""
+    if not isinstance(texto, str):
+        return ""
+    sin_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sin_acentos.upper().split())
+
+
+def _claves(serie: pd.Series):
+    """
+    Código de clave por fila (-1 sin municipio) y la lista ordenada de claves,
+    normalizando una sola vez cada valor distinto.
+    """
+    categorica = serie.astype("category")
+    por_categoria = np.array([clave_municipio(str(c)) for c in categorica.cat.categories] or [""], dtype=object)
+    claves, codigo_clave = np.unique(por_categoria, return_inverse=True)
+    if claves[0] == "":
+        claves, codigo_clave = claves[1:], codigo_clave - 1
+    codigos = categorica.cat.codes.to_numpy()
+    return np.where(codigos >= 0, codigo_clave[codigos], -1).astype(np.int64), list(claves)
+
+
+class Particiones:
+    """
+    Filas de un DataFrame agrupadas por clave: las posiciones se ordenan una
+    vez por código de clave y cada partición es un tramo contiguo de ese
+    orden, así que leer un municipio toca sólo sus filas (sin escanear ni
+    volver a normalizar la base, y sin copiarla completa).
+    """
+
+    def __init__(self, df: pd.DataFrame, codigos: np.ndarray, claves: list):
+        con_clave = codigos >= 0
+        self.df = df
+        self._orden = np.flatnonzero(con_clave)[np.argsort(codigos[con_clave], kind="stable")]
+        limites = np.concatenate([[0], np.cumsum(np.bincount(codigos[con_clave], minlength=len(claves)))])
+        self._tramos = {k: (limites[i], limites[i + 1]) for i, k in enumerate(claves) if limites[i + 1] > limites[i]}
+
+    def __contains__(self, clave):
+        return clave in self._tramos
+
+    def claves(self):
+        return list(self._tramos)
+
+    def leer(self, clave) -> pd.DataFrame:
+        inicio, fin = self._tramos.get(clave, (0, 0))
+        return self.df.take(self._orden[inicio:fin])
+
+
+class Territorio:
+    """
+    Datos territoriales listos para la pestaña: DENUE y censo particionados
+    por clave de municipio y una tabla de municipios con los indicadores
+    censales ya cruzados contra los conteos DENUE por giro.
+    """
+
+    def __init__(self, df_denue: pd.DataFrame, df_censo: pd.DataFrame = None):
+        df_censo = df_censo if df_censo is not None else pd.DataFrame()
+        self.col_municipio_denue = COLUMNA_MUNICIPIO if COLUMNA_MUNICIPIO in df_denue.columns else None
+        self.col_municipio_censo = COLUMNA_MUNICIPIO if COLUMNA_MUNICIPIO in df_censo.columns else None
+
+        if self.col_municipio_denue:
+            codigos, claves = _claves(df_denue[self.col_municipio_denue])
+        else:
+            codigos, claves = np.full(len(df_denue), -1, dtype=np.int64), []
+        self.denue = Particiones(df_denue, codigos, claves)
+        if self.col_municipio_censo:
+            self._codigos_censo, self._claves_censo = _claves(df_censo[self.col_municipio_censo])
+        else:
+            self._codigos_censo, self._claves_censo = np.full(len(df_censo), -1, dtype=np.int64), []
+        self.censo = Particiones(df_censo, self._codigos_censo, self._claves_censo)
+
+        self.nombres = self._nombres(df_denue, codigos, claves)
+        self.giros = self._giros_por_municipio(df_denue, codigos, claves)
+        self._claves_giros = self.giros["clave"].to_numpy(dtype=object)
+        self.municipios = self._tabla_municipios(df_censo)
+
+    def _nombres(self, df_denue, codigos, claves):
+        """Nombre para mostrar de cada clave: la grafía más frecuente en DENUE."""
+        if not self.col_municipio_denue or not claves:
+            return {}
+        categorica = df_denue[self.col_municipio_denue].astype("category")
+        frecuencia = np.bincount(categorica.cat.codes.to_numpy() + 1,
+                                 minlength=len(categorica.cat.categories) + 1)[1:]
+        nombres, mejor = {}, {}
+        for categoria, n in zip(categorica.cat.categories, frecuencia):
+            clave = clave_municipio(str(categoria))
+            if clave and n > mejor.get(clave, -1):
+                nombres[clave], mejor[clave] = str(categoria), n
+        return nombres
+
+    def _giros_por_municipio(self, df_denue, codigos, claves) -> pd.DataFrame:
+        if "giro" in df_denue.columns:
+            codigos_giro, giros = pd.factorize(df_denue["giro"])
+            giros = np.append(np.asarray(giros.astype(str), dtype=object), SIN_GIRO)
+            codigos_giro = np.where(codigos_giro >= 0, codigos_giro, len(giros) - 1)
+        else:
+            codigos_giro, giros = np.zeros(len(df_denue), dtype=np.int64), np.array([SIN_GIRO], dtype=object)
+
+        # Conteo por par (municipio, giro) sobre enteros, sin agrupar texto
+        con_clave = codigos >= 0
+        pares, empresas = np.unique(codigos[con_clave] * len(giros) + codigos_giro[con_clave], return_counts=True)
+        conteos = pd.DataFrame({
+            "clave": np.asarray(claves, dtype=object)[pares // len(giros)] if len(pares) else np.array([], dtype=object),
+            "giro": giros[pares % len(giros)],
+            "empresas": empresas,
+        })
+        conteos["participacion"] = conteos["empresas"] / conteos.groupby("clave")["empresas"].transform("sum")
+        return conteos.sort_values(["clave", "empresas"], ascending=[True, False], kind="stable").reset_index(drop=True)
+
+    def _tabla_municipios(self, df_censo) -> pd.DataFrame:
+        por_clave = self.giros.groupby("clave", sort=True).agg(
+            empresas=("empresas", "sum"), giros=("giro", "size"), giro_principal=("giro", "first"))
+        por_clave.insert(0, "municipio", [self.nombres.get(k, k) for k in por_clave.index])
+
+        if self.col_municipio_censo and not df_censo.empty:
+            # Indicadores del censo: primera fila por municipio (nivel municipal del ITER)
+            con_clave = self._codigos_censo >= 0
+            claves_censo = np.asarray(self._claves_censo, dtype=object)[self._codigos_censo[con_clave]]
+            censo = df_censo[con_clave].assign(clave=claves_censo).drop_duplicates("clave").set_index("clave")
+            numericas = censo.select_dtypes("number").columns
+            por_clave = por_clave.join(censo[numericas], how="outer")
+            por_clave["municipio"] = por_clave["municipio"].fillna(
+                pd.Series(censo[self.col_municipio_censo].astype(str), index=censo.index))
+            por_clave[["empresas", "giros"]] = por_clave[["empresas", "giros"]].fillna(0).astype("int64")
+            if COLUMNA_POBLACION in por_clave.columns:
+                poblacion = pd.to_numeric(por_clave[COLUMNA_POBLACION], errors="coerce")
+                por_clave["empresas_por_mil_hab"] = (por_clave["empresas"] / poblacion * 1000).round(2)
+        return por_clave
+
+    def opciones(self):
+        """Claves de municipio ordenadas por nombre para el selector."""
+        return sorted(self.municipios.index, key=lambda k: str(self.municipios.at[k, "municipio"]))
+
+    def nombre(self, clave) -> str:
+        return str(self.municipios.at[clave, "municipio"]) if clave in self.municipios.index else clave
+
+    def giros_de(self, clave) -> pd.DataFrame:
+        """Conteo DENUE por giro del municipio (tramo contiguo de la tabla ordenada por clave)."""
+        inicio = np.searchsorted(self._claves_giros, clave, side="left")
+        fin = np.searchsorted(self._claves_giros, clave, side="right")
+        return self.giros.iloc[inicio:fin].drop(columns="clave")
+
+
+def territorio(df_denue: pd.DataFrame, df_censo: pd.DataFrame = None):
+    """Territorio compartido por sesiones; se recalcula sólo si cambia la huella de DENUE o del censo."""
+    huella_censo = df_censo.attrs.get("madoli_huella") if df_censo is not None else None
+    filas_censo = len(df_censo) if df_censo is not None else 0
+    if filas_censo and huella_censo is None:
+        # Censo sin huella: no se puede saber si cambió, se construye sin memorizar
+        inicio = time.perf_counter()
+        return Territorio(df_denue, df_censo), (time.perf_counter() - inicio) * 1000
+    return derivado(df_denue, ("territorio", huella_censo, filas_censo),
+                    lambda d: Territorio(d, df_censo))